@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from wa_arbiter import ResourceArbiter, current_state, io_level, priority_level, resolve_cpus
+
+
+def test_cpu_sets():
+    assert resolve_cpus("recorder", 8) == [0, 1]
+    assert resolve_cpus("shared", 8) == list(range(2, 8))
+    assert resolve_cpus("shared", 2) == [0, 1]  # Nothing to reserve on two CPUs
+
+
+def test_most_important_state_wins():
+    assert current_state(game=True, recording=True) == "game"
+    assert current_state(updating=True) == "updating"
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads ionice and affinity back on Linux")
+def test_policies_reach_the_processes():
+    """Apply every state to child processes and read nice, ionice and affinity back through psutil."""
+    psutil = pytest.importorskip("psutil")
+    children = {role: subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"]) for role in ("miner", "recorder", "updater")}
+    arbiter = ResourceArbiter()
+    try:
+        for flags in ({"updating": True}, {"recording": True}, {"game": True, "recording": True}, {}):
+            arbiter.update(**flags)
+            for role, child in children.items():
+                arbiter.apply(role, [child.pid])
+                process = psutil.Process(child.pid)
+                priority, io, cpus = arbiter.policy(role)
+                if priority != "above_normal" or os.geteuid() == 0:  # Raising priority needs root
+                    assert process.nice() == priority_level(priority)
+                assert process.ionice().ioclass == (psutil.IOPRIO_CLASS_IDLE if io == "idle" else psutil.IOPRIO_CLASS_BE)
+                assert io == "idle" or process.ionice().value == io_level(io)[1]
+                assert process.cpu_affinity() == ([cpu for cpu in cpus if cpu < psutil.cpu_count()] or list(range(psutil.cpu_count())))
+        assert arbiter.apply("miner", [children["miner"].pid]) == 0  # Unchanged state: no OS calls
+    finally:
+        for child in children.values():
+            child.kill()
+            child.wait()
@@ -0,0 +1,66 @@
+from wa_autotuner import ThreadAutotuner
+
+LIMIT = 67.0
+HOURS = 6
+DT = 10.0
+
+
+class SimulatedRig:
+    """First-order thermal model: each thread adds heat, the hashrate levels off once L3 runs out."""
+    def __init__(self, ambient=40.0, per_thread=4.0, time_constant=60.0, per_thread_hashrate=1000.0, cache_threads=8):
+        self.ambient = ambient
+        self.per_thread = per_thread
+        self.time_constant = time_constant
+        self.per_thread_hashrate = per_thread_hashrate
+        self.cache_threads = cache_threads
+        self.temp = ambient
+
+    def hashrate(self, threads):
+        return self.per_thread_hashrate * min(threads, self.cache_threads) * (0.97 if threads > self.cache_threads else 1.0)
+
+    def step(self, threads, dt):
+        target = self.ambient + self.per_thread * threads
+        self.temp += (target - self.temp) * min(dt / self.time_constant, 1.0)
+        return self.temp
+
+
+def run(tuner, rig, threads, start=0.0):
+    for step in range(int(HOURS * 3600 / DT)):
+        new_threads = tuner.observe(start + step * DT, threads, rig.hashrate(threads), rig.step(threads, DT))
+        if new_threads is not None:
+            threads = new_threads
+    return threads
+
+
+def tuned(folder):
+    rig = SimulatedRig()  # The limit is reached at 6 threads
+    tuner = ThreadAutotuner.load("sim", "XMR", LIMIT, max_threads=12, folder=folder)
+    threads = tuner.start_threads(2)
+    tuner.begin(threads, 0.0)
+    return rig, tuner, run(tuner, rig, threads)
+
+
+def test_converges_to_the_most_threads_under_the_limit(tmp_path):
+    _, tuner, threads = tuned(tmp_path)
+    assert threads == 6
+    assert tuner.best() == 6
+    assert all(n <= 6 or entry["too_hot"] for n, entry in tuner.stats.items())  # 7 is skipped on the predicted temperature or marked hot
+
+
+def test_restart_resumes_from_the_saved_best(tmp_path):
+    tuned(tmp_path)
+    resumed = ThreadAutotuner.load("sim", "XMR", LIMIT, max_threads=12, folder=tmp_path)
+    assert resumed.start_threads(2) == 6
+    assert ThreadAutotuner.load("sim", "WOW", LIMIT, folder=tmp_path).start_threads(2) == 2  # Per coin
+
+
+def test_warmer_room_steps_down(tmp_path):
+    rig, tuner, threads = tuned(tmp_path)
+    rig.ambient = 44.0  # 6 threads now run at 68°C
+    assert run(tuner, rig, threads, start=HOURS * 3600) == 5
+
+
+def test_corrupt_state_starts_empty(tmp_path):
+    (tmp_path / "sim_XMR.json").write_text("{not json")
+    tuner = ThreadAutotuner.load("sim", "XMR", LIMIT, folder=tmp_path)
+    assert tuner.stats == {} and tuner.start_threads(3) == 3
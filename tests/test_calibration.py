@@ -0,0 +1,50 @@
+import sys
+
+import pytest
+
+pytest.importorskip("wa_cred")  # wa_calibration reads SupportedCoins through wa_definitions
+
+from wa_calibration import MIN_CALIBRATION_SAMPLES, robust_hashrate, run_calibration
+
+
+def test_trimmed_mean_after_the_warmup():
+    samples = [(t, 10.0) for t in range(5)] + [(t, 1000.0) for t in range(5, 25)] + [(25, 5000.0), (26, 1.0), (27, None)]
+    assert robust_hashrate(samples, 0, warmup=5, trim=0.1) == (1000.0, 18)
+    assert robust_hashrate(samples[:MIN_CALIBRATION_SAMPLES + 4], 0, warmup=5) == (None, MIN_CALIBRATION_SAMPLES - 1)
+
+
+@pytest.fixture
+def bench(tmp_path, monkeypatch):
+    bench = pytest.importorskip("wa_bench_miners")  # Sets WA_FAKE_MINER before wa_grok is imported
+    if not sys.platform.startswith("linux") or not bench.wa_grok.USE_FAKE_MINER:
+        pytest.skip("needs wa_fake_miner.py in place of the miners (Linux, WA_FAKE_MINER=1)")
+    bench.wa_grok.PRINT_MINER_LOG = False
+    monkeypatch.chdir(tmp_path)  # Miner logs go to ./logs
+    yield bench
+    bench.fake_env()
+
+
+def test_calibration_on_the_fake_miner(bench):
+    """Two coins ramping up with jitter and one crashing coin, without a database."""
+    from wa_coin_cache import CachedCoin
+    controller = bench.make_controller()
+    controller.cli_args["WOW"] = controller.cli_args[bench.BENCH_COIN]
+    controller.cli_args["BAD"] = controller.cli_args[bench.BENCH_COIN]
+    settings = {
+        "XMR": dict(interval=0.05, hashrate=1000, ramp=2.0, jitter=0.05),
+        "WOW": dict(interval=0.05, hashrate=3000, ramp=2.0, jitter=0.05),
+        "BAD": dict(interval=0.05, hashrate=3000, crash_after=1.0),
+    }
+    original_start = controller.start_mining
+
+    def start_with_settings(symbol):
+        bench.fake_env(**settings[symbol])
+        return original_start(symbol)
+    controller.start_mining = start_with_settings
+    coins = [CachedCoin(symbol, "bench", None, None, True, 0.5) for symbol in settings]
+    threads_before = controller.current_threads
+    results = {r["coin"]: r for r in run_calibration(coins, lambda symbol: controller, window=6.0, warmup=2.0, threads=2)}
+    assert results["XMR"]["hashrate"] == pytest.approx(2000, rel=0.03)  # 2 threads x 1000 H/s
+    assert results["WOW"]["hashrate"] == pytest.approx(6000, rel=0.03)
+    assert results["BAD"]["hashrate"] is None and results["BAD"]["error"]
+    assert controller.current_threads == threads_before  # Restored after calibrating
@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+pytest.importorskip("wa_cred")  # wa_coin_cache imports SupportedCoins through wa_definitions
+
+from wa_coin_cache import CachedCoin, SupportedCoinsCache
+
+ROWS = [
+    CachedCoin("XMR", "h1", "xmrig-b", None, False, 2.0),
+    CachedCoin("XMR", "h1", "xmrig-a", None, True, 1.0),
+    CachedCoin("XMR", "h1", None, None, True, 9.0),
+    CachedCoin("WOW", "h1", "wow-b", None, False, 3.0),
+    CachedCoin("WOW", "h1", "wow-a", None, False, 4.0),
+    CachedCoin("SAL", "h1", "sal", None, None, 5.0),
+]
+
+
+def cache_for(rows):
+    return SupportedCoinsCache(loader=lambda hostname: list(rows), hostname="h1")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rows_are_picked_independently_of_load_order(seed):
+    rows = list(ROWS)
+    random.Random(seed).shuffle(rows)
+    cache = cache_for(rows)
+    assert [coin.command_start for coin in cache.rows("XMR")] == ["xmrig-a", "xmrig-b", None]
+    assert cache.get("XMR").command_start == "xmrig-a"  # First enabled row by command_start
+    assert cache.get_target_hashrate("XMR") == 1000.0
+    assert cache.get("WOW").command_start == "wow-a"  # None enabled: the first row
+    assert sorted(coin.symbol for coin in cache.enabled_coins()) == ["SAL", "XMR"]
+
+
+def test_missing_rows_count_as_disabled():
+    cache = cache_for(ROWS)
+    assert cache.is_enabled("XMR") and cache.is_enabled("SAL")  # NULL enabled counts as enabled
+    assert not cache.is_enabled("WOW")
+    assert not cache.is_enabled("DERO") and cache.get("DERO") is None and cache.rows("DERO") == []
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from wa_cpu_topology import MB, probe_linux, recommend_threads
+
+
+def write_fixture(root, packages=1, cores_per_l3=4, l3_per_package=1, smt=2, l3_size=16 * MB, numa_per_package=True):
+    """Write a minimal sysfs tree: CPUs are numbered core-major (siblings adjacent) within each package."""
+    cpu_root = os.path.join(root, "cpu")
+    os.makedirs(cpu_root, exist_ok=True)
+    cpu = 0
+    package_cpus = []
+    for package in range(packages):
+        cpus_in_package = []
+        for l3 in range(l3_per_package):
+            l3_cpus = list(range(cpu, cpu + cores_per_l3 * smt))
+            for core in range(cores_per_l3):
+                core_id = l3 * cores_per_l3 + core
+                for thread in range(smt):
+                    base = os.path.join(cpu_root, f"cpu{cpu}")
+                    os.makedirs(os.path.join(base, "topology"), exist_ok=True)
+                    for name, value in (("physical_package_id", package), ("core_id", core_id)):
+                        with open(os.path.join(base, "topology", name), "w") as f:
+                            f.write(f"{value}\n")
+                    for index, (level, size, shared) in enumerate(((1, "32K", [cpu]), (2, "1024K", [cpu]),
+                                                                     (3, f"{l3_size // 1024}K", l3_cpus))):
+                        cache = os.path.join(base, "cache", f"index{index}")
+                        os.makedirs(cache, exist_ok=True)
+                        for name, value in (("level", level), ("size", size),
+                                            ("shared_cpu_list", f"{shared[0]}-{shared[-1]}" if len(shared) > 1 else shared[0])):
+                            with open(os.path.join(cache, name), "w") as f:
+                                f.write(f"{value}\n")
+                    cpus_in_package.append(cpu)
+                    cpu += 1
+        package_cpus.append(cpus_in_package)
+    with open(os.path.join(cpu_root, "online"), "w") as f:
+        f.write(f"0-{cpu - 1}\n")
+    if numa_per_package:
+        for node, cpus in enumerate(package_cpus):
+            os.makedirs(os.path.join(root, "node", f"node{node}"), exist_ok=True)
+            with open(os.path.join(root, "node", f"node{node}", "cpulist"), "w") as f:
+                f.write(f"{cpus[0]}-{cpus[-1]}\n")
+
+
+@pytest.mark.parametrize("kwargs, algo, expected", [
+    pytest.param(dict(cores_per_l3=8, l3_size=16 * MB), "rx/0", 8, id="8C/16T, 16 MB L3"),
+    pytest.param(dict(cores_per_l3=8, l3_size=16 * MB), "rx/wow", 16, id="8C/16T, 16 MB L3, rx/wow"),
+    pytest.param(dict(cores_per_l3=6, l3_per_package=2, l3_size=32 * MB), "rx/0", 24, id="12C/24T, 2 CCX x 32 MB"),
+    pytest.param(dict(cores_per_l3=6, l3_size=9 * MB), "rx/0", 4, id="6C/12T, 9 MB L3"),
+    pytest.param(dict(packages=2, cores_per_l3=4, smt=1, l3_size=8 * MB), "rx/0", 8, id="2 sockets x 4C, no SMT"),
+    pytest.param(dict(cores_per_l3=8, l3_size=16 * MB), "verushash", 8, id="8C/16T, verushash"),
+])
+def test_recommended_threads(tmp_path, kwargs, algo, expected):
+    write_fixture(str(tmp_path), **kwargs)
+    topology = probe_linux(str(tmp_path))
+    result = recommend_threads(topology, algo)
+    assert result["threads"] == expected
+    if result["threads"] <= topology.physical_cores:
+        # No SMT sibling pairs while physical cores are free
+        cores_used = [i for i, core in enumerate(topology.cores) if set(core) & set(result["cpus"])]
+        assert len(cores_used) == result["threads"]
+
+
+def test_numa_nodes(tmp_path):
+    write_fixture(str(tmp_path), packages=2, cores_per_l3=4, smt=1, l3_size=8 * MB)
+    topology = probe_linux(str(tmp_path))
+    assert sorted(topology.numa_nodes) == [0, 1] and topology.numa_nodes[1] == [4, 5, 6, 7]
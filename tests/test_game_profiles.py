@@ -0,0 +1,41 @@
+import pytest
+
+from wa_game_profiles import GAME_MIN_FPS_SAMPLES, GAME_MIN_SAMPLES, GAME_RESERVED_CPUS, GameProfile, miner_affinity
+
+CPU_COUNT = 16
+
+
+@pytest.fixture
+def profiles(tmp_path):
+    """A light and a heavy game learnt with the miner stopped."""
+    light = GameProfile("h1", "light-game", str(tmp_path))
+    heavy = GameProfile("h1", "heavy-game", str(tmp_path))
+    for i in range(GAME_MIN_SAMPLES):
+        light.add_sample("stopped", 2.0 + (i % 5) * 0.5, 40.0, (i, 60.0))
+        heavy.add_sample("stopped", 10.0 + (i % 3), 98.0, (i, 60.0))
+    return light, heavy
+
+
+def test_classification(profiles):
+    light, heavy = profiles
+    assert light.is_light(CPU_COUNT) and not heavy.is_light(CPU_COUNT)
+    assert light.miner_threads(CPU_COUNT, 12) == 16 - 4 - GAME_RESERVED_CPUS
+
+
+def test_miner_affinity_leaves_the_low_cpus_free():
+    assert miner_affinity(3, 8) == [5, 6, 7]
+
+
+def test_fps_drop_demotes_a_light_game(profiles, tmp_path):
+    light, _ = profiles
+    light.save()
+    resumed = GameProfile.load("h1", "light-game", str(tmp_path))
+    assert resumed.is_light(CPU_COUNT) and resumed.game_cpus() == light.game_cpus()
+    for i in range(GAME_MIN_FPS_SAMPLES):
+        resumed.add_sample("partial", 3.0, 40.0, (100 + i, 59.5))
+    assert resumed.fps_impact() == pytest.approx(0.5 / 60)
+    assert not resumed.check_impact()
+    for i in range(GAME_MIN_FPS_SAMPLES * 3):
+        resumed.add_sample("partial", 3.0, 40.0, (200 + i, 51.0))
+    assert resumed.check_impact() and not resumed.is_light(CPU_COUNT)
+    assert not GameProfile.load("h1", "light-game", str(tmp_path)).is_light(CPU_COUNT)  # Demotion persists
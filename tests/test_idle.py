@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from wa_idle import FOREIGN_LOAD_HEADROOM, IDLE_ACTIVE_INTENSITY, IDLE_RAMP_PER_SECOND, ForeignLoadMeter, IdleGovernor, idle_curve
+
+FULL_SECONDS = 300
+
+
+def test_curve_from_active_to_full():
+    assert idle_curve(2, FULL_SECONDS) == IDLE_ACTIVE_INTENSITY
+    assert idle_curve(155, FULL_SECONDS) == pytest.approx(IDLE_ACTIVE_INTENSITY + (1 - IDLE_ACTIVE_INTENSITY) * 0.5)
+    assert idle_curve(FULL_SECONDS, FULL_SECONDS) == 1.0
+    assert idle_curve(None, FULL_SECONDS) == 1.0
+
+
+def test_scripted_session():
+    governor = IdleGovernor(FULL_SECONDS)
+    assert governor.update(0, 2, None) == IDLE_ACTIVE_INTENSITY  # Typing
+    intensity = 0.0
+    for t in range(1, 200):  # Walked away: the curve climbs, intensity follows at the ramp rate
+        intensity = governor.update(t, 400, 0.01)
+    assert intensity == 1.0
+    assert governor.update(200, 400, 0.5) == 1.0 - 0.5 - FOREIGN_LOAD_HEADROOM  # A render job started
+    assert governor.update(201, 1, 0.5) == IDLE_ACTIVE_INTENSITY  # Back at the desk: drops at once
+    assert governor.update(211, 400, 0.0) == pytest.approx(IDLE_ACTIVE_INTENSITY + 10 * IDLE_RAMP_PER_SECOND)
+
+
+def test_meter_excludes_the_miner():
+    psutil = pytest.importorskip("psutil")
+    meter = ForeignLoadMeter()
+    miner = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+    other = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+    try:
+        meter.sample([miner.pid])
+        time.sleep(2.0)
+        foreign = meter.sample([miner.pid])
+    finally:
+        miner.kill()
+        other.kill()
+    one_cpu = 1.0 / (psutil.cpu_count() or 1)
+    assert 0.3 * one_cpu < foreign < 1.6 * one_cpu + 0.1  # Half a CPU when both share a single core
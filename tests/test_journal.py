@@ -0,0 +1,57 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from wa_journal import HEADER_SIZE, JOURNAL_DTYPE, JOURNAL_KINDS, JOURNAL_SOURCES, DecisionJournal, decode, describe, read_day
+
+RECORDS = 200_000
+MAX_BYTES = 4 * 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def folder(tmp_path_factory):
+    """A busy day across several segments, written after a record past retention, ending in a torn record."""
+    folder = tmp_path_factory.mktemp("journal")
+    journal = DecisionJournal("h1", str(folder), max_bytes=MAX_BYTES, keep_days=2)
+    journal.record("coin_pick", datetime(2026, 10, 10, 12).timestamp(), coin="XMR")
+    start = datetime(2026, 10, 19).timestamp()
+    for i in range(RECORDS):
+        journal.record(JOURNAL_KINDS[i % len(JOURNAL_KINDS)], start + i * 0.4, source=JOURNAL_SOURCES[i % 5], slot="cpu",
+                       priority="normal", coin="WOW" if i % 2 else "XMR", previous="XMR", threads_from=8, threads_to=i % 16,
+                       cpu_temp=60 + i % 10, gpu_temp=None, hashrate=5000.0 + i, revenue=0.5, health=1.0, game=i % 3 == 0)
+    journal.record("cap", start + 1, source="made-up")  # Unknown codes are stored as 255
+    with open(journal.file.name, "ab") as f:
+        f.write(b"\x01" * 17)  # Torn record from a crash
+    journal.close()
+    return folder
+
+
+def test_segments_rotate_by_size_and_age(folder):
+    segments = list(folder.glob("h1_2026-10-19_*.bin"))
+    assert len(segments) == -(-(RECORDS + 1) * JOURNAL_DTYPE.itemsize // (MAX_BYTES - HEADER_SIZE))
+    assert not list(folder.glob("h1_2026-10-10_*.bin"))  # Rotated out
+
+
+def test_day_reads_back_past_a_torn_tail(folder):
+    began = time.perf_counter()
+    day = read_day("2026-10-19", "h1", str(folder))
+    assert time.perf_counter() - began < 1.0
+    assert len(day) == RECORDS + 1 and day[-1]["source"] == 255
+    assert np.all(np.diff(day["timestamp"][:-1]) > 0)
+    assert day[12345]["coin"] == b"WOW" and day[12345]["threads_to"] == 12345 % 16 and np.isnan(day[12345]["gpu_temp"])
+    assert decode(day[:3], "kind") == list(JOURNAL_KINDS[:3])
+    assert day["game"].sum() == -(-RECORDS // 3)
+
+
+def test_describe(folder):
+    day = read_day("2026-10-19", "h1", str(folder))
+    lines = describe(day, last=3).splitlines()
+    assert len(lines) >= 5 and lines[-1].split()[2] == "cap"
+
+
+def test_missing_day_is_empty(tmp_path):
+    assert len(read_day("2026-10-19", "h1", str(tmp_path))) == 0
+    assert os.listdir(tmp_path) == []
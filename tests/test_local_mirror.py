@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("wa_cred")  # wa_local_mirror reads through wa_definitions
+
+from wa_local_mirror import LocalMirror
+
+
+class StandInMirror(LocalMirror):
+    """LocalMirror with the Postgres side replaced by in-memory tables; records every query and connection."""
+    def __init__(self, path):
+        self.remote = {
+            "supported_coins": [("XMR", "h1", "start", "stop", True, 1.2)],
+            "best_coins_for_rig": [("h1", "XMR", 1, 0.5)],
+            "my_games": [("game", True, "game.exe")],
+        }
+        self.fetched = []
+        self.connections = []
+        super().__init__(path, "h1")
+
+    def _connect(self):
+        conn = super()._connect()
+        self.connections.append(conn)
+        return conn
+
+    def _fetch_fingerprint(self, table_name):
+        return repr(self.remote[table_name])
+
+    def _fetch_remote(self, table_name):
+        self.fetched.append(table_name)
+        return list(self.remote[table_name])
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    return StandInMirror(str(tmp_path / "mirror.sqlite"))
+
+
+def test_rows_are_only_fetched_when_the_change_query_changes(mirror):
+    assert mirror.sync()
+    assert sorted(mirror.fetched) == ["best_coins_for_rig", "my_games", "supported_coins"]
+    mirror.fetched.clear()
+    assert mirror.sync()
+    assert mirror.fetched == []
+    assert mirror.get_sync_metrics()["mirror_staleness"] < 1.0  # Unchanged tables still count as synced
+    mirror.remote["best_coins_for_rig"] = [("h1", "XMR", 1, 0.7)]
+    assert mirror.sync()
+    assert mirror.fetched == ["best_coins_for_rig"]
+    assert mirror.revenue("XMR") == 0.7
+
+
+def test_failed_change_query_keeps_the_last_rows(mirror):
+    mirror.sync()
+
+    def down(table_name):
+        raise ConnectionError("central DB down")
+    mirror._fetch_fingerprint = down
+    assert not mirror.sync()
+    assert mirror.revenue("XMR") == 0.5 and [c.symbol for c in mirror.supported_coins("h1")] == ["XMR"]
+
+
+def test_connections_are_closed(mirror):
+    mirror.sync()
+    mirror.best_coins("XMR", 1.1)
+    mirror.my_games()
+    assert mirror.connections
+    for conn in mirror.connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_sync_state_without_a_fingerprint_column_is_upgraded(tmp_path):
+    path = str(tmp_path / "mirror.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sync_state (table_name TEXT PRIMARY KEY, last_attempt REAL, last_success REAL, "
+                 "last_duration REAL, row_count INTEGER, changed INTEGER, last_error TEXT)")
+    conn.execute("INSERT INTO sync_state (table_name, last_success) VALUES ('my_games', 1.0)")
+    conn.commit()
+    conn.close()
+    mirror = StandInMirror(path)
+    assert mirror.sync()
+    assert "my_games" in mirror.fetched  # No fingerprint recorded: fetched once
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+pytest.importorskip("wa_cred")  # wa_netstats_poller persists through wa_definitions
+pytest.importorskip("aiohttp")
+
+from aiohttp import web
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from wa_definitions import NetworkStats
+from wa_netstats_poller import NetworkStatsPoller
+from wa_profitability import ATOMIC_UNITS
+
+
+async def _node(request):
+    behaviour = request.match_info["behaviour"]
+    if behaviour == "slow":
+        await asyncio.sleep(0.3)
+    elif behaviour == "hang":
+        await asyncio.sleep(3)
+    elif behaviour == "error":
+        return web.Response(status=500, text="internal error")
+    elif behaviour == "garbage":
+        return web.Response(text='{"result": {"difficulty": 12', content_type="application/json")
+    method = (await request.json())["method"]
+    if method == "get_info":
+        return web.json_response({"result": {"difficulty": 300000000000 + len(behaviour), "height": 3200000, "target": 120}})
+    return web.json_response({"result": {"block_header": {"reward": 600000000000}}})
+
+
+async def _pool(request):
+    return web.json_response({"network": {"difficulty": 5000, "height": 77}, "lastReward": 250000000})
+
+
+async def _two_rounds(session_factory):
+    """Two poller rounds against stand-ins: fast, slow, HTTP 500, hanging past the timeout, malformed JSON, a pool API."""
+    app = web.Application()
+    app.router.add_post("/{behaviour}/json_rpc", _node)
+    app.router.add_get("/pool/stats", _pool)
+    runner = web.AppRunner(app)
+    await runner.setup()
+
+    async def base():
+        """One port per stand-in, as separate nodes would be (the connector's limit is per host and port)."""
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    endpoints = {symbol: {"kind": "node_rpc", "url": f"{await base()}/{behaviour}/json_rpc"} for symbol, behaviour in
+                 (("XMR", "fast"), ("WOW", "slow"), ("SAL", "error"), ("DERO", "hang"), ("ZEPH", "garbage"))}
+    endpoints["RTM"] = {"kind": "pool_json", "url": f"{await base()}/pool/stats",
+                        "fields": {"difficulty": "network.difficulty", "height": "network.height", "reward": "lastReward"}}
+    poller = NetworkStatsPoller(endpoints, timeout=1.0, session_factory=session_factory)
+    try:
+        async with poller.client_session() as http:
+            started = time.perf_counter()
+            results = await poller.poll_all(http)
+            elapsed = time.perf_counter() - started
+            again = await poller.poll_all(http)  # Second round on the kept-alive connections
+    finally:
+        await runner.cleanup()
+    return poller, results, again, elapsed
+
+
+@pytest.fixture(scope="module")
+def db():
+    engine = create_engine("sqlite://")
+    NetworkStats.__table__.create(engine)
+    return engine
+
+
+@pytest.fixture(scope="module")
+def polled(db):
+    logging.getLogger("aiohttp.server").setLevel(logging.CRITICAL)  # Requests cut off by the client timeout
+    return asyncio.run(_two_rounds(sessionmaker(bind=db)))
+
+
+def test_round_parses_nodes_and_pool_apis(polled):
+    poller, results, again, _ = polled
+    assert set(results) == {"XMR", "WOW", "RTM"} and set(again) == set(results)
+    assert results["XMR"]["difficulty"] == 300000000004
+    assert results["XMR"]["reward"] == 0.6  # 6e11 atomic units of 1e12
+    assert results["RTM"]["difficulty"] == 5000 and results["RTM"]["height"] == 77
+    assert results["RTM"]["reward"] == 250000000 / ATOMIC_UNITS.get("RTM", 1)
+
+
+def test_round_is_concurrent(polled):
+    _, results, _, elapsed = polled
+    assert results["WOW"]["latency_ms"] >= 300 > results["XMR"]["latency_ms"]  # The slow node does not delay the others
+    assert elapsed < 1.5  # Bounded by the 1 s timeout, not the sum of the delays
+
+
+@pytest.mark.parametrize("symbol, error", [("SAL", "500"), ("DERO", "TimeoutError"), ("ZEPH", "JSONDecodeError")])
+def test_failures_are_recorded_in_the_cache(polled, symbol, error):
+    entry = polled[0].cache.snapshot()[symbol]
+    assert entry["values"] is None and entry["stale"]
+    assert entry["failures"] == 2
+    assert error in entry["last_error"]
+
+
+def test_cache_holds_the_latest_round(polled):
+    poller, _, again, _ = polled
+    assert poller.cache.get("XMR") == again["XMR"]
+    assert not poller.cache.snapshot()["XMR"]["stale"]
+
+
+def test_persist_upserts_per_second(polled, db):
+    poller, results, again, _ = polled
+    poller._persist(results, timestamp=1000)
+    poller._persist(dict(results, XMR=dict(results["XMR"], height=3200001)), timestamp=1000)  # Same second: replaces
+    poller._persist(again, timestamp=1060)
+    with sessionmaker(bind=db)() as session:
+        rows = session.query(NetworkStats).order_by(NetworkStats.timestamp, NetworkStats.symbol).all()
+        assert [(r.timestamp, r.symbol) for r in rows] == [(t, s) for t in (1000, 1060) for s in ("RTM", "WOW", "XMR")]
+        assert next(r for r in rows if r.timestamp == 1000 and r.symbol == "XMR").height == 3200001
+
+
+def test_coins_without_an_endpoint_are_reported(capsys):
+    poller = NetworkStatsPoller({"XMR": {"kind": "pool_json", "url": "http://127.0.0.1:9/", "fields": {}}})
+    assert poller.check_coverage(["XMR", "WOW", "ZEPH"]) == ["WOW", "ZEPH"]
+    out = capsys.readouterr().out
+    assert "WOW, ZEPH" in out and "configured: XMR" in out
+    assert poller.check_coverage(["XMR", "WOW", "ZEPH"]) == ["WOW", "ZEPH"]
+    assert capsys.readouterr().out == ""  # Warned once per change
+    assert poller.cache.snapshot()["WOW"]["last_error"].startswith("no endpoint")
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+import time
+
+from wa_pool_prober import (POOL_DEGRADED_PENALTY, POOL_FAILOVER_COOLDOWN, PoolProber, build_pools, parse_endpoint,
+                            pool_from_args, with_pool)
+
+
+async def stand_in_pool(delay, reject=False, protocol="login"):
+    """Local stratum server answering the first request after delay seconds (an error reply if reject)."""
+    async def handle(reader, writer):
+        line = await reader.readline()
+        if line:
+            request = json.loads(line)
+            await asyncio.sleep(delay)
+            if reject:
+                reply = {"id": request["id"], "jsonrpc": "2.0", "error": {"code": -1, "message": "Invalid address"}}
+            elif protocol == "login":
+                reply = {"id": request["id"], "jsonrpc": "2.0", "error": None, "result": {"id": "1", "status": "OK", "job": {}}}
+            else:
+                reply = {"id": request["id"], "error": None, "result": [["mining.notify", "ae6812eb4cd7735a302a8a9dd95cf71f"], "08000002", 4]}
+            writer.write((json.dumps(reply) + "\n").encode())
+            await writer.drain()
+        writer.close()
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"stratum+tcp://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+def test_ranking_and_failover():
+    async def run():
+        fast, fast_url = await stand_in_pool(0.01)
+        slow, slow_url = await stand_in_pool(0.2)
+        bad, bad_url = await stand_in_pool(0.0, reject=True)
+        sub, sub_url = await stand_in_pool(0.02, protocol="subscribe")
+        closed, closed_url = await stand_in_pool(0.0)
+        closed.close()
+        await closed.wait_closed()
+        now = [1000.0]
+        prober = PoolProber({
+            "XMR": {"urls": [slow_url, bad_url, closed_url, fast_url], "protocol": "login", "user": "wallet"},
+            "ETI": {"urls": [sub_url], "protocol": "subscribe", "user": "wallet"},
+        }, timeout=2, clock=lambda: now[0])
+        started = time.perf_counter()
+        await prober.probe_all()
+        assert time.perf_counter() - started < 0.6  # The slow pool alone takes 0.2 s; sequential probing would add up
+        assert prober.rank("XMR")[:2] == [fast_url, slow_url] and prober.best("XMR") == fast_url
+        assert not prober.healthy(bad_url) and not prober.healthy(closed_url)
+        assert prober.best("ETI") == sub_url
+        # Running on the slow pool: ~200 ms against ~10 ms
+        failover = prober.should_failover("XMR", slow_url)
+        assert failover and failover[0] == fast_url
+        assert prober.should_failover("XMR", slow_url) is None  # Cooldown
+        # On the fast pool, rejects climb past the limit; the slow pool is the only alternative
+        now[0] += POOL_FAILOVER_COOLDOWN + 1
+        assert prober.should_failover("XMR", fast_url, accepted=100, rejected=0) is None  # Opens the window
+        assert prober.should_failover("XMR", fast_url, accepted=118, rejected=4) is None  # Slow pool still penalised
+        now[0] += POOL_DEGRADED_PENALTY + 1
+        failover = prober.should_failover("XMR", fast_url, accepted=136, rejected=8)
+        assert failover and failover[0] == slow_url and "rejected" in failover[1]
+        # The fast pool dies: two failed probes, fail over to whatever is healthy
+        fast.close()
+        await fast.wait_closed()
+        now[0] += POOL_DEGRADED_PENALTY + 1
+        await prober.probe_all()
+        await prober.probe_all()
+        assert not prober.healthy(fast_url)
+        failover = prober.should_failover("XMR", fast_url)
+        assert failover and failover[0] == slow_url and "failed probes" in failover[1]
+        for server in (slow, bad, sub):
+            server.close()
+    asyncio.run(run())
+
+
+def test_prober_thread_is_unaffected_by_a_blocked_caller():
+    pools_loop = asyncio.new_event_loop()
+    threading.Thread(target=pools_loop.run_forever, daemon=True).start()
+    server, url = asyncio.run_coroutine_threadsafe(stand_in_pool(0.01), pools_loop).result()
+    prober = PoolProber({"XMR": {"urls": [url], "protocol": "login", "user": "wallet"}}, timeout=2)
+    assert prober.best("XMR") is None  # Before the first round miners keep their configured pool
+    prober.start(interval=0.2)
+    try:
+        assert prober.ready.wait(3)
+        time.sleep(1.0)  # Blocking, as the switcher does between awaits
+        assert prober.rounds >= 4 and prober.best("XMR") == url
+        assert prober.stats[url]["latency"] < 100  # Not the second the caller was blocked
+    finally:
+        prober.stop()
+        pools_loop.call_soon_threadsafe(server.close)
+        pools_loop.call_soon_threadsafe(pools_loop.stop)
+
+
+def test_cli_argument_helpers():
+    assert with_pool(["--url=a:1", "--threads=2"], "b:2") == ["--url=b:2", "--threads=2"]
+    assert with_pool(["--pool", "a:1", "--disable-gpu"], "b:2") == ["--pool", "b:2", "--disable-gpu"]
+    assert pool_from_args(["--algorithm", "x", "--pool", "a:1"]) == "a:1"
+    assert parse_endpoint("stratum+ssl://pool.example:443") == ("pool.example", 443, True)
+    assert parse_endpoint("pool.example:3333") == ("pool.example", 3333, False)
+
+
+def test_build_pools_adds_candidates():
+    pools = build_pools({"login": {"XMR": ["--url=a:1", "--user=w"]}, "subscribe": {"ETI": ["--pool", "b:2", "--wallet", "v"]}},
+                        candidates={"XMR": ["a:1", "c:3"]})
+    assert pools == {"XMR": {"urls": ["a:1", "c:3"], "protocol": "login", "user": "w"},
+                     "ETI": {"urls": ["b:2"], "protocol": "subscribe", "user": "v"}}
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from wa_power import PowerMeter, PowerProvider, RaplProvider
+
+MAX_ENERGY = 262143328850
+
+
+@pytest.fixture
+def powercap(tmp_path):
+    """A fake two-package powercap tree, with a core subzone and an MMIO duplicate of package 0."""
+    zones = {"intel-rapl:0": "package-0", "intel-rapl:1": "package-1", "intel-rapl:0:0": "core", "intel-rapl-mmio:0": "package-0"}
+    for zone, name in zones.items():
+        os.makedirs(tmp_path / zone)
+        for field, value in (("name", name), ("energy_uj", 0), ("max_energy_range_uj", MAX_ENERGY)):
+            (tmp_path / zone / field).write_text(f"{value}\n")
+    return tmp_path
+
+
+def set_energy(root, zone, value):
+    (root / zone / "energy_uj").write_text(f"{value}\n")
+
+
+def test_only_packages_are_read(powercap):
+    provider = RaplProvider(str(powercap))
+    assert [os.path.basename(zone) for zone in provider.zones] == ["intel-rapl:0", "intel-rapl:1"]
+    assert provider.available()
+
+
+def test_energy_over_time_with_a_counter_wrap(powercap):
+    now = [0.0]
+    meter = PowerMeter(RaplProvider(str(powercap), clock=lambda: now[0]))
+    assert meter.sample(cpu_mining=False)["cpu"] is None  # First read: baseline only
+    now[0] = 10.0
+    set_energy(powercap, "intel-rapl:0", 200_000_000)
+    set_energy(powercap, "intel-rapl:1", 100_000_000)
+    assert meter.sample(cpu_mining=False)["cpu"] == 30.0 and meter.idle_cpu == 30.0
+    now[0] = 20.0
+    set_energy(powercap, "intel-rapl:0", MAX_ENERGY - 100_000_000)  # Package 0 wraps on the next read
+    set_energy(powercap, "intel-rapl:1", 800_000_000)
+    meter.sample(cpu_mining=True)
+    now[0] = 30.0
+    set_energy(powercap, "intel-rapl:0", 500_000_000)
+    set_energy(powercap, "intel-rapl:1", 1_500_000_000)
+    assert meter.sample(cpu_mining=True)["cpu"] == 130.0  # (0.6 + 0.7 kJ) / 10 s
+    assert meter.mining_watts() == 100.0 and meter.idle_cpu == 30.0  # The baseline only learns while not mining
+    assert meter.metrics(6500.0) == {"cpu_power": 130.0, "gpu_power": None, "hashrate_per_watt": 50.0}
+
+
+def test_no_provider():
+    assert PowerMeter(PowerProvider()).sample(True) == {"cpu": None, "gpu": None}
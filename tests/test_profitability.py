@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+pytest.importorskip("wa_cred")  # wa_profitability reads SupportedCoins through wa_definitions
+
+from wa_profitability import (SECONDS_PER_DAY, CachedProvider, CoinGeckoPriceProvider, NodeRpcProvider,
+                              ProfitabilityEngine, fill_missing)
+
+TTL = 0.5
+COINS = ["WOW", "XMR", "DERO"]  # DERO: no node and no price on the stand-ins
+HASHRATES = np.array([[20000.0, 10000.0, 500.0], [50.0, 20000.0, np.nan]])  # H/s per worker x coin
+EXPECTED_WOW = 20000.0 * SECONDS_PER_DAY / 1e9 * 6.0 * 0.05
+EXPECTED_XMR = 10000.0 * SECONDS_PER_DAY / 400e9 * 0.6 * 200.0
+
+
+class StandIns:
+    """Two Monero-style node RPCs and a CoinGecko simple/price endpoint on one local server."""
+    def __init__(self):
+        self.nodes = {"xmr": {"difficulty": 400e9, "reward": 0.6e12}, "wow": {"difficulty": 1e9, "reward": 6e11}}
+        self.prices = {"monero": 200.0, "wownero": 0.05}
+        self.seen = {"node": 0, "price": 0}
+        self.price_down = False
+        stand_ins = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                stand_ins.seen["node"] += 1
+                node = stand_ins.nodes[self.path.split("/")[1]]
+                method = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["method"]
+                if method == "get_info":
+                    self.reply(200, {"result": {"difficulty": node["difficulty"], "height": 100, "target": 120}})
+                else:
+                    self.reply(200, {"result": {"block_header": {"reward": node["reward"]}}})
+
+            def do_GET(self):
+                stand_ins.seen["price"] += 1
+                if stand_ins.price_down:
+                    self.reply(503, {"error": "rate limited"})
+                else:
+                    self.reply(200, {cg_id: {"usd": price} for cg_id, price in stand_ins.prices.items() if cg_id in self.path})
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stand_ins():
+    servers = StandIns()
+    yield servers
+    servers.server.shutdown()
+
+
+@pytest.fixture
+def engine(stand_ins):
+    node_rpc = CachedProvider(NodeRpcProvider({"XMR": f"{stand_ins.base}/xmr/json_rpc", "WOW": f"{stand_ins.base}/wow/json_rpc"}), TTL)
+    price = CachedProvider(CoinGeckoPriceProvider(url=f"{stand_ins.base}/simple/price"), TTL)
+    return ProfitabilityEngine([node_rpc], [price])
+
+
+def test_revenue_matrix_and_ranking(engine):
+    revenue = engine.revenue_matrix(COINS, HASHRATES)
+    assert revenue[0, 0] == pytest.approx(EXPECTED_WOW)
+    assert revenue[0, 1] == pytest.approx(EXPECTED_XMR)
+    assert np.isnan(revenue[:, 2]).all()
+    assert [COINS[i] for i in np.nanargmax(revenue[:, :2], axis=1)] == ["WOW", "XMR"]  # Per-worker ranking
+
+
+def test_inputs_are_not_refetched_within_the_ttl(engine, stand_ins):
+    engine.revenue_matrix(COINS, HASHRATES)
+    seen = dict(stand_ins.seen)
+    engine.revenue_matrix(COINS, HASHRATES)
+    assert stand_ins.seen == seen
+
+
+def test_price_outage_keeps_the_last_price_and_backs_off(engine, stand_ins):
+    revenue = engine.revenue_matrix(COINS, HASHRATES)
+    seen = dict(stand_ins.seen)
+    price = engine.price_providers[0]
+    stand_ins.price_down = True
+    time.sleep(TTL * 1.2)
+    stale = engine.revenue_matrix(COINS, HASHRATES)
+    assert stand_ins.seen == {"node": seen["node"] + 4, "price": seen["price"] + 1}
+    assert np.allclose(stale[:, :2], revenue[:, :2])
+    assert price.age("XMR") > TTL  # Last price kept, growing older
+    engine.revenue_matrix(COINS, HASHRATES)
+    assert stand_ins.seen["price"] == seen["price"] + 1  # A failed source is not retried before another TTL
+    stand_ins.price_down = False
+    stand_ins.prices["monero"] = 300.0
+    time.sleep(TTL * 1.2)
+    recovered = engine.revenue_matrix(COINS, HASHRATES)
+    assert recovered[0, 1] == pytest.approx(EXPECTED_XMR * 1.5)
+    assert price.age("XMR") < TTL
+
+
+def test_fill_missing_falls_back_per_pair():
+    local = (["h1", "h2"], COINS, np.array([[1.0, 2.0, np.nan], [3.0, 4.0, np.nan]]))
+    # View against engine: WOW at 0.5x the view's values, XMR at 0.8x
+    fallback = (["h1", "h2", "h3"], ["DERO", "WOW", "XMR"], np.array([[0.25, 2.0, 2.5], [np.nan, 6.0, 5.0], [0.1, np.nan, 0.5]]))
+    workers, coins, merged, fell_back = fill_missing(local, fallback)
+    assert workers == ["h1", "h2", "h3"] and coins == ["DERO", "WOW", "XMR"]
+    assert fell_back == ["DERO", "XMR"]
+    assert merged[0, 2] == 2.0  # h1 XMR: the engine wins
+    assert merged[2, 2] == pytest.approx(0.5 * 0.8)  # h3 XMR: only the view has it, scaled by XMR's ratio
+    assert merged[0, 0] == pytest.approx(0.25 * 0.65)  # h1 DERO: no engine value for DERO anywhere, the median of all ratios
+    assert np.isnan(merged[1, 0]) and np.isnan(merged[2, 1])  # Neither
+
+
+def test_fill_missing_without_a_common_pair_uses_the_view_alone():
+    local = (["h1"], ["XMR"], np.array([[2.0]]))
+    fallback = (["h2"], ["DERO"], np.array([[0.25]]))
+    workers, coins, merged, fell_back = fill_missing(local, fallback)
+    assert fell_back == ["DERO"]
+    assert np.isnan(merged[0, 1]) and merged[1, 0] == 0.25  # No ratio to put them on one basis
+
+
+def test_fill_missing_keeps_the_engine_when_nothing_is_missing():
+    local = (["h1"], ["XMR"], np.array([[2.0]]))
+    workers, coins, merged, fell_back = fill_missing(local, (["h1"], ["XMR"], np.array([[9.0]])))
+    assert fell_back == [] and merged[0, 0] == 2.0
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from wa_sensors import SensorChannel, SensorSampler
+from test_thermal import ThermalModel
+
+LIMIT = 67.0
+FIXED_INTERVAL = 10.0
+READ_COST = 0.005  # CPU seconds burnt per read, standing in for an OHM Open()/Update() round
+
+
+@pytest.fixture(scope="module")
+def run():
+    """A cool, steady hour, then a game heating the package to 2°C under the limit for an hour."""
+    now = [0.0]
+    model = ThermalModel(ambient=40.0, per_thread=1.0)
+
+    def read_cpu():
+        deadline = time.thread_time() + READ_COST
+        while time.thread_time() < deadline:
+            pass
+        return model.temp
+
+    sampler = SensorSampler([SensorChannel("cpu", read_cpu, LIMIT)], clock=lambda: now[0])
+    climbing_gaps = []  # Gaps between reads while climbing, after the first read that saw the climb
+    last_read = last_temp = None
+    seen_climb = False
+    while now[0] < 2 * 3600:
+        load = 0.0 if now[0] < 3600 else 20.0  # 45°C, then 65°C from the second hour
+        model.step(5, 1.0, load)
+        if sampler.poll_due():
+            climbing = last_read is not None and model.temp - last_temp > 0.5
+            if climbing and seen_climb and model.temp > LIMIT - 8:
+                climbing_gaps.append(now[0] - last_read)
+            seen_climb = seen_climb or climbing
+            last_read, last_temp = now[0], model.temp
+        now[0] += 1.0
+    return sampler, climbing_gaps
+
+
+def test_reads_less_often_than_a_fixed_cadence(run):
+    sampler, _ = run
+    cost = sampler.cost(FIXED_INTERVAL)
+    assert cost["reads_per_hour"] < cost["fixed_reads_per_hour"]
+    assert cost["cpu_seconds_per_hour"] < cost["fixed_cpu_seconds_per_hour"]
+
+
+def test_reads_at_least_as_often_while_climbing_into_the_limit(run):
+    _, climbing_gaps = run
+    assert climbing_gaps and max(climbing_gaps) <= FIXED_INTERVAL
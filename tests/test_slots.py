@@ -0,0 +1,45 @@
+from collections import namedtuple
+
+import pytest
+
+from wa_slots import GPU_WORKER_SUFFIX, MiningSlot, SlotRevenue
+
+Row = namedtuple("Row", ["symbol", "rev_rig_correct"])
+
+
+class Controller:
+    is_mining = False
+    current_coin = None
+
+
+def test_revenue_over_a_scripted_day():
+    """A coin switch and a low hashrate hour on the CPU slot, a game preempting the GPU slot."""
+    now = [0.0]
+    cpu = SlotRevenue("cpu", clock=lambda: now[0])
+    gpu = SlotRevenue("gpu", clock=lambda: now[0])
+    for hour in range(24):
+        now[0] = hour * 3600.0
+        cpu.account("XMR" if hour < 12 else "WOW", 1.2 if hour < 12 else 2.4, 0.5 if hour == 20 else 1.0)
+        gpu.account(None if 18 <= hour < 22 else "ETI", 4.8)  # A game took the GPU from 18:00 to 22:00
+    now[0] = 24 * 3600.0
+    cpu.account(None, None)
+    gpu.account(None, None)
+    # CPU: 12 h at 1.2/day, 11 h at 2.4/day and 1 h at half of 2.4/day
+    assert cpu.total == pytest.approx(0.6 + 11 / 24 * 2.4 + 0.5 / 24 * 2.4)
+    assert gpu.total == pytest.approx(20 / 24 * 4.8)
+    assert gpu.metrics()["mining_share"] == pytest.approx(20 / 24)
+
+
+def test_slot_chooses_its_own_coins():
+    slot = MiningSlot("gpu", "h1" + GPU_WORKER_SUFFIX, Controller(), ["ETI", "PEPEW"], 80.0)
+    rows = [Row("XMR", 9.0), Row("ETI", 5.0), Row("PEPEW", 4.0)]
+    assert slot.choose(rows, lambda symbol: True).symbol == "ETI"  # XMR is not a GPU coin
+    assert slot.choose(rows, lambda symbol: symbol != "ETI").symbol == "PEPEW"  # ETI backing off
+
+
+def test_thermal_hysteresis():
+    slot = MiningSlot("gpu", "h1" + GPU_WORKER_SUFFIX, Controller(), ["ETI"], 80.0)
+    assert slot.thermal_ok(79)
+    assert not slot.thermal_ok(81)
+    assert not slot.thermal_ok(77)  # Stopped for heat: waits for the resume margin
+    assert slot.thermal_ok(75)
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+import wa_supervisor
+from wa_supervisor import FAILURE_PENALTIES, MinerSupervisor
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(wa_supervisor.random, "uniform", lambda low, high: 0.0)
+
+
+def test_unknown_pair_is_healthy_and_startable(clock):
+    supervisor = MinerSupervisor(clock=clock)
+    assert supervisor.score("xmrig", "XMR") == 1.0
+    assert supervisor.can_start("xmrig", "XMR") == (True, 0.0)
+    assert supervisor.metrics("xmrig", "XMR") == {"supervisor_health": 1.0, "supervisor_failures": 0, "supervisor_backoff": 0.0}
+
+
+def test_backoff_doubles_per_failure_up_to_the_cap(clock, no_jitter):
+    supervisor = MinerSupervisor(base_backoff=15, max_backoff=100, clock=clock)
+    backoffs = [supervisor.record_failure("xmrig", "XMR", "crash") for _ in range(5)]
+    assert backoffs == [15, 30, 60, 100, 100]
+
+
+def test_backoff_blocks_starts_until_it_expires(clock, no_jitter):
+    supervisor = MinerSupervisor(base_backoff=15, clock=clock)
+    supervisor.record_failure("xmrig", "XMR", "hang")
+    assert supervisor.can_start("xmrig", "XMR") == (False, 15)
+    assert supervisor.can_start("xmrig", "WOW") == (True, 0.0)  # Per (miner, coin)
+    assert supervisor.can_start("srbminer", "XMR") == (True, 0.0)
+    clock.now += 10
+    assert supervisor.can_start("xmrig", "XMR") == (False, 5)
+    clock.now += 5
+    assert supervisor.can_start("xmrig", "XMR") == (True, 0.0)
+
+
+def test_jitter_stays_within_bounds_and_spreads_rigs(clock):
+    random.seed(7)
+    backoffs = []
+    for _ in range(200):
+        supervisor = MinerSupervisor(base_backoff=100, jitter=0.2, clock=clock)
+        backoffs.append(supervisor.record_failure("xmrig", "XMR", "crash"))
+    assert all(80 <= backoff <= 120 for backoff in backoffs)
+    assert max(backoffs) - min(backoffs) > 20  # Not in lockstep
+    assert 95 < sum(backoffs) / len(backoffs) < 105
+
+
+def test_health_penalty_decays_with_half_life(clock, no_jitter):
+    supervisor = MinerSupervisor(recovery_half_life=1800, clock=clock)
+    supervisor.record_failure("xmrig", "XMR", "crash")
+    assert supervisor.score("xmrig", "XMR") == pytest.approx(1 - FAILURE_PENALTIES["crash"])
+    clock.now += 1800
+    assert supervisor.score("xmrig", "XMR") == pytest.approx(1 - FAILURE_PENALTIES["crash"] / 2)
+    clock.now += 1800
+    assert supervisor.score("xmrig", "XMR") == pytest.approx(1 - FAILURE_PENALTIES["crash"] / 4)
+
+
+def test_penalties_compound_on_the_decayed_score(clock, no_jitter):
+    supervisor = MinerSupervisor(recovery_half_life=1800, clock=clock)
+    supervisor.record_failure("xmrig", "XMR", "start_failed")
+    clock.now += 1800
+    supervisor.record_failure("xmrig", "XMR", "low_hashrate")
+    recovered = 1 - FAILURE_PENALTIES["start_failed"] / 2
+    assert supervisor.score("xmrig", "XMR") == pytest.approx(recovered * (1 - FAILURE_PENALTIES["low_hashrate"]))
+
+
+def test_long_healthy_run_clears_the_failure_streak(clock, no_jitter):
+    supervisor = MinerSupervisor(base_backoff=15, healthy_uptime=600, clock=clock)
+    supervisor.record_failure("xmrig", "XMR", "crash")
+    supervisor.record_failure("xmrig", "XMR", "crash")
+    supervisor.record_start("xmrig", "XMR")
+    clock.now += 599
+    supervisor.record_stop("xmrig", "XMR")
+    assert supervisor.metrics("xmrig", "XMR")["supervisor_failures"] == 2  # Too short
+    supervisor.record_start("xmrig", "XMR")
+    clock.now += 600
+    supervisor.record_stop("xmrig", "XMR")
+    assert supervisor.metrics("xmrig", "XMR")["supervisor_failures"] == 0
+    assert supervisor.record_failure("xmrig", "XMR", "crash") == 15  # Backoff starts over
+
+
+def test_failure_after_a_long_run_starts_a_new_streak(clock, no_jitter):
+    supervisor = MinerSupervisor(base_backoff=15, healthy_uptime=600, clock=clock)
+    for _ in range(3):
+        supervisor.record_failure("xmrig", "XMR", "crash")
+    supervisor.record_start("xmrig", "XMR")
+    clock.now += 3600
+    assert supervisor.record_failure("xmrig", "XMR", "hang") == 15
+    assert supervisor.metrics("xmrig", "XMR")["supervisor_failures"] == 1
+
+
+def test_decisions_reach_the_callback(clock, no_jitter):
+    events = []
+    supervisor = MinerSupervisor(clock=clock, on_decision=lambda name, description: events.append((name, description)))
+    supervisor.record_failure("xmrig", "XMR", "low_hashrate", "45% of target")
+    assert events == [("supervisor_backoff", "low_hashrate for XMR on xmrig (45% of target): failure #1, health 0.80, backoff 15s")]
+    assert supervisor.decisions[-1][0] == clock.now
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from wa_tariff import PowerModel, TariffCalendar, TariffPlanner
+
+MONDAY = datetime(2026, 10, 19)
+REVENUE = {"XMR": 0.60, "HOT": 1.20}  # Per day at the 8-thread ceiling; HOT draws much more power
+
+
+@pytest.fixture
+def calendar():
+    """A weekday with a cheap night, a normal day and an expensive evening peak."""
+    return TariffCalendar({"default": 0.25, "rules": [
+        {"start": "23:00", "end": "07:00", "price": 0.10},
+        {"days": [0, 1, 2, 3, 4], "start": "17:00", "end": "21:00", "price": 0.80},
+    ], "dates": {"2026-12-25": 0.05}})
+
+
+@pytest.fixture
+def power():
+    """A power curve that climbs steeply above 6 threads."""
+    model = PowerModel()
+    for threads in (2, 4, 6, 8):
+        model.observe("XMR", threads, 20 + 5 * threads + (12 * (threads - 6) if threads > 6 else 0))
+    model.observe("HOT", 8, 240.0)
+    return model
+
+
+def share(coin, threads, ceiling):
+    return min(threads, 6) / 6 * (0.97 if threads > 6 else 1.0)  # The hashrate levels off past 6 threads (L3 exhausted)
+
+
+def test_calendar(calendar):
+    assert calendar.price_at(MONDAY.replace(hour=2)) == 0.10
+    assert calendar.price_at(MONDAY.replace(hour=23, minute=30)) == 0.10  # Wraps midnight
+    assert calendar.price_at(MONDAY.replace(hour=18)) == 0.80
+    assert calendar.price_at(MONDAY.replace(hour=12)) == 0.25
+    assert calendar.price_at(datetime(2026, 10, 24, 18)) == 0.25  # Saturday: no peak
+    assert calendar.price_at(datetime(2026, 12, 25, 18)) == 0.05
+    assert calendar.average_price(MONDAY.replace(hour=6, minute=30), MONDAY.replace(hour=7, minute=30)) == pytest.approx(0.175)
+
+
+def test_power_model(power):
+    assert power.watts("XMR", 5) == (power.watts("XMR", 4) + power.watts("XMR", 6)) / 2
+    # One measurement scales the estimate for other thread counts
+    assert power.watts("HOT", 4) == pytest.approx(240.0 * power.estimate("HOT", 4) / power.estimate("HOT", 8))
+
+
+def test_plan(calendar, power):
+    plan = TariffPlanner(calendar, power, share).make_plan(MONDAY, REVENUE, ceiling=8)
+    by_hour = {slot.start.hour: slot for slot in plan}
+    assert by_hour[2].coin == "HOT"  # Cheap night: the power-hungry coin's extra revenue pays
+    assert by_hour[12].coin == "XMR" and by_hour[12].threads == 6  # Day: the efficient coin, without the steep threads
+    assert by_hour[18].coin is None  # Peak: nothing covers 0.80/kWh
+    always_on = sum(REVENUE["XMR"] / 24 - power.watts("XMR", 8) / 1000 * slot.price for slot in plan)
+    assert sum(slot.net_per_hour for slot in plan) > always_on
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from wa_thermal import ThermalGovernor
+
+
+class ThermalModel:
+    """First-order package temperature: ambient + heat from miner threads and any external load."""
+    def __init__(self, ambient=40.0, per_thread=4.0, time_constant=90.0, per_thread_hashrate=1000.0):
+        self.ambient = ambient
+        self.per_thread = per_thread
+        self.time_constant = time_constant
+        self.per_thread_hashrate = per_thread_hashrate
+        self.temp = ambient
+
+    def step(self, threads, dt, load=0.0):
+        target = self.ambient + load + self.per_thread * threads
+        self.temp += (target - self.temp) * min(dt / self.time_constant, 1.0)
+        return self.temp
+
+
+def default_scenario(t):
+    """(external load °C, ambient offset °C) at t seconds: a game from 30 to 90 minutes, a warmer room after 2 hours."""
+    load = 10.0 if 1800 <= t < 5400 else 0.0
+    ambient = 3.0 if t >= 7200 else 0.0
+    return load, ambient
+
+
+def simulate(policy, limit=67.0, lower=60.0, max_threads=8, start_threads=6, hours=3.0, tick=15.0, dt=1.0,
+             restart_penalty=20.0, live_penalty=2.0, noise=0.3, seed=1, scenario=default_scenario):
+    """
+    Run a policy against ThermalModel with a noisy sensor. "bang_bang" is amain's old rule
+    (-1 thread over limit, +1 at or below lower, each change a restart: restart_penalty
+    seconds without hashrate while the dataset is rebuilt at full heat); "pid" scales threads
+    from PidThermalController with live thread changes (live_penalty seconds while xmrig
+    re-creates its workers).
+    Returns lost hashrate-minutes (against max_threads at full speed), °C-minutes over the limit and changes.
+    """
+    rng = random.Random(seed)
+    model = ThermalModel()
+    base_ambient = model.ambient
+    governor = ThermalGovernor(limit, 90.0)  # No GPU sensor in the model; its controller stays at 1
+    threads = start_threads if policy == "bang_bang" else max_threads
+    down_until = 0.0
+    lost = over = 0.0
+    changes = 0
+    next_tick = 0.0
+    steps = int(hours * 3600 / dt)
+    for step in range(steps):
+        now = step * dt
+        load, ambient = scenario(now)
+        model.ambient = base_ambient + ambient
+        temp = model.step(threads, dt, load)
+        hashrate = model.per_thread_hashrate * threads if now >= down_until else 0.0
+        lost += (model.per_thread_hashrate * max_threads - hashrate) * dt / 60
+        over += max(temp - limit, 0.0) * dt / 60
+        if now < next_tick:
+            continue
+        next_tick = now + tick
+        temp = temp + rng.gauss(0.0, noise)
+        new_threads = threads
+        if policy == "bang_bang":
+            if temp > limit and threads > 1:
+                new_threads = threads - 1
+            elif temp <= lower and threads < max_threads:
+                new_threads = threads + 1
+            if new_threads != threads:
+                down_until = now + restart_penalty
+        else:
+            new_threads, _, _ = governor.plan(now, temp, None, max_threads, threads)
+            if new_threads != threads:
+                down_until = now + live_penalty
+        if new_threads != threads:
+            threads = new_threads
+            changes += 1
+    return {"policy": policy, "lost_hashrate_minutes": lost, "degree_minutes_over": over, "changes": changes, "final_threads": threads}
+
+
+def mean_results(policy, seeds=range(1, 9), **kwargs):
+    """Mean results of a policy over several sensor-noise seeds."""
+    runs = [simulate(policy, seed=seed, **kwargs) for seed in seeds]
+    return {key: sum(r[key] for r in runs) / len(runs) for key in runs[0] if key != "policy"}
+
+
+@pytest.fixture(scope="module")
+def policies():
+    return mean_results("bang_bang"), mean_results("pid")
+
+
+def test_pid_loses_less_hashrate_than_the_old_rule(policies):
+    bang_bang, pid = policies
+    assert pid["lost_hashrate_minutes"] < bang_bang["lost_hashrate_minutes"]
+
+
+def test_pid_does_not_run_hotter_than_the_old_rule(policies):
+    bang_bang, pid = policies
+    assert pid["degree_minutes_over"] <= bang_bang["degree_minutes_over"]
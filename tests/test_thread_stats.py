@@ -0,0 +1,41 @@
+import numpy as np
+
+from wa_thread_stats import ThreadHashrateCollector
+
+THREADS = 16
+
+
+def test_smt_siblings_are_flagged_and_a_throttled_thread_is_not():
+    """8P+8E-style run: odd threads are SMT siblings at ~70%, thread 4 is throttled half the time."""
+    rng = np.random.default_rng(1)
+    collector = ThreadHashrateCollector("synthetic", "XMR", downsample_every=30)
+    base = np.full(THREADS, 1000.0)
+    base[1::2] = 700.0
+    for i in range(2000):
+        rates = base * rng.normal(1.0, 0.03, THREADS)
+        if i % 2:
+            rates[4] *= 0.6  # Below the ratio in ~50% of samples: not consistent
+        collector.add(i * 10.0, rates.tolist(), affinity=list(range(THREADS)))
+    recommendation = collector.recommend()
+    assert recommendation["slow_threads"] == list(range(1, THREADS, 2))
+    assert recommendation["affinity_mask"] == sum(1 << c for c in range(0, THREADS, 2))
+
+
+def test_uniform_threads_give_no_recommendation():
+    rng = np.random.default_rng(1)
+    collector = ThreadHashrateCollector("synthetic", "WOW")
+    for i in range(200):
+        collector.add(i * 10.0, (np.full(THREADS, 1000.0) * rng.normal(1.0, 0.03, THREADS)).tolist())
+    assert collector.recommend() is None
+
+
+def test_history_survives_a_restart(tmp_path):
+    collector = ThreadHashrateCollector("h1", "XMR")
+    for i in range(45):
+        collector.add(i * 10.0, [1000.0 + i, 700.0], affinity=[0, 1])
+    collector.save(str(tmp_path))
+    resumed = ThreadHashrateCollector.load("h1", "XMR", str(tmp_path))
+    assert np.array_equal(resumed.raw.values, collector.raw.values, equal_nan=True)
+    assert np.array_equal(resumed.coarse.timestamps, collector.coarse.timestamps, equal_nan=True)
+    assert (resumed.threads, resumed.since_downsample) == (collector.threads, collector.since_downsample)
+    assert ThreadHashrateCollector.load("h1", "WOW", str(tmp_path)).raw.count == 0
@@ -0,0 +1,151 @@
+# wa_arbiter.py
+# Resource arbiter: CPU priority, I/O priority and affinity for miners, the screen recorder and steamcmd updates by role and state.
+import os
+
+DEBUG = False
+ARBITER_RECORDER_CPUS = 2  # Logical CPUs reserved for the recorder's capture loop while it runs (from CPU 0)
+ARBITER_RECORDER_SCRIPT = "wa_recorder_grok.py"  # Recorder processes: python with this script on the command line
+ARBITER_UPDATER_NAMES = ("steamcmd.exe", "steamcmd", "steamcmd.sh", "steamcmd_linux")
+
+# States, most important first: the first active one picks the policy row
+ARBITER_STATES = ("game", "recording", "updating", "idle")
+
+# role -> state -> (CPU priority, I/O priority, CPUs). CPUs: "all", "recorder" (the reserved
+# ones) or "shared" (all but the reserved ones). The miner's CPU priority joins its thermal/idle/game
+# caps (lowest wins), and a game profile's affinity takes precedence over "shared".
+ARBITER_POLICY = {
+    "miner": {
+        "game": ("idle", "idle", "shared"),
+        "recording": ("below_normal", "low", "shared"),
+        "updating": ("below_normal", "idle", "all"),  # steamcmd is disk/network bound; keep the miner off the disk queue
+        "idle": ("normal", "normal", "all"),
+    },
+    "recorder": {
+        "game": ("above_normal", "normal", "recorder"),
+        "recording": ("above_normal", "normal", "recorder"),
+        "updating": ("normal", "normal", "all"),
+        "idle": ("normal", "normal", "all"),
+    },
+    "updater": {
+        "game": ("idle", "idle", "shared"),  # Updates must not stutter a session someone is playing
+        "recording": ("below_normal", "low", "shared"),
+        "updating": ("normal", "normal", "all"),
+        "idle": ("normal", "normal", "all"),
+    },
+}
+
+PRIORITY_ORDER = ["above_normal", "normal", "below_normal", "idle"]
+
+
+def priority_level(priority):
+    """psutil nice() value for a priority name: Windows priority classes, nice levels elsewhere."""
+    import psutil
+    if os.name == "nt":
+        return {"above_normal": psutil.ABOVE_NORMAL_PRIORITY_CLASS, "normal": psutil.NORMAL_PRIORITY_CLASS,
+                "below_normal": psutil.BELOW_NORMAL_PRIORITY_CLASS, "idle": psutil.IDLE_PRIORITY_CLASS}[priority]
+    return {"above_normal": -5, "normal": 0, "below_normal": 10, "idle": 19}[priority]
+
+
+def io_level(io):
+    """psutil ionice() arguments for an I/O priority name."""
+    import psutil
+    if os.name == "nt":
+        return ({"normal": psutil.IOPRIO_NORMAL, "low": psutil.IOPRIO_LOW, "idle": psutil.IOPRIO_VERYLOW}[io],)
+    if io == "idle":
+        return (psutil.IOPRIO_CLASS_IDLE,)
+    return (psutil.IOPRIO_CLASS_BE, 4 if io == "normal" else 7)
+
+
+def resolve_cpus(cpus, cpu_count, reserved=ARBITER_RECORDER_CPUS):
+    """CPU list for a policy's CPUs name; no reservation on machines too small to spare it."""
+    if cpus == "all" or cpu_count <= reserved:
+        return list(range(cpu_count))
+    if cpus == "recorder":
+        return list(range(reserved))
+    return list(range(reserved, cpu_count))
+
+
+def current_state(game=False, recording=False, updating=False):
+    active = {"game": game, "recording": recording, "updating": updating, "idle": True}
+    return next(state for state in ARBITER_STATES if active[state])
+
+
+def find_processes():
+    """{role: [pids]} for the recorder and steamcmd; the switcher adds the miner's own pids."""
+    import psutil
+    found = {"recorder": [], "updater": []}
+    for proc in psutil.process_iter(["name", "cmdline"]):
+        try:
+            name = (proc.info["name"] or "").lower()
+            if name in ARBITER_UPDATER_NAMES:
+                found["updater"].append(proc.pid)
+            elif "python" in name and any(ARBITER_RECORDER_SCRIPT in arg for arg in proc.info["cmdline"] or []):
+                found["recorder"].append(proc.pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return found
+
+
+class ResourceArbiter:
+    """
+    Applies ARBITER_POLICY to managed processes. Each pid remembers what it was given, so a
+    step only calls into the OS when the state changed or the process is new (a restarted
+    miner, a new steamcmd run).
+    """
+    def __init__(self, cpu_count=None):
+        import psutil
+        self.cpu_count = cpu_count or psutil.cpu_count() or 1
+        self.applied = {}  # pid -> (priority, io, cpus) last applied
+        self.state = "idle"
+
+    def policy(self, role, state=None):
+        """(priority, io, cpu list) for role in state (default: the current one)."""
+        priority, io, cpus = ARBITER_POLICY[role][state or self.state]
+        return priority, io, resolve_cpus(cpus, self.cpu_count)
+
+    def update(self, game=False, recording=False, updating=False):
+        state = current_state(game, recording, updating)
+        if state != self.state:
+            print(f"Resource arbiter: {self.state} -> {state}")
+            self.state = state
+        return state
+
+    def apply(self, role, pids, priority=True, io=True, affinity=True):
+        """
+        Give pids (and their children) role's policy for the current state. priority/io/affinity
+        False leave that setting to someone else (the miner controller's caps). Returns the
+        number of processes changed.
+        """
+        import psutil
+        wanted_priority, wanted_io, wanted_cpus = self.policy(role)
+        wanted = (wanted_priority if priority else None, wanted_io if io else None, tuple(wanted_cpus) if affinity else None)
+        changed = 0
+        for pid in pids:
+            try:
+                parent = psutil.Process(pid)
+                processes = [parent] + parent.children(recursive=True)
+            except psutil.NoSuchProcess:
+                continue
+            for process in processes:
+                if self.applied.get(process.pid) == wanted:
+                    continue
+                try:
+                    if priority:
+                        process.nice(priority_level(wanted_priority))
+                    if io:
+                        process.ionice(*io_level(wanted_io))
+                    if affinity:
+                        available = psutil.cpu_count() or 1
+                        process.cpu_affinity([cpu for cpu in wanted_cpus if cpu < available] or list(range(available)))
+                    self.applied[process.pid] = wanted
+                    changed += 1
+                    if DEBUG:
+                        print(f"Arbiter: {role} pid {process.pid} -> {wanted} ({self.state})")
+                except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError, AttributeError) as e:
+                    print(f"Error applying {role} policy to pid {process.pid}: {e}")
+                    self.applied[process.pid] = wanted  # Do not retry every step
+        return changed
+
+    def forget_exited(self):
+        import psutil
+        self.applied = {pid: value for pid, value in self.applied.items() if psutil.pid_exists(pid)}
@@ -0,0 +1,176 @@
+# wa_autotuner.py
+# Per (host, coin) thread-count autotuner: learns hashrate and temperature per thread count and settles on the best one under the limit.
+import json
+import os
+import time
+
+DEBUG = False
+AUTOTUNE_DIR = "autotune"
+AUTOTUNE_SETTLE = 120  # Seconds ignored after a thread change (xmrig's 10s window, heat soak)
+AUTOTUNE_MEASURE = 300  # Seconds of samples per measurement
+AUTOTUNE_TEMP_PERCENTILE = 0.8  # Temperature of a measurement: this percentile of its samples
+AUTOTUNE_EMERGENCY_MARGIN = 3.0  # Step down at once when a single sample is this far over the limit
+AUTOTUNE_MIN_GAIN = 0.01  # An extra thread must add at least this share of hashrate to be worth its heat
+AUTOTUNE_REEXPLORE_AFTER = 6 * 3600  # Forget "too hot" marks older than this (ambient temperature changes)
+AUTOTUNE_SMOOTHING = 0.5  # Weight of a new measurement when a thread count is measured again
+
+
+class ThreadAutotuner:
+    """
+    Hill climb over thread counts for one host and coin. Every thread count gets a
+    measurement (mean hashrate, temperature) once it has settled; the tuner steps up while
+    the next count is predicted to stay under temp_limit and adds hashrate, steps down when
+    a count runs hot, and otherwise holds the best known count. Results persist as JSON so
+    the next session starts at the best count instead of exploring again.
+    """
+    def __init__(self, hostname, coin, temp_limit, min_threads=1, max_threads=64, folder=AUTOTUNE_DIR):
+        self.hostname = hostname
+        self.coin = coin
+        self.temp_limit = temp_limit
+        self.min_threads = min_threads
+        self.max_threads = max_threads
+        self.folder = folder
+        self.stats = {}  # threads -> {"hashrate", "temp", "measurements", "too_hot", "updated"}
+        self.threads = None  # Thread count being measured
+        self.since = None  # When it started running
+        self.samples = []  # (timestamp, hashrate, temp) after the settle time
+
+    def begin(self, threads, now=None):
+        """The miner (re)started or changed to threads: start a new measurement."""
+        self.threads = threads
+        self.since = now if now is not None else time.time()
+        self.samples = []
+
+    def start_threads(self, default):
+        """Thread count to start a session with: the best known one, else default."""
+        best = self.best()
+        return best if best is not None else default
+
+    def best(self):
+        """Fewest threads within AUTOTUNE_MIN_GAIN of the highest hashrate among counts that stayed under the limit."""
+        cool = {n: s["hashrate"] for n, s in self.stats.items()
+                if not s["too_hot"] and s["hashrate"] and self.min_threads <= n <= self.max_threads}
+        if not cool:
+            return None
+        top = max(cool.values())
+        return min(n for n, hr in cool.items() if hr >= top * (1 - AUTOTUNE_MIN_GAIN))
+
+    def temp_slope(self):
+        """Learned °C per thread from measured counts (least squares), None with fewer than two."""
+        points = [(n, s["temp"]) for n, s in self.stats.items() if s["temp"] is not None]
+        if len(points) < 2:
+            return None
+        mean_n = sum(n for n, _ in points) / len(points)
+        mean_t = sum(t for _, t in points) / len(points)
+        var = sum((n - mean_n) ** 2 for n, _ in points)
+        return sum((n - mean_n) * (t - mean_t) for n, t in points) / var if var else None
+
+    def predicted_temp(self, threads):
+        if threads in self.stats and self.stats[threads]["temp"] is not None:
+            return self.stats[threads]["temp"]
+        known = [n for n, s in self.stats.items() if s["temp"] is not None]
+        slope = self.temp_slope()
+        if not known or slope is None:
+            return None
+        nearest = min(known, key=lambda n: abs(n - threads))
+        return self.stats[nearest]["temp"] + max(slope, 0.0) * (threads - nearest)
+
+    def observe(self, now, threads, hashrate, temp):
+        """
+        Feed one sample from the main loop. Returns the thread count to switch to, or None to
+        keep the current one.
+        """
+        if threads != self.threads or self.since is None:
+            self.begin(threads, now)
+        if temp is not None and temp > self.temp_limit + AUTOTUNE_EMERGENCY_MARGIN and threads > self.min_threads:
+            self.record(threads, None, temp, too_hot=True, now=now)
+            print(f"Autotune {self.coin}: {temp}°C with {threads} threads, stepping down now")
+            return self.decide(threads)
+        if now - self.since < AUTOTUNE_SETTLE:
+            return None
+        if hashrate:
+            self.samples.append((now, hashrate, temp))
+        if now - self.since < AUTOTUNE_SETTLE + AUTOTUNE_MEASURE or not self.samples:
+            return None
+        hashrates = [hr for _, hr, _ in self.samples]
+        temps = sorted(t for _, _, t in self.samples if t is not None)
+        measured_temp = temps[min(int(len(temps) * AUTOTUNE_TEMP_PERCENTILE), len(temps) - 1)] if temps else None
+        self.record(threads, sum(hashrates) / len(hashrates), measured_temp,
+                    too_hot=measured_temp is not None and measured_temp > self.temp_limit, now=now)
+        self.since = now - AUTOTUNE_SETTLE  # Keep measuring the same count without another settle
+        self.samples = []
+        return self.decide(threads)
+
+    def record(self, threads, hashrate, temp, too_hot, now=None):
+        entry = self.stats.get(threads)
+        if entry is None:
+            entry = self.stats[threads] = {"hashrate": hashrate, "temp": temp, "measurements": 0, "too_hot": too_hot}
+        else:
+            for key, value in (("hashrate", hashrate), ("temp", temp)):
+                if value is not None:
+                    entry[key] = value if entry[key] is None else entry[key] + AUTOTUNE_SMOOTHING * (value - entry[key])
+            entry["too_hot"] = too_hot
+        entry["measurements"] += 1
+        entry["updated"] = now if now is not None else time.time()
+        if DEBUG:
+            print(f"Autotune {self.coin}: {threads} threads -> {entry}")
+        self.save()
+
+    def decide(self, threads):
+        """Next thread count after a measurement at threads, None to stay."""
+        entry = self.stats[threads]
+        if entry["too_hot"]:
+            lower = threads - 1
+            return lower if lower >= self.min_threads else None
+        self.expire(entry["updated"])
+        upper = threads + 1
+        if upper <= self.max_threads:
+            above = self.stats.get(upper)
+            predicted = self.predicted_temp(upper)
+            unmeasured = above is None or (above["hashrate"] is None and not above["too_hot"])
+            if unmeasured and (predicted is None or predicted <= self.temp_limit):
+                return upper  # Unexplored (or its emergency mark expired) and predicted to stay cool
+        best = self.best()
+        if best is not None and best != threads:
+            return best
+        return None
+
+    def expire(self, now):
+        for entry in self.stats.values():
+            if entry["too_hot"] and now - entry["updated"] > AUTOTUNE_REEXPLORE_AFTER:
+                entry["too_hot"] = False
+
+    def path(self):
+        return os.path.join(self.folder, f"{self.hostname}_{self.coin}.json")
+
+    def save(self):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            temporary = self.path() + ".tmp"
+            with open(temporary, "w") as f:
+                json.dump({"hostname": self.hostname, "coin": self.coin, "temp_limit": self.temp_limit, "best": self.best(),
+                           "stats": {str(n): s for n, s in sorted(self.stats.items())}}, f, indent=1)
+            os.replace(temporary, self.path())
+        except OSError as e:
+            print(f"Error saving autotune state for {self.coin}: {e}")
+
+    @classmethod
+    def load(cls, hostname, coin, temp_limit, min_threads=1, max_threads=64, folder=AUTOTUNE_DIR):
+        """Tuner with the saved measurements for (hostname, coin), or an empty one."""
+        tuner = cls(hostname, coin, temp_limit, min_threads, max_threads, folder)
+        try:
+            with open(tuner.path()) as f:
+                data = json.load(f)
+            tuner.stats = {int(n): s for n, s in data.get("stats", {}).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error loading autotune state for {hostname}/{coin}: {e}")
+        return tuner
+
+    def describe(self):
+        parts = []
+        for n, s in sorted(self.stats.items()):
+            temp = f"{s['temp']:.1f}" if s["temp"] is not None else "?"
+            parts.append(f"{n}: {s['hashrate'] or 0:.0f} H/s {temp}°C{' hot' if s['too_hot'] else ''}")
+        return ", ".join(parts)
@@ -0,0 +1,169 @@
+# wa_bench_miners.py
+# Offline MinerController benchmarks and failure scenarios against wa_fake_miner.py (Linux, no DB, no real miners).
+#
+#   WA_FAKE_MINER=1 is set before wa_grok is imported, so ScreenRunSwitcher would use the fake as well.
+#   Run: python wa_bench_miners.py [throughput|restart|overhead|scenarios]
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("WA_FAKE_MINER", "1")
+
+import wa_grok
+from wa_coin_cache import CachedCoin, SupportedCoinsCache
+from wa_grok import MinerController, miner_launch, XMRIG_PATH
+from wa_supervisor import MinerSupervisor
+
+BENCH_COIN = "XMR"
+BENCH_TARGET_KH = 1.0  # rig_hr_kh for the bench coin; fake default is 1000 H/s per thread
+FAKE_ENV = ("WA_FAKE_REPLAY", "WA_FAKE_FORMAT", "WA_FAKE_HASHRATE", "WA_FAKE_INTERVAL", "WA_FAKE_SPEED",
+            "WA_FAKE_CRASH_AFTER", "WA_FAKE_HANG_AFTER", "WA_FAKE_SILENT_AFTER", "WA_FAKE_DEGRADE_AFTER",
+            "WA_FAKE_DEGRADE_FACTOR", "WA_FAKE_LINES")
+
+
+class NullSession:
+    """Stands in for the SQLAlchemy sessions MinerController uses for Events."""
+    def add(self, obj):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def fake_env(**settings):
+    """Set WA_FAKE_* variables for the next miner start (inherited by the fake miner process)."""
+    for name in FAKE_ENV:
+        os.environ.pop(name, None)
+    for key, value in settings.items():
+        os.environ[f"WA_FAKE_{key.upper()}"] = str(value)
+
+
+def make_controller(supervisor=None):
+    coins = [CachedCoin(BENCH_COIN, "bench", None, None, True, BENCH_TARGET_KH)]
+    controller = MinerController(
+        **miner_launch(XMRIG_PATH, "xmrig"),
+        cli_args={BENCH_COIN: ["--algo=rx/0", "--cpu", "--no-gpu", "--threads={threads}"]},
+        hashrate_pattern="speed",
+        hashrate_index=5,
+        session_miningDB=NullSession(),
+        session_fogplayDB=NullSession(),
+        coin_cache=SupportedCoinsCache(loader=lambda hostname: coins, hostname="bench"),
+        supervisor=supervisor or MinerSupervisor(),
+    )
+    controller.current_threads = 1
+    return controller
+
+
+def wait_for(condition, timeout, poll=0.005):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(poll)
+    return False
+
+
+def bench_throughput(lines=200_000):
+    """Lines/s the reader thread moves from the miner pipe into the stream, parser and log writer."""
+    fake_env(interval=0, lines=lines)
+    controller = make_controller()
+    started = time.perf_counter()
+    controller.start_mining(BENCH_COIN)
+    controller.output_thread.join()  # Reader exits when the fake has printed everything and exits
+    elapsed = time.perf_counter() - started
+    stats = controller.output_stream.stats()
+    controller.stop_mining()
+    print(f"throughput: {stats['published']:,} lines in {elapsed:.2f}s = {stats['published'] / elapsed:,.0f} lines/s "
+          f"(log writer dropped {stats['subscribers'].get(BENCH_COIN + '-log', {}).get('dropped', 0)})")
+
+
+def bench_restart(restarts=20):
+    """Seconds from stop_mining() + start_mining() until the first parsed hashrate."""
+    fake_env(interval=0.05)
+    controller = make_controller()
+    controller.start_mining(BENCH_COIN)
+    wait_for(lambda: controller.hashrate > 0, 10)
+    latencies = []
+    for _ in range(restarts):
+        started = time.perf_counter()
+        controller.stop_mining()
+        controller.start_mining(BENCH_COIN)
+        if wait_for(lambda: controller.hashrate > 0, 10):
+            latencies.append(time.perf_counter() - started)
+    controller.stop_mining()
+    latencies.sort()
+    print(f"restart latency: median {statistics.median(latencies) * 1000:.0f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms over {len(latencies)}/{restarts} restarts")
+
+
+def bench_overhead(seconds=30, lines_per_second=10):
+    """CPU time this process spends supervising one miner (reader, hang watchdog, log writer)."""
+    fake_env(interval=1.0 / lines_per_second)
+    controller = make_controller()
+    controller.start_mining(BENCH_COIN)
+    wait_for(lambda: controller.hashrate > 0, 10)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    controller.stop_mining()
+    print(f"supervision overhead at {lines_per_second} lines/s: {cpu / wall * 100:.2f}% of one core, "
+          f"{cpu / wall * 3600:.1f} CPU s/hour")
+
+
+def run_scenario(name, expected_kind, timeout, setup=None, **settings):
+    fake_env(**settings)
+    supervisor = MinerSupervisor()
+    controller = make_controller(supervisor)
+    if setup:
+        setup(controller)
+    started = time.monotonic()
+    controller.start_mining(BENCH_COIN)
+    record = lambda: supervisor.records.get((controller.name, BENCH_COIN))
+    detected = wait_for(lambda: record() and record().events.get(expected_kind), timeout, poll=0.05)
+    elapsed = time.monotonic() - started
+    if controller.is_mining:
+        controller.stop_mining()
+    print(f"scenario {name}: {'OK' if detected else 'FAILED'} ({expected_kind} after {elapsed:.1f}s, "
+          f"health {supervisor.score(controller.name, BENCH_COIN):.2f})")
+    return detected
+
+
+def scenarios():
+    """Crash, hang (ignores SIGTERM), silent output and degraded hashrate must each reach the supervisor."""
+    drop_duration = wa_grok.HASHRATE_DROP_DURATION
+    wa_grok.HASHRATE_DROP_DURATION = 1
+    try:
+        def short_timeout(controller):
+            controller.OUTPUT_TIMEOUT = 2
+        results = [
+            run_scenario("crash", "crash", 10, interval=0.05, crash_after=0.5),
+            run_scenario("hang", "hang", 20, short_timeout, interval=0.05, hang_after=0.5),
+            run_scenario("silent", "hang", 20, short_timeout, interval=0.05, silent_after=0.5),
+            run_scenario("degraded", "low_hashrate", 20, interval=0.05, degrade_after=0.5, degrade_factor=0.1),
+        ]
+    finally:
+        wa_grok.HASHRATE_DROP_DURATION = drop_duration
+    return all(results)
+
+
+if __name__ == "__main__":
+    wa_grok.DEBUG = False
+    wa_grok.PRINT_MINER_LOG = False
+    os.chdir(tempfile.mkdtemp(prefix="wa_bench_"))  # Miner logs go to ./logs
+    which = sys.argv[1] if len(sys.argv) > 1 else "all"
+    if which in ("all", "throughput"):
+        bench_throughput()
+    if which in ("all", "restart"):
+        bench_restart()
+    if which in ("all", "overhead"):
+        bench_overhead()
+    if which in ("all", "scenarios"):
+        sys.exit(0 if scenarios() else 1)
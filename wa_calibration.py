@@ -0,0 +1,143 @@
+# wa_calibration.py
+# Calibration mode: run each enabled coin for a window, measure steady-state hashrate and write it back to rig_hr_kh.
+import argparse
+import time
+
+from sqlalchemy.dialects.postgresql import insert
+
+from wa_definitions import SupportedCoins
+
+DEBUG = False
+CALIBRATION_WINDOW = 600  # Seconds each coin runs
+CALIBRATION_WARMUP = 120  # Seconds discarded at the start (dataset init, JIT, pool connect, thermal settle)
+CALIBRATION_TRIM = 0.1  # Fraction cut from each end before averaging
+MIN_CALIBRATION_SAMPLES = 10  # Fewer steady-state samples than this leaves rig_hr_kh unchanged
+
+
+def robust_hashrate(samples, started_at, warmup=CALIBRATION_WARMUP, trim=CALIBRATION_TRIM):
+    """
+    Trimmed mean of (timestamp, hashrate) samples taken after the warm-up, with the number of
+    samples used. None if there are fewer than MIN_CALIBRATION_SAMPLES.
+    """
+    steady = sorted(hr for t, hr in samples if t >= started_at + warmup and hr is not None and hr > 0)
+    if len(steady) < MIN_CALIBRATION_SAMPLES:
+        return None, len(steady)
+    cut = int(len(steady) * trim)
+    kept = steady[cut:len(steady) - cut] if cut else steady
+    return sum(kept) / len(kept), len(kept)
+
+
+def calibrate_coin(controller, coin, window=CALIBRATION_WINDOW, warmup=CALIBRATION_WARMUP, threads=None, poll=1.0):
+    """
+    Run coin on controller for window seconds and return
+    {"coin", "threads", "hashrate" (H/s or None), "samples", "error"}.
+    Low-hashrate restarts are suspended while calibrating, crashes end the run early.
+    """
+    samples = []
+    previous_threads = controller.current_threads
+    if threads:
+        controller.current_threads = threads
+    if controller.is_mining:
+        controller.stop_mining()
+    controller.calibrating = True
+    controller.hashrate_listener = lambda t, hr: samples.append((t, hr))
+    used_threads = controller.current_threads
+    started_at = time.time()
+    error = None
+    try:
+        if not controller.start_mining(coin):
+            error = "start failed"
+        else:
+            while time.time() - started_at < window:
+                if not controller.is_mining:
+                    error = f"miner stopped after {time.time() - started_at:.0f}s"
+                    break
+                time.sleep(poll)
+    finally:
+        if controller.is_mining:
+            controller.stop_mining()
+        controller.calibrating = False
+        controller.hashrate_listener = None
+        controller.current_threads = previous_threads
+    hashrate, used = robust_hashrate(samples, started_at, warmup) if not error else (None, 0)
+    if hashrate is None and not error:
+        error = f"only {used} samples after warm-up"
+    return {"coin": coin, "threads": used_threads, "hashrate": hashrate, "samples": used, "error": error}
+
+
+def upsert_rig_hr_kh(session, coin, hashrate):
+    """Write hashrate (H/s) as rig_hr_kh for a CachedCoin's SupportedCoins row, inserting it if it is missing."""
+    statement = insert(SupportedCoins).values(
+        symbol=coin.symbol,
+        worker=coin.worker,
+        command_start=coin.command_start,
+        command_stop=coin.command_stop,
+        enabled=coin.enabled,
+        rig_hr_kh=round(hashrate / 1000, 3),
+    ).on_conflict_do_update(
+        index_elements=[SupportedCoins.symbol, SupportedCoins.worker, SupportedCoins.command_start],
+        set_={"rig_hr_kh": round(hashrate / 1000, 3)},
+    )
+    try:
+        session.execute(statement)
+        session.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating rig_hr_kh for {coin.symbol}: {e}")
+        session.rollback()
+        return False
+
+
+def run_calibration(coins, miner_for_coin, session=None, window=CALIBRATION_WINDOW, warmup=CALIBRATION_WARMUP,
+                    threads=None, on_updated=None, log_event=None):
+    """
+    Calibrate every CachedCoin in coins with the controller miner_for_coin(symbol) returns.
+    Results are written to SupportedCoins unless session is None (dry run); on_updated runs
+    once afterwards so the local mirror and coin cache pick up the new values.
+    """
+    results = []
+    for coin in coins:
+        controller = miner_for_coin(coin.symbol)
+        if controller is None:
+            print(f"Calibration: no miner for {coin.symbol}, skipping")
+            continue
+        print(f"Calibration: {coin.symbol} for {window}s ({warmup}s warm-up)...")
+        result = calibrate_coin(controller, coin.symbol, window, warmup, threads)
+        result["previous"] = coin.rig_hr_kh * 1000 if coin.rig_hr_kh is not None else None
+        result["saved"] = False
+        if result["hashrate"] is not None and session is not None:
+            result["saved"] = upsert_rig_hr_kh(session, coin, result["hashrate"])
+        if log_event:
+            log_event("calibration", f"{coin.symbol}: {result['hashrate'] or 0:.0f} H/s with {result['threads']} threads "
+                                     f"(was {result['previous'] or 0:.0f}){' - ' + result['error'] if result['error'] else ''}")
+        results.append(result)
+    if on_updated and any(r["saved"] for r in results):
+        on_updated()
+    print(f"{'coin':<10}{'threads':>8}{'previous H/s':>14}{'measured H/s':>14}{'samples':>9}  status")
+    for r in results:
+        status = r["error"] or ("saved" if r["saved"] else "dry run")
+        print(f"{r['coin']:<10}{r['threads']:>8}{r['previous'] or 0:>14.0f}{r['hashrate'] or 0:>14.0f}{r['samples']:>9}  {status}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure steady-state hashrate per coin and update rig_hr_kh")
+    parser.add_argument("--coins", help="Comma-separated symbols (default: all enabled coins for this worker)")
+    parser.add_argument("--window", type=float, default=CALIBRATION_WINDOW)
+    parser.add_argument("--warmup", type=float, default=CALIBRATION_WARMUP)
+    parser.add_argument("--threads", type=int, help="Fixed thread count (default: the controller's current count)")
+    parser.add_argument("--dry-run", action="store_true", help="Measure only, do not write rig_hr_kh")
+    args = parser.parse_args()
+    from wa_grok import ScreenRunSwitcher
+    switcher = ScreenRunSwitcher()
+    coins = switcher.coin_cache.enabled_coins()
+    if args.coins:
+        wanted = set(args.coins.split(","))
+        coins = [coin for coin in coins if coin.symbol in wanted]
+    run_calibration(coins, switcher.get_miner_for_coin, None if args.dry_run else switcher.session_miningDB,
+                    args.window, args.warmup, args.threads, on_updated=switcher.refresh_supported_coins,
+                    log_event=switcher.log_event)
+
+
+if __name__ == "__main__":
+    main()
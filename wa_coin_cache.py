@@ -0,0 +1,125 @@
+# wa_coin_cache.py
+import threading
+import time
+
+from wa_definitions import SupportedCoins
+
+DEBUG = False
+SUPPORTED_COINS_TTL = 300  # Seconds before the per-host SupportedCoins snapshot is reloaded
+
+
+class CachedCoin:
+    """In-memory copy of a SupportedCoins row, detached from any DB session."""
+    def __init__(self, symbol, worker, command_start, command_stop, enabled, rig_hr_kh):
+        self.symbol = symbol
+        self.worker = worker
+        self.command_start = command_start
+        self.command_stop = command_stop
+        self.enabled = enabled
+        self.rig_hr_kh = rig_hr_kh
+
+    def __repr__(self):
+        return f"CachedCoin({self.symbol}, worker={self.worker}, enabled={self.enabled}, rig_hr_kh={self.rig_hr_kh})"
+
+    @property
+    def is_enabled(self):
+        return self.enabled is None or bool(self.enabled)
+
+
+def by_command_start(coin):
+    """Row order within a symbol: the table's key is (symbol, worker, command_start), rows without a command last."""
+    return coin.command_start is None, coin.command_start or ""
+
+
+def pick_row(rows):
+    """First enabled row, else the first row; None for no rows."""
+    return next((coin for coin in rows if coin.is_enabled), rows[0] if rows else None)
+
+
+def load_supported_coins_from_db(session, hostname):
+    """Load all SupportedCoins rows for one worker as CachedCoin objects."""
+    rows = session.query(SupportedCoins).filter(SupportedCoins.worker == hostname).all()
+    return [CachedCoin(r.symbol, r.worker, r.command_start, r.command_stop, r.enabled, r.rig_hr_kh) for r in rows]
+
+
+class SupportedCoinsCache:
+    """
+    Per-host SupportedCoins snapshot loaded once and refreshed on a TTL or on notify.
+
+    The whole table for this worker is loaded in one query, so a symbol that is not
+    in the snapshot is a cached negative result until the next refresh. A symbol can
+    have several rows (one per command_start); they are kept in command_start order
+    and get() picks the first enabled one, so lookups do not depend on load order.
+    """
+    def __init__(self, loader, hostname, ttl=SUPPORTED_COINS_TTL):
+        self.loader = loader  # Callable(hostname) -> list of CachedCoin
+        self.hostname = hostname
+        self.ttl = ttl
+        self.coins = {}  # symbol -> CachedCoin rows sorted by by_command_start
+        self.loaded_at = None
+        self.stale = True
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        """Force a reload on the next lookup (e.g. after a supported_coins update notification)."""
+        self.stale = True
+        if DEBUG:
+            print("SupportedCoins cache invalidated")
+
+    def refresh(self):
+        """Reload the snapshot. Keeps the previous snapshot if the loader fails."""
+        try:
+            coins = self.loader(self.hostname)
+        except Exception as e:
+            print(f"Error refreshing SupportedCoins cache for {self.hostname}: {e}")
+            # Retry after another TTL instead of hammering the DB on every lookup
+            self.loaded_at = time.time()
+            self.stale = False
+            return False
+        grouped = {}
+        for coin in sorted(coins, key=by_command_start):
+            grouped.setdefault(coin.symbol, []).append(coin)
+        with self.lock:
+            self.coins = grouped
+            self.loaded_at = time.time()
+            self.stale = False
+        if DEBUG:
+            print(f"SupportedCoins cache loaded {len(self.coins)} coins for {self.hostname}")
+        return True
+
+    def _ensure_fresh(self):
+        if self.stale or self.loaded_at is None or time.time() - self.loaded_at >= self.ttl:
+            self.refresh()
+
+    def rows(self, symbol):
+        """Every CachedCoin row of symbol for this worker, in command_start order."""
+        self._ensure_fresh()
+        with self.lock:
+            return list(self.coins.get(symbol, ()))
+
+    def get(self, symbol):
+        """The first enabled row of symbol, else its first row; None if this worker has no row for it."""
+        return pick_row(self.rows(symbol))
+
+    def get_target_hashrate(self, symbol):
+        """Target hashrate in H/s, or None if unknown."""
+        coin = self.get(symbol)
+        if coin is None or coin.rig_hr_kh is None:
+            return None
+        return coin.rig_hr_kh * 1000
+
+    def get_command_start(self, symbol):
+        coin = self.get(symbol)
+        return coin.command_start if coin else None
+
+    def is_enabled(self, symbol):
+        """True if any row of symbol is enabled (NULL counts as enabled); coins without a row are disabled."""
+        coin = self.get(symbol)
+        return coin is not None and coin.is_enabled
+
+    def enabled_coins(self):
+        """One enabled CachedCoin per symbol for this worker, the row get() would pick."""
+        self._ensure_fresh()
+        with self.lock:
+            picked = [pick_row(rows) for rows in self.coins.values()]
+        return [coin for coin in picked if coin.is_enabled]
@@ -0,0 +1,243 @@
+# wa_coordinator.py
+# Optional fleet service: computes coin assignments for all workers in one pass and publishes them.
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from wa_cred import USE_MQTT, MQTT_BROKER, MQTT_PORT, MQTT_USER, MQTT_PASSWORD
+from wa_definitions import engine_miningDB, BestCoinsForRigView, MQTT_ASSIGNMENT_TOPIC
+from wa_profitability import default_engine, fill_missing, load_hashrate_matrix
+from wa_netstats_poller import NetworkStatsPoller
+
+if USE_MQTT: import paho.mqtt.client as mqtt
+
+DEBUG = True
+COORDINATOR_INTERVAL = 60  # Seconds between assignment passes
+HTTP_PORT = 37400  # Set to None to disable the HTTP endpoint
+HYSTERESIS = 1.025  # Same bonus the rigs give their current coin
+MIN_DWELL = 600  # Seconds a worker keeps an assignment before it may switch again
+
+
+def compute_assignments(revenue, current, assigned_at, now, hysteresis=HYSTERESIS, min_dwell=MIN_DWELL):
+    """
+    Pick a coin per worker from a workers x coins revenue matrix.
+
+    revenue: float array (W, C), NaN where the coin is not available to the worker.
+    current: int array (W,), current coin index per worker or -1.
+    assigned_at: float array (W,), time the current assignment was made.
+
+    Returns (new assignment int array (W,), switched bool array (W,)).
+    """
+    n_workers = revenue.shape[0]
+    rows = np.arange(n_workers)
+    scores = np.where(np.isnan(revenue), -np.inf, revenue)
+    has_current = current >= 0
+    current_idx = np.where(has_current, current, 0)
+    current_score = np.where(has_current, scores[rows, current_idx], -np.inf)
+    boosted = scores.copy()
+    boosted[rows[has_current], current_idx[has_current]] = current_score[has_current] * hysteresis
+    best = np.argmax(boosted, axis=1)
+    best_score = boosted[rows, best]
+    best = np.where(np.isneginf(best_score), -1, best)
+    # A worker may only leave a still-valid coin after its dwell time
+    current_valid = has_current & ~np.isneginf(current_score)
+    dwell_done = (now - assigned_at) >= min_dwell
+    may_switch = ~current_valid | dwell_done
+    new = np.where(may_switch, best, current)
+    switched = new != current
+    return new, switched
+
+
+class FleetCoordinator:
+    def __init__(self, hysteresis=HYSTERESIS, min_dwell=MIN_DWELL, local_profitability=False):
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.poller = NetworkStatsPoller() if local_profitability else None
+        self.engine = default_engine(network_cache=self.poller.cache) if local_profitability else None
+        self.fell_back = []  # Coins the engine could not price, ranked by the view's rev_rig_correct (rescaled) instead
+        self.Session_miningDB = sessionmaker(bind=engine_miningDB)
+        self.workers = []
+        self.coins = []
+        self.current = np.zeros(0, dtype=np.int64)
+        self.assigned_at = np.zeros(0, dtype=np.float64)
+        self.assignments = {}  # worker -> payload dict, served over HTTP
+        self.lock = threading.Lock()
+        self.mqtt_client = None
+        if USE_MQTT:
+            self.mqtt_client = mqtt.Client()
+            self.mqtt_client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
+
+    def load_revenue_matrix(self):
+        """
+        Workers x coins revenue: the best_coins_for_rig view, or with local profitability the
+        engine's values, falling back to the view for pairs the engine cannot price.
+        """
+        view = self.load_view_revenue()
+        if not self.engine:
+            return view
+        with self.Session_miningDB() as session:
+            workers, coins, hashrates = load_hashrate_matrix(session)
+        self.poller.check_coverage(coins)
+        workers, coins, revenue, fell_back = fill_missing((workers, coins, self.engine.revenue_matrix(coins, hashrates)), view)
+        if fell_back != self.fell_back:
+            print(f"Local profitability has no inputs for {', '.join(fell_back) or 'no coins'}; using rev_rig_correct from the view "
+                  f"for them, scaled by the engine/view ratio where both price the same pairs")
+            self.fell_back = fell_back
+        return workers, coins, revenue
+
+    def load_view_revenue(self):
+        """One query for every worker's best-coin rows, pivoted into a workers x coins matrix."""
+        with self.Session_miningDB() as session:
+            rows = session.query(
+                BestCoinsForRigView.worker,
+                BestCoinsForRigView.symbol,
+                BestCoinsForRigView.rev_rig_correct
+            ).filter(BestCoinsForRigView.rev_rig_correct.isnot(None)).all()
+        workers = sorted({r.worker for r in rows})
+        coins = sorted({r.symbol for r in rows})
+        worker_idx = {w: i for i, w in enumerate(workers)}
+        coin_idx = {c: i for i, c in enumerate(coins)}
+        revenue = np.full((len(workers), len(coins)), np.nan)
+        if rows:
+            w = np.fromiter((worker_idx[r.worker] for r in rows), dtype=np.int64, count=len(rows))
+            c = np.fromiter((coin_idx[r.symbol] for r in rows), dtype=np.int64, count=len(rows))
+            revenue[w, c] = np.fromiter((r.rev_rig_correct for r in rows), dtype=np.float64, count=len(rows))
+        return workers, coins, revenue
+
+    def _remap_state(self, workers, coins):
+        """Carry hysteresis/dwell state over when the worker or coin set changes between passes."""
+        old_current = {w: (self.coins[c] if c >= 0 else None, t)
+                       for w, c, t in zip(self.workers, self.current, self.assigned_at)}
+        coin_idx = {c: i for i, c in enumerate(coins)}
+        current = np.full(len(workers), -1, dtype=np.int64)
+        assigned_at = np.zeros(len(workers), dtype=np.float64)
+        for i, worker in enumerate(workers):
+            symbol, t = old_current.get(worker, (None, 0.0))
+            if symbol in coin_idx:
+                current[i] = coin_idx[symbol]
+                assigned_at[i] = t
+        self.workers, self.coins = workers, coins
+        self.current, self.assigned_at = current, assigned_at
+
+    def run_once(self):
+        workers, coins, revenue = self.load_revenue_matrix()
+        if workers != self.workers or coins != self.coins:
+            self._remap_state(workers, coins)
+        now = time.time()
+        started = time.perf_counter()
+        new, switched = compute_assignments(revenue, self.current, self.assigned_at, now, self.hysteresis, self.min_dwell)
+        elapsed = time.perf_counter() - started
+        self.assigned_at = np.where(switched, now, self.assigned_at)
+        self.current = new
+        rows = np.arange(len(workers))
+        chosen_revenue = revenue[rows, np.where(new >= 0, new, 0)]
+        assignments = {}
+        for i, worker in enumerate(workers):
+            symbol = coins[new[i]] if new[i] >= 0 else None
+            assignments[worker] = {
+                "worker": worker,
+                "symbol": symbol,
+                "rev_rig_correct": None if symbol is None else float(chosen_revenue[i]),
+                "assigned_at": float(self.assigned_at[i]),
+                "timestamp": now,
+            }
+        with self.lock:
+            self.assignments = assignments
+        self.publish(assignments, switched)
+        print(f"Computed assignments for {len(workers)} workers x {len(coins)} coins in {elapsed * 1000:.2f} ms, "
+              f"{int(switched.sum())} switched")
+
+    def publish(self, assignments, switched):
+        if not self.mqtt_client:
+            return
+        for worker, payload in assignments.items():
+            self.mqtt_client.publish(f"{MQTT_ASSIGNMENT_TOPIC}/{worker}", json.dumps(payload), retain=True)
+        if DEBUG:
+            for i in np.flatnonzero(switched):
+                worker = self.workers[i]
+                print(f"Published new assignment for {worker}: {assignments[worker]['symbol']}")
+
+    def serve_http(self, port):
+        coordinator = self
+
+        class AssignmentHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                with coordinator.lock:
+                    if parts == ["assignments"]:
+                        body = coordinator.assignments
+                    elif len(parts) == 2 and parts[0] == "assignments" and parts[1] in coordinator.assignments:
+                        body = coordinator.assignments[parts[1]]
+                    else:
+                        self.send_error(404)
+                        return
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", port), AssignmentHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Serving assignments on http://0.0.0.0:{port}/assignments")
+
+    def main(self):
+        if self.mqtt_client:
+            self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
+            self.mqtt_client.loop_start()
+        if self.poller:
+            self.poller.start_in_thread()
+        if HTTP_PORT:
+            self.serve_http(HTTP_PORT)
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"{datetime.now().isoformat()} Coordinator pass failed: {e}")
+            time.sleep(COORDINATOR_INTERVAL)
+
+
+def benchmark(n_workers=500, n_coins=50, passes=200, seed=0):
+    """Time compute_assignments on a synthetic fleet with ~10% unavailable coins per worker."""
+    rng = np.random.default_rng(seed)
+    current = np.full(n_workers, -1, dtype=np.int64)
+    assigned_at = np.zeros(n_workers)
+    timings = []
+    switches = 0
+    for i in range(passes):
+        revenue = rng.lognormal(mean=0.0, sigma=0.3, size=(n_workers, n_coins))
+        revenue[rng.random((n_workers, n_coins)) < 0.1] = np.nan
+        now = i * COORDINATOR_INTERVAL
+        started = time.perf_counter()
+        new, switched = compute_assignments(revenue, current, assigned_at, now)
+        timings.append(time.perf_counter() - started)
+        assigned_at = np.where(switched, now, assigned_at)
+        current = new
+        switches += int(switched.sum())
+    timings = np.array(timings) * 1000
+    print(f"{n_workers} workers x {n_coins} coins, {passes} passes: "
+          f"median {np.median(timings):.3f} ms, p99 {np.percentile(timings, 99):.3f} ms, "
+          f"{switches / passes:.1f} switches/pass")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fleet coin-assignment coordinator")
+    parser.add_argument("--benchmark", action="store_true", help="Run the 500 x 50 synthetic benchmark and exit")
+    parser.add_argument("--local-profitability", action="store_true",
+                        help="Rank with wa_profitability (network stats poller + prices) instead of the best_coins_for_rig view; "
+                             "coins without inputs keep the view's revenue")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark()
+    else:
+        FleetCoordinator(local_profitability=args.local_profitability).main()
@@ -0,0 +1,230 @@
+# wa_cpu_topology.py
+# CPU cache/core/NUMA probe (Linux sysfs, Windows WMI/psutil) and cache-aware starting thread counts per algorithm family.
+import os
+import platform
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import wmi
+except ImportError:
+    wmi = None
+
+DEBUG = False
+SYSFS_ROOT = "/sys/devices/system"
+MB = 1024 * 1024
+
+# Per-thread scratchpad that has to stay in L3 for the algorithm to run at full speed.
+# None: not cache-bound, one thread per physical core.
+ALGO_SCRATCHPAD = {
+    "rx/0": 2 * MB,
+    "rx/graft": 2 * MB,
+    "rx/sfx": 2 * MB,
+    "rx/yada": 2 * MB,
+    "rx/wow": 1 * MB,
+    "rx/keva": 1 * MB,
+    "rx/arq": 256 * 1024,
+    "cn/r": 2 * MB,
+    "cn/half": 2 * MB,
+    "cn/rwz": 2 * MB,
+    "cn/zls": 2 * MB,
+    "cn/double": 2 * MB,
+    "cn-heavy/xhv": 4 * MB,
+    "cn-lite/1": 1 * MB,
+    "cn-pico": 256 * 1024,
+    "argon2/chukwav2": 1 * MB,
+    "ghostrider": 2 * MB,
+}
+DEFAULT_ALGO = "rx/0"
+
+
+def parse_cpu_list(text):
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]."""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def parse_size(text):
+    """sysfs cache size ('32768K', '8M', '1024') -> bytes."""
+    text = text.strip().upper()
+    units = {"K": 1024, "M": MB, "G": 1024 * MB}
+    if text and text[-1] in units:
+        return int(text[:-1]) * units[text[-1]]
+    return int(text)
+
+
+class CpuTopology:
+    """Logical CPUs grouped by physical core, shared L3 and NUMA node."""
+    def __init__(self, cores, l3_groups, numa_nodes, source):
+        self.cores = cores  # List of logical-CPU lists, one per physical core (SMT siblings together)
+        self.l3_groups = l3_groups  # List of (size in bytes, [logical CPUs sharing it])
+        self.numa_nodes = numa_nodes  # node id -> [logical CPUs]
+        self.source = source
+
+    @property
+    def logical_cpus(self):
+        return sorted(cpu for core in self.cores for cpu in core)
+
+    @property
+    def physical_cores(self):
+        return len(self.cores)
+
+    @property
+    def l3_total(self):
+        return sum(size for size, _ in self.l3_groups)
+
+    def __repr__(self):
+        return (f"CpuTopology({self.source}: {self.physical_cores} cores / {len(self.logical_cpus)} threads, "
+                f"L3 {[f'{size // MB} MB x{len(cpus)}' for size, cpus in self.l3_groups]}, "
+                f"{len(self.numa_nodes)} NUMA node(s))")
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read().strip()
+
+
+def probe_linux(root=SYSFS_ROOT):
+    """Topology from a sysfs tree (root is normally /sys/devices/system; tests pass a fixture directory)."""
+    cpu_root = os.path.join(root, "cpu")
+    online = parse_cpu_list(_read(os.path.join(cpu_root, "online")))
+    cores = {}
+    l3_groups = {}
+    for cpu in online:
+        base = os.path.join(cpu_root, f"cpu{cpu}")
+        topology = os.path.join(base, "topology")
+        package = int(_read(os.path.join(topology, "physical_package_id")))
+        core_id = int(_read(os.path.join(topology, "core_id")))
+        cores.setdefault((package, core_id), []).append(cpu)
+        cache_root = os.path.join(base, "cache")
+        if not os.path.isdir(cache_root):
+            continue
+        for index in sorted(os.listdir(cache_root)):
+            cache = os.path.join(cache_root, index)
+            if not index.startswith("index") or _read(os.path.join(cache, "level")) != "3":
+                continue
+            shared = tuple(parse_cpu_list(_read(os.path.join(cache, "shared_cpu_list"))))
+            l3_groups[shared] = parse_size(_read(os.path.join(cache, "size")))
+    numa_nodes = {}
+    node_root = os.path.join(root, "node")
+    if os.path.isdir(node_root):
+        for entry in os.listdir(node_root):
+            if entry.startswith("node") and entry[4:].isdigit():
+                numa_nodes[int(entry[4:])] = parse_cpu_list(_read(os.path.join(node_root, entry, "cpulist")))
+    if not numa_nodes:
+        numa_nodes = {0: online}
+    online_set = set(online)
+    return CpuTopology(
+        cores=[sorted(cpus) for _, cpus in sorted(cores.items())],
+        l3_groups=[(size, [c for c in cpus if c in online_set]) for cpus, size in sorted(l3_groups.items())],
+        numa_nodes=numa_nodes,
+        source="sysfs",
+    )
+
+
+def probe_windows():
+    """
+    Topology from WMI Win32_Processor (L3 size, cores per socket) and psutil. Windows does not
+    expose per-core sibling lists here, so logical CPUs are assumed to be numbered with SMT
+    siblings adjacent (0/1, 2/3, ...), which is how Windows enumerates them.
+    """
+    sockets = []
+    if wmi:
+        for processor in wmi.WMI().Win32_Processor():
+            sockets.append((int(processor.NumberOfCores), int(processor.NumberOfLogicalProcessors),
+                            int(processor.L3CacheSize or 0) * 1024))
+    if not sockets and psutil:
+        sockets.append((psutil.cpu_count(logical=False) or 1, psutil.cpu_count(logical=True) or 1, 0))
+    if not sockets:
+        n = os.cpu_count() or 1
+        sockets.append((n, n, 0))
+    cores, l3_groups, numa_nodes = [], [], {}
+    cpu = 0
+    for node, (physical, logical, l3_size) in enumerate(sockets):
+        per_core = max(1, logical // max(1, physical))
+        socket_cpus = list(range(cpu, cpu + logical))
+        cores.extend(socket_cpus[i:i + per_core] for i in range(0, logical, per_core))
+        if l3_size:
+            l3_groups.append((l3_size, socket_cpus))
+        numa_nodes[node] = socket_cpus
+        cpu += logical
+    return CpuTopology(cores, l3_groups, numa_nodes, source="wmi" if wmi else "psutil")
+
+
+def probe():
+    """Topology of this machine, or None if it cannot be determined."""
+    try:
+        if platform.system().lower() == "linux":
+            return probe_linux()
+        return probe_windows()
+    except Exception as e:
+        print(f"Error probing CPU topology: {e}")
+        return None
+
+
+def algo_from_args(cli_args, default=DEFAULT_ALGO):
+    """Algorithm from a miner CLI argument list (--algo=rx/wow, -a rx/wow, --algorithm scrypt); default if absent."""
+    for i, arg in enumerate(cli_args):
+        if arg.startswith("--algo="):
+            return arg.split("=", 1)[1]
+        if arg in ("--algo", "-a", "--algorithm") and i + 1 < len(cli_args):
+            return cli_args[i + 1]
+    return default
+
+
+def recommend_threads(topology, algo=DEFAULT_ALGO, reserve_cores=0):
+    """
+    Starting thread count and affinity for an algorithm family.
+
+    Cache-bound algorithms get floor(L3 / scratchpad) threads per L3 domain (CCX, die or
+    socket), placed on one logical CPU per physical core first and on SMT siblings only if
+    the cache still has room. Other algorithms get one thread per physical core. Placing
+    threads per L3 domain also keeps them inside their NUMA node.
+    Returns {"threads", "affinity_mask", "cpus", "reason"}.
+    """
+    scratchpad = ALGO_SCRATCHPAD.get(algo)
+    core_of = {cpu: i for i, core in enumerate(topology.cores) for cpu in core}
+    reserved = {cpu for core in topology.cores[len(topology.cores) - reserve_cores:] for cpu in core} if reserve_cores else set()
+    if scratchpad and topology.l3_groups:
+        domains = [(size // scratchpad, cpus) for size, cpus in topology.l3_groups]
+        reason = f"{algo}: {scratchpad // 1024} KB per thread"
+    else:
+        domains = [(None, topology.logical_cpus)]
+        reason = f"{algo}: one thread per physical core" if not scratchpad else f"{algo}: no L3 information, one thread per core"
+    chosen = []
+    for budget, cpus in domains:
+        cpus = [cpu for cpu in cpus if cpu not in reserved]
+        by_core = {}
+        for cpu in sorted(cpus):
+            by_core.setdefault(core_of.get(cpu, cpu), []).append(cpu)
+        first = [siblings[0] for siblings in by_core.values()]
+        if budget is None:
+            chosen.extend(first)
+            continue
+        siblings = [cpu for core in by_core.values() for cpu in core[1:]]
+        chosen.extend((first + siblings)[:budget])
+    chosen = sorted(chosen) or topology.logical_cpus[:1]
+    mask = 0
+    for cpu in chosen:
+        mask |= 1 << cpu
+    if DEBUG:
+        print(f"Topology threads for {algo}: {len(chosen)} on CPUs {chosen} ({reason})")
+    return {"threads": len(chosen), "affinity_mask": mask, "cpus": chosen, "reason": reason}
+
+
+if __name__ == "__main__":
+    topology = probe()
+    print(topology)
+    for algo in ("rx/0", "rx/wow", "cn-heavy/xhv", "astrobwt"):
+        print(recommend_threads(topology, algo))
@@ -60,6 +60,7 @@ class ScreenRecorder:
 engine_miningDB = create_engine(f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_SERVER_IP}/mining")
 engine_fogplayDB = create_engine(f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_SERVER_IP}/fogplay")
 Base = declarative_base()
+MQTT_ASSIGNMENT_TOPIC = "mining/assignments"  # wa_coordinator.py publishes each worker's assignment retained to {topic}/{worker}
 
 # Tables from fogplay db
 class Events(Base):
@@ -118,6 +119,46 @@ class MinersStats(Base):
     gpu_clock_memory: Mapped[float]  
     gpu_voltage_core: Mapped[float]  
     gpu_voltage_memory: Mapped[float]  
+    mirror_sync_lag: Mapped[float]  # Seconds the last local mirror sync took
+    mirror_staleness: Mapped[float]  # Age in seconds of the oldest mirrored table
+    supervisor_health: Mapped[float]  # Health score (0-1) of the current miner/coin pair
+    supervisor_failures: Mapped[int]  # Consecutive failures of the current miner/coin pair
+    supervisor_backoff: Mapped[float]  # Seconds of restart backoff remaining
+    hashrate_10s: Mapped[float]  # XMRig API hashrate windows (H/s)
+    hashrate_60s: Mapped[float]
+    hashrate_15m: Mapped[float]
+    shares_accepted: Mapped[int]
+    shares_rejected: Mapped[int]
+    pool_ping: Mapped[float]  # ms
+    hugepages_pct: Mapped[float]  # Share of requested huge pages xmrig got
+    thread_hashrates: Mapped[str]  # JSON list of per-thread 10s hashrates
+    msr_ok: Mapped[bool]  # MSR mod applied at the last start (None if not reported)
+    slow_without_hugepages: Mapped[bool]  # Below target hashrate while huge pages/MSR are incomplete
+    cpu_power: Mapped[float]  # CPU package watts (RAPL / OpenHardwareMonitor), averaged over the loop with RAPL
+    gpu_power: Mapped[float]  # GPU watts (OpenHardwareMonitor)
+    hashrate_per_watt: Mapped[float]  # H/s per watt of the row's domain: CPU package for the rig, GPU for HOSTNAME_gpu
+
+class MinerStarts(Base):
+    __tablename__ = "miner_starts"
+    timestamp: Mapped[int] = mapped_column(primary_key=True)
+    hostname: Mapped[str] = mapped_column(primary_key=True)
+    miner: Mapped[str] = mapped_column(primary_key=True)
+    symbol: Mapped[str]
+    threads: Mapped[int]
+    hugepages_status: Mapped[str]  # xmrig "* HUGE PAGES" line: supported / unavailable / permission granted
+    one_gb_pages: Mapped[str]  # xmrig "* 1GB PAGES" line
+    dataset_hugepages_pct: Mapped[float]  # RandomX dataset allocated in huge pages
+    threads_hugepages_pct: Mapped[float]  # Thread scratchpads allocated in huge pages
+    msr: Mapped[str]  # ok / failed / None
+
+class NetworkStats(Base):
+    __tablename__ = "network_stats"
+    timestamp: Mapped[int] = mapped_column(primary_key=True)
+    symbol: Mapped[str] = mapped_column(primary_key=True)
+    difficulty: Mapped[float]
+    height: Mapped[int]
+    reward: Mapped[float]  # Block reward in whole coins
+    latency_ms: Mapped[float]  # Time the node/pool API took to answer
 
 class SupportedCoins(Base):
     __tablename__ = "supported_coins"
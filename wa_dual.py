@@ -20,5 +20,6 @@ def get_dero_difficulty(node_url="http://192.168.1.5:20206/json_rpc"):
     except Exception as e:
         print(f"Error querying Dero node: {e}")
         return None
-    
-get_dero_difficulty()
\ No newline at end of file
+
+if __name__ == "__main__":
+    get_dero_difficulty()
\ No newline at end of file
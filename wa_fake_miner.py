@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# wa_fake_miner.py
+# Stand-in for xmrig/SRBMiner/deroluna: replays recorded stdout and misbehaves on cue.
+#
+# Behaviour is configured by flags or WA_FAKE_* environment variables (so the real miner
+# CLI arguments that MinerController passes can be left untouched and are ignored):
+#   --replay / WA_FAKE_REPLAY            recorded miner log to replay (timestamps prefixes from
+#                                        wa_miner_log are stripped); default is a synthetic xmrig run
+#   --format / WA_FAKE_FORMAT            xmrig | srbminer | deroluna, for synthetic hashrate lines
+#   --hashrate / WA_FAKE_HASHRATE        synthetic hashrate in H/s (scaled by --threads if given)
+#   --interval / WA_FAKE_INTERVAL        seconds between synthetic lines (0 = as fast as possible)
+#   --speed / WA_FAKE_SPEED              replay speed multiplier for recorded timestamps
+#   --crash-after / WA_FAKE_CRASH_AFTER  exit with code 1 after N seconds
+#   --hang-after / WA_FAKE_HANG_AFTER    stop emitting and ignore SIGTERM after N seconds
+#   --silent-after / WA_FAKE_SILENT_AFTER  stop emitting (but exit normally when asked) after N seconds
+#   --degrade-after / WA_FAKE_DEGRADE_AFTER  multiply hashrate by --degrade-factor after N seconds
+#   --ramp / WA_FAKE_RAMP                warm-up: hashrate climbs from 30% to 100% over N seconds
+#   --jitter / WA_FAKE_JITTER            relative gaussian noise on synthetic hashrates (e.g. 0.05)
+#   --lines / WA_FAKE_LINES              exit 0 after N lines
+import argparse
+import os
+import random
+import re
+import signal
+import sys
+import time
+from datetime import datetime
+
+STARTUP_LINES = {
+    "xmrig": [
+        " * ABOUT        XMRig/6.22.2 (fake) gcc/13.2.0",
+        " * HUGE PAGES   supported",
+        " * 1GB PAGES    disabled",
+        " * CPU          Fake CPU (1) 64-bit AES",
+        "[{ts}]  net      use pool fake.pool:3333",
+        "[{ts}]  msr      register values for \"ryzen_19h\" preset have been set successfully (16 ms)",
+        "[{ts}]  randomx  allocated 2336 MB (2080+256) huge pages 100% 1168/1168 +JIT (30 ms)",
+        "[{ts}]  cpu      READY threads {threads}/{threads} ({threads}) huge pages 100% {threads}/{threads} memory 4096 KB (5 ms)",
+    ],
+    "srbminer": [
+        "SRBMiner-MULTI (fake)",
+        "Pool connected",
+    ],
+    "deroluna": [
+        "DeroLuna (fake)",
+    ],
+}
+
+
+def env_or(name, default, cast=str):
+    value = os.environ.get(name)
+    return cast(value) if value not in (None, "") else default
+
+
+def parse_args(argv):
+    # No abbreviations: xmrig's --cpu must not be taken for --cpu-threads
+    parser = argparse.ArgumentParser(description="Fake miner for offline MinerController testing", allow_abbrev=False)
+    parser.add_argument("--replay", default=env_or("WA_FAKE_REPLAY", None))
+    parser.add_argument("--format", default=env_or("WA_FAKE_FORMAT", "xmrig"), choices=["xmrig", "srbminer", "deroluna"])
+    parser.add_argument("--hashrate", type=float, default=env_or("WA_FAKE_HASHRATE", 1000.0, float))
+    parser.add_argument("--interval", type=float, default=env_or("WA_FAKE_INTERVAL", 10.0, float))
+    parser.add_argument("--speed", type=float, default=env_or("WA_FAKE_SPEED", 1.0, float))
+    parser.add_argument("--crash-after", type=float, default=env_or("WA_FAKE_CRASH_AFTER", None, float))
+    parser.add_argument("--hang-after", type=float, default=env_or("WA_FAKE_HANG_AFTER", None, float))
+    parser.add_argument("--silent-after", type=float, default=env_or("WA_FAKE_SILENT_AFTER", None, float))
+    parser.add_argument("--degrade-after", type=float, default=env_or("WA_FAKE_DEGRADE_AFTER", None, float))
+    parser.add_argument("--degrade-factor", type=float, default=env_or("WA_FAKE_DEGRADE_FACTOR", 0.3, float))
+    parser.add_argument("--ramp", type=float, default=env_or("WA_FAKE_RAMP", 0.0, float))
+    parser.add_argument("--jitter", type=float, default=env_or("WA_FAKE_JITTER", 0.0, float))
+    parser.add_argument("--lines", type=int, default=env_or("WA_FAKE_LINES", None, int))
+    # Thread count from the real miner arguments (xmrig --threads=N, srbminer --cpu-threads N, deroluna -t N)
+    parser.add_argument("--threads", "--cpu-threads", "-t", dest="threads", type=int, default=None)
+    args, _unknown = parser.parse_known_args(argv)
+    return args
+
+
+def hashrate_line(fmt, hashrate):
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    if fmt == "srbminer":
+        return f"Total Hashrate {hashrate:.2f} H/s"
+    if fmt == "deroluna":
+        # deroluna reports KH/s; MinerController reads field 7 of lines containing "@"
+        return f"[{ts}] Thread 0 @ DERO hashrate {hashrate / 1000:.3f} KH/s"
+    return f"[{ts}]  miner    speed 10s/60s/15m {hashrate:.1f} {hashrate:.1f} n/a H/s max {hashrate * 1.01:.1f} H/s"
+
+
+LOG_PREFIX = re.compile(r"^\[(\d{4}-\d{2}-\d{2}T[\d:.]+)\] ")
+
+
+def replay_lines(path):
+    """Yield (offset seconds or None, line) from a recorded log; offsets come from wa_miner_log prefixes."""
+    first = None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for raw in f:
+            line = raw.rstrip("\n")
+            match = LOG_PREFIX.match(line)
+            if match:
+                t = datetime.fromisoformat(match.group(1)).timestamp()
+                first = t if first is None else first
+                yield t - first, line[match.end():]
+            else:
+                yield None, line
+
+
+def synthetic_lines(args):
+    threads = args.threads or 1
+    for line in STARTUP_LINES[args.format]:
+        yield None, line.format(ts=datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3], threads=threads)
+    i = 0
+    while True:
+        yield i * args.interval, None  # None: generate a hashrate line at emit time
+        i += 1
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    base_hashrate = args.hashrate * (args.threads or 1)
+    source = replay_lines(args.replay) if args.replay else synthetic_lines(args)
+    started = time.monotonic()
+    emitted = 0
+    for offset, line in source:
+        if offset is not None and args.speed > 0:
+            delay = offset / args.speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+        elapsed = time.monotonic() - started
+        if args.crash_after is not None and elapsed >= args.crash_after:
+            print("[fake] simulated crash", flush=True)
+            sys.exit(1)
+        if args.hang_after is not None and elapsed >= args.hang_after:
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            while True:
+                time.sleep(3600)
+        if args.silent_after is not None and elapsed >= args.silent_after:
+            while True:
+                time.sleep(3600)
+        if line is None:
+            hashrate = base_hashrate
+            if args.ramp > 0 and elapsed < args.ramp:
+                hashrate *= 0.3 + 0.7 * elapsed / args.ramp
+            if args.jitter > 0:
+                hashrate *= max(0.0, random.gauss(1.0, args.jitter))
+            if args.degrade_after is not None and elapsed >= args.degrade_after:
+                hashrate *= args.degrade_factor
+            line = hashrate_line(args.format, hashrate)
+        sys.stdout.write(line + "\n")
+        if args.interval > 0 or args.replay:
+            sys.stdout.flush()
+        emitted += 1
+        if args.lines is not None and emitted >= args.lines:
+            break
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
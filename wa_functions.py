@@ -3,23 +3,26 @@ import json
 import requests
 import time
 import paho.mqtt.client as mqtt
-import win32api
-import win32con
 import psutil
 import ctypes
-import wmi
-import GPUtil
 import platform
 from datetime import datetime
 from typing import Optional
 
+try:
+    import win32api
+    import win32con
+except ImportError:
+    win32api = win32con = None  # Not on Windows (e.g. benchmarks with wa_fake_miner.py)
+
 try:
     from pyadl import ADLManager
 except ImportError:
     ADLManager = None
 
-from wa_definitions import MinersStats, MyGames
+from wa_definitions import MinersStats, MinerStarts, MyGames
 from wa_cred import XMRIG_API_URL, MQTT_BROKER, XMRIG_ACCESS_TOKEN
+from wa_xmrig_api import XmrigApiClient
 
 GPU_TYPE = None
 OHM_PROCESS = None  # To keep track of the OpenHardwareMonitor process
@@ -30,7 +33,10 @@ DEBUG_LOCAL = False
 OS_TYPE = platform.system().lower()  # "windows", "linux", "darwin" (macOS)
 GPU_TYPE = None  # Will be set to "nvidia", "amd", or None
 
-import GPUtil
+try:
+    import GPUtil
+except ImportError:
+    GPUtil = None
 import subprocess
 import psutil  # To check if OpenHardwareMonitor is running
 import time
@@ -307,8 +313,8 @@ def get_gpu_metrics():
 
     return metrics
 
-def update_miner_stats(session, hostname, symbol, hashrate, cpu_temp, gpu_metrics):
-    """Update the miner_stats table with the latest metrics."""
+def update_miner_stats(session, hostname, symbol, hashrate, cpu_temp, gpu_metrics, extra_metrics=None):
+    """Update the miner_stats table with the latest metrics. extra_metrics maps additional MinersStats columns to values."""
     timestamp = int(time.time())
     try:
         miner_stats = MinersStats(
@@ -325,7 +331,8 @@ def update_miner_stats(session, hostname, symbol, hashrate, cpu_temp, gpu_metric
             gpu_clock_core=gpu_metrics["core_clock"],
             gpu_clock_memory=gpu_metrics["memory_clock"],
             gpu_voltage_core=gpu_metrics["core_voltage"],
-            gpu_voltage_memory=gpu_metrics["memory_voltage"]
+            gpu_voltage_memory=gpu_metrics["memory_voltage"],
+            **(extra_metrics or {})
         )
         session.add(miner_stats)
         session.commit()
@@ -334,6 +341,24 @@ def update_miner_stats(session, hostname, symbol, hashrate, cpu_temp, gpu_metric
         print(f"Error updating miner_stats: {e}")
         session.rollback()
 
+def record_miner_start(session, hostname, start_status):
+    """Store a wa_miner_status.MinerStartStatus in the miner_starts table."""
+    try:
+        session.add(MinerStarts(
+            timestamp=int(start_status.started_at),
+            hostname=hostname,
+            miner=start_status.miner,
+            symbol=start_status.coin,
+            threads=start_status.threads,
+            **start_status.as_dict()
+        ))
+        session.commit()
+        return True
+    except Exception as e:
+        print(f"Error recording miner start: {e}")
+        session.rollback()
+        return False
+
 ##def main():
 ##    try:
 ##        # Get CPU temperature
@@ -415,80 +440,61 @@ def is_admin():
         return False
 
 # XMRig API Functions
+XMRIG_API = None  # Shared keep-alive client, created on first use
+
+
+def get_xmrig_api():
+    global XMRIG_API
+    if XMRIG_API is None:
+        XMRIG_API = XmrigApiClient(XMRIG_API_URL, XMRIG_ACCESS_TOKEN)
+    return XMRIG_API
+
 def get_xmrig_hashrate():
-    headers = {"Authorization": f"Bearer {XMRIG_ACCESS_TOKEN}"}
-    url = f"{XMRIG_API_URL}/2/summary"
-    for attempt in range(3):  # Retry up to 3 times
-        try:
-            response = requests.get(url, headers=headers, timeout=5)
-            response.raise_for_status()
-            raw_text = response.text
-            if DEBUG_LOCAL:
-                print(f"Raw response from {url}: {raw_text}")
-            data = json.loads(raw_text)  # Explicitly parse to catch errors
-            hashrate = data.get("hashrate", {}).get("total", [0])[1]
-            if DEBUG_LOCAL:
-                print(f"Hashrate: {hashrate} H/s")
-            return hashrate
-        except requests.RequestException as e:
-            print(f"Attempt {attempt + 1} - Error fetching hashrate from {url}: {e}")
-            if e.response:
-                print(f"Status: {e.response.status_code}, Raw response: {e.response.text}")
-            if attempt < 2:
-                time.sleep(1)
-        except json.JSONDecodeError as e:
-            print(f"Attempt {attempt + 1} - JSON decode error: {e}")
-            print(f"Raw response: {raw_text}")
-            if attempt < 2:
-                time.sleep(1)
-    print("All attempts failed to get hashrate")
-    return 0
+    """60s hashrate from the XMRig API, 0 if the API is unavailable."""
+    telemetry = get_xmrig_api().poll(backends=False)
+    if telemetry is None:
+        return 0
+    if DEBUG_LOCAL:
+        print(f"Hashrate: {telemetry.hashrate_60s} H/s")
+    return telemetry.hashrate_60s or 0
 
 def pause_xmrig():
-    headers = {"Authorization": f"Bearer {XMRIG_ACCESS_TOKEN}"}
-    payload = {"method": "pause"}
-    try:
-        response = requests.post(f"{XMRIG_API_URL}/json_rpc", json=payload, headers=headers, timeout=5)
-        response.raise_for_status()
+    if get_xmrig_api().json_rpc("pause"):
         if DEBUG_LOCAL:
             print("XMRig paused via JSON-RPC")
         return True
-    except requests.RequestException as e:
-        print(f"Error pausing XMRig via JSON-RPC: {e}")
-        return False
+    return False
 
 def resume_xmrig():
-    headers = {"Authorization": f"Bearer {XMRIG_ACCESS_TOKEN}"}
-    payload = {"method": "resume"}
-    try:
-        response = requests.post(f"{XMRIG_API_URL}/json_rpc", json=payload, headers=headers, timeout=5)
-        response.raise_for_status()
+    if get_xmrig_api().json_rpc("resume"):
         if DEBUG_LOCAL:
             print("XMRig resumed via JSON-RPC")
         return True
-    except requests.RequestException as e:
-        print(f"Error resuming XMRig via JSON-RPC: {e}")
-        return False
+    return False
 
 # Game Monitoring Function
-def get_current_game(session_fogplayDB) -> Optional[str]:
+def get_current_game(session_fogplayDB=None, game_rows=None) -> Optional[str]:
     """
     Retrieve the slug of the currently running game based on process names from MyGames table.
     
     Args:
         session_fogplayDB: SQLAlchemy session instance for fogplayDB.
+        game_rows: Optional (slug, exe_files) rows, e.g. from the local mirror. When given, fogplayDB is not queried.
     
     Returns:
         Optional[str]: Slug of the running game, or None if no game is detected.
     """
     try:
-        # Verify session is a proper instance
-        if not hasattr(session_fogplayDB, 'query'):
-            raise ValueError("session_fogplayDB is not a valid SQLAlchemy session instance")
-
-        # Query MyGames table to build game_processes dictionary
         game_processes = {}
-        results = session_fogplayDB.query(MyGames.slug, MyGames.exe_files).all()
+        if game_rows is not None:
+            results = game_rows
+        else:
+            # Verify session is a proper instance
+            if not hasattr(session_fogplayDB, 'query'):
+                raise ValueError("session_fogplayDB is not a valid SQLAlchemy session instance")
+
+            # Query MyGames table to build game_processes dictionary
+            results = session_fogplayDB.query(MyGames.slug, MyGames.exe_files).all()
         
         if not results:
             print("No games found in MyGames table.")
@@ -535,7 +541,8 @@ def get_current_game(session_fogplayDB) -> Optional[str]:
     except Exception as e:
         print(f"Error querying MyGames or iterating processes: {e}")
         try:
-            session_fogplayDB.rollback()
+            if session_fogplayDB is not None:
+                session_fogplayDB.rollback()
         except AttributeError:
             print("Cannot rollback: session_fogplayDB is not a valid session")
         return None
@@ -0,0 +1,208 @@
+# wa_game_profiles.py
+# Per-game CPU/GPU headroom profiles, keyed by MyGames.slug: light games keep a reduced miner running instead of stopping it.
+import json
+import math
+import os
+import time
+
+DEBUG = False
+GAME_PROFILE_DIR = "game_profiles"
+GAME_PROFILE_SAMPLES = 2000  # Most recent samples kept per mode (stopped / partial)
+GAME_MIN_SAMPLES = 30  # Samples with the miner stopped before a game can be classified
+GAME_PERCENTILE = 0.9  # Game load of a profile: this percentile of its samples
+GAME_LIGHT_CPU_SHARE = 0.5  # Light: the game's busiest moments use at most this share of the logical CPUs
+GAME_RESERVED_CPUS = 2  # Logical CPUs left free on top of the game's load
+GAME_MAX_FPS_IMPACT = 0.05  # Demote a light game once mining costs more than this share of its recorder FPS
+GAME_MIN_FPS_SAMPLES = 12  # FPS samples needed in each mode before comparing them (one per recorder report)
+# Written by wa_recorder_grok.py, read by the switcher: next to this module, whatever either was started from
+RECORDER_FPS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recorder_fps.json")
+RECORDER_FPS_MAX_AGE = 15  # Seconds; older recorder reports mean the recorder is not running
+
+
+def exe_names(exe_files):
+    """MyGames.exe_files ('"Game.exe"' or '["A.exe","B.exe"]') as a list of lowercase names."""
+    if not exe_files:
+        return []
+    try:
+        parsed = json.loads(exe_files)
+    except json.JSONDecodeError:
+        parsed = exe_files.strip('"')
+    return [name.lower() for name in (parsed if isinstance(parsed, list) else [parsed])]
+
+
+def game_pids(names):
+    """Pids of running processes whose name is in names."""
+    import psutil
+    pids = []
+    for proc in psutil.process_iter(["name"]):
+        try:
+            if (proc.info["name"] or "").lower() in names:
+                pids.append(proc.pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return pids
+
+
+def percentile(values, share):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def write_recorder_fps(fps, target, path=RECORDER_FPS_FILE):
+    """Recorder side: publish the capture frame rate of the last interval for the miner switcher."""
+    try:
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump({"timestamp": time.time(), "fps": fps, "target": target}, f)
+        os.replace(temporary, path)
+    except OSError as e:
+        print(f"Error writing recorder FPS: {e}")
+
+
+def read_recorder_fps(path=RECORDER_FPS_FILE, max_age=RECORDER_FPS_MAX_AGE):
+    """(timestamp, fps) of the recorder's last report, or None if it is missing or stale."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - data.get("timestamp", 0) > max_age or data.get("fps") is None:
+        return None
+    return data["timestamp"], data["fps"]
+
+
+class ProcessCpuMeter:
+    """Logical CPUs' worth of CPU time a set of processes used since the previous sample."""
+    def __init__(self):
+        self.last = None  # (monotonic time, cpu seconds, pids)
+
+    def sample(self, pids):
+        import psutil
+        now = time.monotonic()
+        used = 0.0
+        seen = set()
+        for pid in pids:
+            try:
+                times = psutil.Process(pid).cpu_times()
+                used += times.user + times.system
+                seen.add(pid)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        last, self.last = self.last, (now, used, seen)
+        if last is None or last[2] != seen or now <= last[0]:
+            return None
+        return max(used - last[1], 0.0) / (now - last[0])
+
+
+class GameProfile:
+    """
+    What one game needs on one host. Samples are kept per mode: "stopped" (miner off, the
+    game's own load) and "partial" (reduced miner running), so the recorder FPS of both can
+    be compared. light_override in the JSON file forces the classification either way.
+    """
+    def __init__(self, hostname, slug, folder=GAME_PROFILE_DIR):
+        self.hostname = hostname
+        self.slug = slug
+        self.folder = folder
+        self.sessions = 0
+        self.samples = {"stopped": {"cpu": [], "gpu": [], "fps": []}, "partial": {"cpu": [], "gpu": [], "fps": []}}
+        self.demoted = False  # Set once mining measurably cost frame rate
+        self.light_override = None
+        self.last_fps_timestamp = None
+
+    def add_sample(self, mode, game_cpus, gpu_usage, fps=None):
+        """One main loop sample while the game runs: its CPU use (logical CPUs), GPU usage (%), recorder FPS."""
+        bucket = self.samples[mode]
+        for key, value in (("cpu", game_cpus), ("gpu", gpu_usage)):
+            if value is not None:
+                bucket[key].append(round(value, 3))
+                del bucket[key][:-GAME_PROFILE_SAMPLES]
+        if fps is not None and fps[0] != self.last_fps_timestamp:  # One sample per recorder report
+            self.last_fps_timestamp = fps[0]
+            bucket["fps"].append(round(fps[1], 2))
+            del bucket["fps"][:-GAME_PROFILE_SAMPLES]
+
+    def game_cpus(self):
+        """GAME_PERCENTILE of the game's CPU use, in logical CPUs, from samples with the miner stopped."""
+        return percentile(self.samples["stopped"]["cpu"], GAME_PERCENTILE)
+
+    def fps_impact(self):
+        """Share of recorder FPS lost while the reduced miner runs, None until both modes have enough reports."""
+        stopped, partial = self.samples["stopped"]["fps"], self.samples["partial"]["fps"]
+        if len(stopped) < GAME_MIN_FPS_SAMPLES or len(partial) < GAME_MIN_FPS_SAMPLES:
+            return None
+        baseline = sum(stopped) / len(stopped)
+        return 1.0 - (sum(partial) / len(partial)) / baseline if baseline else None
+
+    def is_light(self, cpu_count):
+        if self.light_override is not None:
+            return bool(self.light_override)
+        cpus = self.game_cpus()
+        if self.demoted or cpus is None or len(self.samples["stopped"]["cpu"]) < GAME_MIN_SAMPLES:
+            return False
+        return cpus <= cpu_count * GAME_LIGHT_CPU_SHARE
+
+    def check_impact(self):
+        """Demote the game if mining costs it too much frame rate. Returns True when it was demoted now."""
+        impact = self.fps_impact()
+        if self.demoted or self.light_override or impact is None or impact <= GAME_MAX_FPS_IMPACT:
+            return False
+        self.demoted = True
+        print(f"Game {self.slug}: mining costs {impact * 100:.1f}% recorder FPS, no longer mining during it")
+        self.save()
+        return True
+
+    def miner_threads(self, cpu_count, ceiling):
+        """Threads for a reduced miner next to the game (0: none fit)."""
+        cpus = self.game_cpus() or 0.0
+        return max(0, min(ceiling, cpu_count - math.ceil(cpus) - GAME_RESERVED_CPUS))
+
+    def path(self):
+        return os.path.join(self.folder, f"{self.hostname}_{self.slug}.json")
+
+    def save(self):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            temporary = self.path() + ".tmp"
+            with open(temporary, "w") as f:
+                json.dump({"hostname": self.hostname, "slug": self.slug, "sessions": self.sessions, "demoted": self.demoted,
+                           "light_override": self.light_override, "game_cpus": self.game_cpus(), "fps_impact": self.fps_impact(),
+                           "samples": self.samples}, f)
+            os.replace(temporary, self.path())
+        except OSError as e:
+            print(f"Error saving game profile for {self.slug}: {e}")
+
+    @classmethod
+    def load(cls, hostname, slug, folder=GAME_PROFILE_DIR):
+        """Profile with the saved samples for (hostname, slug), or an empty one."""
+        profile = cls(hostname, slug, folder)
+        try:
+            with open(profile.path()) as f:
+                data = json.load(f)
+            profile.sessions = data.get("sessions", 0)
+            profile.demoted = data.get("demoted", False)
+            profile.light_override = data.get("light_override")
+            for mode, bucket in data.get("samples", {}).items():
+                if mode in profile.samples:
+                    profile.samples[mode].update(bucket)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error loading game profile for {hostname}/{slug}: {e}")
+        return profile
+
+    def describe(self, cpu_count):
+        cpus = self.game_cpus()
+        gpu = percentile(self.samples["stopped"]["gpu"], GAME_PERCENTILE)
+        impact = self.fps_impact()
+        return (f"{self.slug}: {self.sessions} sessions, game {cpus if cpus is not None else '?'} CPUs / "
+                f"{gpu if gpu is not None else '?'}% GPU (p{GAME_PERCENTILE * 100:.0f}), "
+                f"FPS impact {f'{impact * 100:.1f}%' if impact is not None else '?'}, "
+                f"{'light' if self.is_light(cpu_count) else 'heavy'}")
+
+
+def miner_affinity(threads, cpu_count):
+    """Logical CPUs for a reduced miner: the highest-numbered ones, leaving CPU 0 upwards (where games and the OS start) free."""
+    return list(range(cpu_count - threads, cpu_count))
@@ -1,23 +1,44 @@
 import asyncio
 import json
 import subprocess
+import sys
 import time
 import os
 import threading
-import queue
+from collections import deque
 from datetime import datetime
-from sqlalchemy import create_engine, func, case, text
+from sqlalchemy import create_engine, func, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql.expression import column
 from pathlib import Path
 
-from wa_definitions import engine_fogplayDB, engine_miningDB, Events, BestCoinsForRigView, MinersStats, SupportedCoins
+from wa_definitions import engine_fogplayDB, engine_miningDB, Events, MinersStats, MQTT_ASSIGNMENT_TOPIC
+from wa_coin_cache import SupportedCoinsCache
+from wa_local_mirror import LocalMirror, BestCoinRow
+from wa_miner_stream import MinerOutputStream
+from wa_miner_log import MinerLogWriter, RateLimitedEcho
+from wa_supervisor import MinerSupervisor
+from wa_thread_stats import ThreadHashrateCollector
+from wa_autotuner import ThreadAutotuner
+from wa_thermal import ThermalGovernor, intensity_plan
+from wa_sensors import SensorChannel, SensorSampler
+from wa_idle import IDLE_POLL_INTERVAL, IdleGovernor
+from wa_arbiter import PRIORITY_ORDER, ResourceArbiter, find_processes, priority_level
+from wa_pool_prober import POOL_PROBE_INTERVAL, PoolProber, build_pools, pool_from_args, with_pool
+from wa_power import PowerMeter
+from wa_journal import DecisionJournal
+from wa_tariff import TARIFF_CALENDAR, PowerModel, TariffCalendar, TariffPlanner, linear_share
+from wa_slots import GPU_WORKER_SUFFIX, MiningSlot, SlotRevenue, efficiency
+from wa_game_profiles import GameProfile, ProcessCpuMeter, exe_names, game_pids, miner_affinity, read_recorder_fps
+from wa_miner_status import MinerStartStatus
+from wa_cpu_topology import DEFAULT_ALGO, algo_from_args, probe as probe_cpu_topology, recommend_threads
 from wa_cred import HOSTNAME, MTS_SERVER_NAME, \
     USE_MQTT, MQTT_BROKER, MQTT_PORT, MQTT_HASHRATE_TOPIC, MQTT_GAME_TOPIC, \
     IDLE_THRESHOLD, \
     CoinsListSrbmimer, CoinsListXmrig, SLEEP_INTERVAL, \
     ENABLE_MINING, PAUSE_XMRIG, XMRIG_THREADS, MAX_THREADS
-from wa_functions import GPU_TYPE, get_current_game, get_idle_time, is_admin, pause_xmrig, resume_xmrig, on_connect, detect_gpu, get_cpu_temperature, get_gpu_temperature, get_gpu_metrics, update_miner_stats
+from wa_functions import GPU_TYPE, get_xmrig_api, record_miner_start, get_current_game, get_idle_time, is_admin, pause_xmrig, resume_xmrig, on_connect, detect_gpu, get_cpu_temperature, get_gpu_temperature, get_gpu_metrics, update_miner_stats
+import wa_functions
 from wa_cred import MQTT_USER, MQTT_PASSWORD, XMRIG_CLI_ARGS_SENSITIVE, SRBMINER_CLI_ARGS_SENSITIVE, DEROLUNA_CLI_ARGS_SENSITIVE
 
 if USE_MQTT: import paho.mqtt.client as mqtt
@@ -25,6 +46,29 @@ if USE_MQTT: import paho.mqtt.client as mqtt
 PAUSE_XMRIG = False
 DEBUG = True
 PRINT_MINER_LOG = True
+LOCAL_MIRROR_PATH = f"mirror_{HOSTNAME}.sqlite"  # Local copy of coin/game metadata used when Postgres is unreachable
+MQTT_COINS_UPDATE_TOPIC = "mining/supported_coins/updated"  # Publish here after editing supported_coins to refresh rigs
+USE_COORDINATOR = False  # Follow assignments published by wa_coordinator.py instead of ranking coins locally
+COORDINATOR_MAX_AGE = 300  # Ignore coordinator assignments older than this (seconds) and rank locally
+API_POLL_INTERVAL = 10  # Seconds between miner HTTP API polls (xmrig)
+API_STALE_AFTER = 30  # Fall back to parsing stdout hashrates when the last API poll is older than this
+USE_TOPOLOGY_THREADS = True  # Start from the cache/topology-derived thread count instead of XMRIG_THREADS
+START_STATUS_TIMEOUT = 120  # Save a miner's startup memory status after this long even if it never printed READY
+HUGEPAGES_SLOW_RATIO = 0.85  # Moving average below this share of target with degraded huge pages/MSR is flagged
+APPLY_THREAD_RECOMMENDATION = False  # Start xmrig with --cpu-affinity that leaves out consistently slow threads
+USE_AUTOTUNER = False  # Learn the best thread count per coin under CPU_TEMP_THRESHOLD (wa_autotuner.py) instead of +/-1 steps
+USE_PID_THERMAL = False  # Scale threads/priority from predicted CPU and GPU temperatures (wa_thermal.py) instead of hard stops
+USE_ADAPTIVE_SENSORS = True  # Poll temperatures on a headroom/trend-driven cadence between loop iterations (wa_sensors.py)
+USE_GAME_PROFILES = False  # Keep a reduced, idle-priority, affinity-restricted miner running during games profiled as light (wa_game_profiles.py)
+USE_POOL_PROBER = False  # Start on the lowest-latency healthy pool and fail over on rejects/latency (wa_pool_prober.py)
+USE_GPU_SLOT = False  # Mine on the GPU next to the CPU miner, as worker HOSTNAME_gpu with its own coin choice (wa_slots.py)
+USE_RESOURCE_ARBITER = False  # Priority, I/O priority and affinity for miner, recorder and steamcmd by state (wa_arbiter.py)
+USE_TARIFF_PLAN = TARIFF_CALENDAR is not None  # Follow a day-ahead coin/intensity/off plan from the electricity tariff and a power model (wa_tariff.py)
+TARIFF_PLAN_PATH = f"tariff_plan_{HOSTNAME}.json"  # The current plan, for inspection
+USE_POWER_METER = True  # Sample CPU/GPU power (wa_power.py) into miner_stats and the tariff plan's power model
+POWER_MODEL_PATH = f"power_model_{HOSTNAME}.json"  # Measured mining watts per (coin, threads)
+USE_DECISION_JOURNAL = True  # Record every control decision with its inputs in an append-only binary journal (wa_journal.py)
+USE_IDLE_INTENSITY = os.name == "nt"  # Scale threads/priority with input idle time and other processes' CPU load (wa_idle.py); get_idle_time() is Windows-only
 
 # Constants for hashrate monitoring
 HASHRATE_WINDOW = 15 * 60
@@ -36,7 +80,6 @@ CHECK_INTERVAL = 10
 CPU_TEMP_THRESHOLD = 67.0
 CPU_TEMP_LOWER_THRESHOLD = 60.0
 GPU_TEMP_THRESHOLD = 90.0
-FAILED_COIN_COOLDOWN = 300
 HYSTERESIS = 1.025
 
 # Thread limits
@@ -45,12 +88,46 @@ THREAD_INCREMENT = 1  # Thread adjustment step to reduce oscillations
 # Warn if threads are high, but allow up to MAX_THREADS
 if XMRIG_THREADS > 16 or MAX_THREADS > 22:
     print(f"Warning: High thread counts detected (XMRIG_THREADS={XMRIG_THREADS}, MAX_THREADS={MAX_THREADS}). Verify CPU capacity.")
+CPU_TOPOLOGY = probe_cpu_topology() if USE_TOPOLOGY_THREADS else None
+if CPU_TOPOLOGY:
+    print(f"CPU topology: {CPU_TOPOLOGY}")
 
-# Windows-only paths
+
+def default_thread_count(cli_args, default_algo=DEFAULT_ALGO):
+    """
+    Starting threads for a miner: the smallest topology recommendation over the algorithms
+    of its coins (so no coin starts out cache-starved), capped by MAX_THREADS.
+    Falls back to XMRIG_THREADS when the topology is unknown.
+    """
+    if CPU_TOPOLOGY is None or not cli_args:
+        return XMRIG_THREADS
+    recommendations = {algo_from_args(args, default_algo) for args in cli_args.values()}
+    counts = {algo: recommend_threads(CPU_TOPOLOGY, algo)["threads"] for algo in recommendations}
+    threads = max(MIN_THREADS, min(min(counts.values()), MAX_THREADS))
+    if DEBUG:
+        print(f"Topology thread counts {counts}, starting with {threads} threads")
+    return threads
+
+# Windows-only paths; WA_MINERS_DIR overrides the miners folder
 scripts_folder = Path("C:/scripts")
-XMRIG_PATH = str(scripts_folder / "miners" / "xmrig" / "xmrig.exe")
-SRBMINER_PATH = str(scripts_folder / "miners" / "srbminer" / "SRBMiner-Multi.exe")
-DEROLUNA_PATH = str(scripts_folder / "miners" / "deroluna" / "deroluna-miner.exe")
+MINERS_FOLDER = Path(os.environ.get("WA_MINERS_DIR", scripts_folder / "miners"))
+XMRIG_PATH = str(MINERS_FOLDER / "xmrig" / "xmrig.exe")
+SRBMINER_PATH = str(MINERS_FOLDER / "srbminer" / "SRBMiner-Multi.exe")
+DEROLUNA_PATH = str(MINERS_FOLDER / "deroluna" / "deroluna-miner.exe")
+# WA_FAKE_MINER=1 runs wa_fake_miner.py in place of every miner binary (offline testing, see wa_bench_miners.py)
+USE_FAKE_MINER = os.environ.get("WA_FAKE_MINER", "") not in ("", "0")
+FAKE_MINER_PATH = str(Path(__file__).resolve().parent / "wa_fake_miner.py")
+
+
+def miner_launch(miner_path, fake_format):
+    """MinerController path/command/name arguments for a miner, swapped for wa_fake_miner.py when USE_FAKE_MINER."""
+    if not USE_FAKE_MINER:
+        return {"miner_path": miner_path}
+    return {
+        "miner_path": FAKE_MINER_PATH,
+        "command_prefix": [sys.executable, FAKE_MINER_PATH, f"--format={fake_format}"],
+        "name": f"{fake_format}-fake",
+    }
 
 # CLI arguments with dynamic threads
 XMRIG_CLI_ARGS = {
@@ -169,6 +246,32 @@ SRBMINER_CLI_ARGS = {
     ]
 }
 
+# GPU slot: SRBMiner on the GPU only, reported as the rig's GPU worker so pool stats and BestCoinsForRigView stay per slot
+GPU_WORKER = f"{HOSTNAME}{GPU_WORKER_SUFFIX}"
+SRBMINER_GPU_CLI_ARGS = {
+    "ETI": [
+        "--algorithm", "etchash",
+        "--pool", "etchash.unmineable.com:3333",
+        f"--wallet={SRBMINER_CLI_ARGS_SENSITIVE['ETI']['wallet']}",
+        "--worker", GPU_WORKER,
+        "--disable-cpu"
+    ],
+    "PEPEW": [
+        "--algorithm", "kawpow",
+        "--pool", "kawpow.unmineable.com:3333",
+        f"--wallet={SRBMINER_CLI_ARGS_SENSITIVE['PEPEW']['wallet']}",
+        "--worker", GPU_WORKER,
+        "--disable-cpu"
+    ],
+    "TDC": [
+        "--algorithm", "ethash",
+        "--pool", "ethash.unmineable.com:3333",
+        f"--wallet={SRBMINER_CLI_ARGS_SENSITIVE['TDC']['wallet']}",
+        "--worker", GPU_WORKER,
+        "--disable-cpu"
+    ]
+}
+
 DEROLUNA_CLI_ARGS = {
     "DERO": [
         f"-d {DEROLUNA_CLI_ARGS_SENSITIVE['DERO']['daemon-address']}",
@@ -183,50 +286,68 @@ if USE_MQTT:
     mqtt_client.on_connect = on_connect
 
 class MinerController:
-    def __init__(self, miner_path, cli_args, hashrate_pattern, hashrate_index, session_miningDB, session_fogplayDB):
+    def __init__(self, miner_path, cli_args, hashrate_pattern, hashrate_index, session_miningDB, session_fogplayDB, coin_cache, supervisor,
+                 command_prefix=None, name=None, api_client=None, default_algo=DEFAULT_ALGO, cpu_threads=True):
         self.miner_path = miner_path
+        self.command_prefix = command_prefix or [miner_path]  # e.g. [python, wa_fake_miner.py, ...] for offline runs
+        self.name = name or os.path.basename(miner_path)
+        self.api_client = api_client  # XmrigApiClient: primary hashrate source when it answers
+        self.telemetry = None  # Last XmrigTelemetry from api_client
+        self.thread_stats = {}  # coin -> ThreadHashrateCollector, fed from api_client polls
+        self.thread_recommendations = {}  # coin -> wa_thread_stats recommendation for the next start
+        self.autotuners = {}  # coin -> ThreadAutotuner, persisted per (host, coin)
+        self.cpu_threads = cpu_threads  # False for a GPU-only miner: no CPU autotuner or per-thread stats
+        self.running_threads = None  # Threads the running miner actually uses (current_threads may be capped by the affinity mask)
+        self.caps = {}  # source ("thermal", "idle") -> (thread cap or None, priority) while that source throttles
+        self.priority = "normal"  # Process priority of the running miner: normal / below_normal / idle
+        self.on_decision = None  # Switcher callback (kind, controller, **fields) for the decision journal
+        self.affinity = None  # Logical CPUs the miner is restricted to (light game running), None for all
+        self.start_status = None  # MinerStartStatus of the current run (huge pages, 1GB pages, MSR)
+        self.calibrating = False  # Set by wa_calibration: no low-hashrate restarts against the value being measured
+        self.hashrate_listener = None  # Optional callable(timestamp, hashrate) for every sample
+        self.pool_chooser = None  # Optional callable(coin) -> pool URL to start on, None for the one in cli_args
+        self.pool_url = None  # Pool the running miner was started on
+        self.hugepages_warned = False
         self.cli_args = cli_args
         self.hashrate_pattern = hashrate_pattern
         self.hashrate_index = hashrate_index
         self.session_miningDB = session_miningDB
         self.session_fogplayDB = session_fogplayDB
+        self.coin_cache = coin_cache
+        self.supervisor = supervisor  # Decides restarts and backoff for every (miner, coin)
         self.process = None
+        self.output_thread = None
+        self.watch_thread = None
+        self.stop_lock = threading.Lock()  # Held for a whole stop_mining
         self.is_mining = False
         self.current_coin = None
         self.hashrate = 0.0
         self.target_hashrate = None
-        self.output_queue = queue.Queue()
+        self.target_hashrate_checked = False
+        self.output_stream = MinerOutputStream()  # Bounded; consumers subscribe explicitly
+        self.log_writer = None
+        self.console_echo = RateLimitedEcho()
         self.running = False
-        self.hashrate_history = []
+        self.hashrate_history = deque()  # (timestamp, hashrate) within HASHRATE_WINDOW, oldest first
+        self.hashrate_sum = 0.0  # Running sum of hashrate_history for the moving average
         self.low_hashrate_start = None
         self.last_output_time = None
-        self.restart_count = 0
-        self.last_restart_time = None
         self.last_failed_coin = None
-        self.current_threads = XMRIG_THREADS  # Initialize with XMRIG_THREADS
-        self.MAX_RESTARTS = 10
-        self.RESTART_WINDOW = 120
+        self.default_threads = default_thread_count(cli_args, default_algo)  # From CPU topology, else XMRIG_THREADS
+        self.current_threads = self.default_threads
         self.OUTPUT_TIMEOUT = 300
 
     def fetch_target_hashrate(self):
         if not self.current_coin:
             return None
-        try:
-            coin = self.session_miningDB.query(SupportedCoins).filter(
-                SupportedCoins.symbol == self.current_coin,
-                SupportedCoins.worker == HOSTNAME
-            ).first()
-            if coin and coin.rig_hr_kh is not None:
-                self.target_hashrate = coin.rig_hr_kh * 1000
-                if DEBUG:
-                    print(f"Target hashrate for {self.current_coin}: {self.target_hashrate} H/s")
-                return self.target_hashrate
-            else:
-                print(f"No target hashrate found for {self.current_coin} in SupportedCoins")
-                return None
-        except Exception as e:
-            print(f"Error fetching target hashrate for {self.current_coin}: {e}")
-            return None
+        self.target_hashrate = self.coin_cache.get_target_hashrate(self.current_coin)
+        if self.target_hashrate is not None:
+            if DEBUG and not self.target_hashrate_checked:
+                print(f"Target hashrate for {self.current_coin}: {self.target_hashrate} H/s")
+        elif not self.target_hashrate_checked:
+            print(f"No target hashrate found for {self.current_coin} in SupportedCoins")
+        self.target_hashrate_checked = True
+        return self.target_hashrate
 
     def log_event(self, event_name, event_value):
         try:
@@ -265,92 +386,285 @@ class MinerController:
         print(f"Updated threads to {self.current_threads} for {self.current_coin}")
         return True
 
+    def effective_threads(self):
+        """current_threads, lowered to the tightest cap while the thermal or idle governor is throttling."""
+        caps = [cap for cap, _ in self.caps.values() if cap is not None]
+        return self.current_threads if not caps else max(MIN_THREADS, min([self.current_threads] + caps))
+
+    def effective_priority(self):
+        """Lowest priority any cap asks for."""
+        return max((priority for _, priority in self.caps.values()), key=PRIORITY_ORDER.index, default="normal")
+
+    @property
+    def throttled(self):
+        """True while any cap holds the miner below its autotuned thread count or normal priority."""
+        return self.effective_threads() < self.current_threads or self.effective_priority() != "normal"
+
+    def apply_threads(self, threads, reason):
+        """
+        Get the running miner to threads: live through the xmrig API when it answers,
+        otherwise by restarting it. Returns False if a needed restart failed.
+        """
+        previous = self.running_threads
+        if threads == previous:
+            return True
+        if self.api_client and self.api_client.set_threads(threads, self.telemetry.algo if self.telemetry else None):
+            self.running_threads = threads
+            self.reset_hashrate_history()
+            self.low_hashrate_start = None
+            self.log_event("threads_live_update", f"{self.current_coin}: {previous} -> {threads} threads without restart ({reason})")
+            return True
+        coin = self.current_coin
+        self.stop_mining()
+        return self.start_mining(coin, keep_threads=True)
+
+    def change_threads(self, new_threads):
+        """Set a new thread count for the coin and apply it to the running miner. False if a needed restart failed."""
+        if not self.update_threads(new_threads):
+            return True
+        return self.apply_threads(self.effective_threads(), "autotune")
+
+    def set_cap(self, source, cap, priority="normal"):
+        """Throttle to cap threads (None: no thread cap) at priority on behalf of source. False if a needed restart failed."""
+        entry = None if cap is None and priority == "normal" else (cap, priority)
+        changed = entry != self.caps.get(source)
+        if changed:
+            print(f"{source.capitalize()} cap for {self.current_coin}: {self.caps.get(source)} -> {entry}")
+            if entry is None:
+                self.caps.pop(source, None)
+            else:
+                self.caps[source] = entry
+        previous = self.running_threads
+        if not self.apply_threads(self.effective_threads(), source):
+            return False
+        self.set_priority(self.effective_priority())  # After a possible restart, which starts at normal priority
+        if changed and self.on_decision:
+            self.on_decision("cap", self, source=source, threads_from=previous)
+        return True
+
+    def set_priority(self, priority):
+        """Lower or restore the miner's process priority (psutil; nice levels outside Windows)."""
+        if priority == self.priority or not self.process:
+            return
+        import psutil
+        try:
+            parent = psutil.Process(self.process.pid)
+            for process in [parent] + parent.children(recursive=True):
+                process.nice(priority_level(priority))
+            self.priority = priority
+        except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+            print(f"Error setting {self.name} priority to {priority}: {e}")
+
+    def set_affinity(self, cpus):
+        """Restrict the miner's processes to cpus (None: all CPUs); kept across restarts."""
+        self.affinity = cpus
+        if not self.process:
+            return
+        import psutil
+        try:
+            parent = psutil.Process(self.process.pid)
+            for process in [parent] + parent.children(recursive=True):
+                process.cpu_affinity(cpus or list(range(psutil.cpu_count())))
+        except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError) as e:
+            print(f"Error setting {self.name} affinity to {cpus}: {e}")
+
+    def get_autotuner(self, coin):
+        if coin not in self.autotuners:
+            self.autotuners[coin] = ThreadAutotuner.load(HOSTNAME, coin, CPU_TEMP_THRESHOLD, MIN_THREADS, MAX_THREADS)
+        return self.autotuners[coin]
+
+    def handle_failure(self, kind, detail):
+        """Stop the miner and let the supervisor schedule the retry. Called from the reader and watcher threads."""
+        coin = self.current_coin
+        if not self.stop_mining(wait=False):  # Another thread is already stopping this run
+            return
+        self.supervisor.record_failure(self.name, coin, kind, detail)
+        self.last_failed_coin = coin
+
     def read_output(self):
         if not self.current_coin:
             print("Error: read_output called with no current coin. Aborting.")
             return
-        log_file = f"{self.current_coin}_miner.log"
-        with open(log_file, "a", encoding="utf-8") as f:
-            while self.running:
-                try:
-                    if self.process.poll() is not None:
-                        print(f"Miner process ({os.path.basename(self.miner_path)}) has exited unexpectedly. Restarting...")
-                        self.stop_mining()
-                        self.start_mining(self.current_coin)
-                        break
-                    line = self.process.stdout.readline().strip()
-                    current_time = time.time()
-                    if not line:
-                        if self.last_output_time and (current_time - self.last_output_time) > self.OUTPUT_TIMEOUT:
-                            print(f"No output received for {self.OUTPUT_TIMEOUT} seconds. Restarting miner...")
-                            self.stop_mining()
-                            self.start_mining(self.current_coin)
-                            break
-                        time.sleep(0.1)
-                        continue
-                    self.last_output_time = current_time
-                    f.write(f"[{datetime.now().isoformat()}] {line}\n")
-                    f.flush()
-                    if PRINT_MINER_LOG:
-                        print(line)
-                    self.output_queue.put(line)
-                    if self.hashrate_pattern in line:
-                        try:
-                            parts = line.split()
-                            hashrate_str = parts[self.hashrate_index]
-                            self.hashrate = float(hashrate_str)
-                            if "deroluna" in self.miner_path.lower():
-                                self.hashrate *= 1000
-                            if DEBUG:
-                                print(f"Parsed hashrate for {self.current_coin}: {self.hashrate} H/s")
-                            self.hashrate_history.append((current_time, self.hashrate))
-                            self.hashrate_history = [(t, hr) for t, hr in self.hashrate_history if t >= current_time - HASHRATE_WINDOW]
-                            if self.target_hashrate is None:
-                                self.fetch_target_hashrate()
-                            moving_avg = self.calculate_moving_average(current_time)
-                            if moving_avg is None:
-                                if DEBUG:
-                                    print("Not enough hashrate data for moving average yet.")
-                                continue
-                            if self.target_hashrate and self.target_hashrate > 0:
-                                threshold = self.target_hashrate * HASHRATE_THRESHOLD
-                                if moving_avg < threshold:
-                                    if self.low_hashrate_start is None:
-                                        self.low_hashrate_start = current_time
-                                        if DEBUG:
-                                            print(f"Moving average hashrate dropped below threshold ({moving_avg} < {threshold}). Monitoring...")
-                                    elif current_time - self.low_hashrate_start >= HASHRATE_DROP_DURATION:
-                                        print(f"Moving average hashrate below threshold for {HASHRATE_DROP_DURATION}s ({moving_avg} < {threshold}). Restarting...")
-                                        self.stop_mining()
-                                        success = self.start_mining(self.current_coin)
-                                        if not success:
-                                            print(f"Failed to restart miner for {self.current_coin}. Marking coin as failed.")
-                                            self.last_failed_coin = self.current_coin
-                                            break
-                                        self.low_hashrate_start = None
-                                else:
-                                    if self.low_hashrate_start is not None:
-                                        if DEBUG:
-                                            print(f"Moving average hashrate recovered ({moving_avg} >= {threshold}). Resetting monitor.")
-                                        self.low_hashrate_start = None
-                        except (IndexError, ValueError) as e:
-                            self.hashrate = 0
-                            print(f"Error parsing hashrate from line '{line}': {e}")
-                except UnicodeDecodeError as e:
-                    print(f"Encoding error in miner output: {e}. Skipping line.")
-                    continue
-                except Exception as e:
-                    print(f"Error reading miner output: {e}")
+        while self.running:
+            try:
+                if self.process.poll() is not None:
+                    for line in self.process.stdout:  # Keep the last lines (usually the reason) in the log
+                        self.output_stream.publish(line.strip())
+                    print(f"Miner process ({self.name}) has exited unexpectedly.")
+                    self.handle_failure("crash", f"exit code {self.process.returncode}")
+                    break
+                line = self.process.stdout.readline().strip()
+                current_time = time.time()
+                if not line:
                     time.sleep(0.1)
+                    continue
+                self.last_output_time = current_time
+                self.output_stream.publish(line, current_time)  # The log writer subscribes to the stream
+                if PRINT_MINER_LOG:
+                    self.console_echo.echo(line)
+                if self.start_status and not self.start_status.complete and self.start_status.feed(line) and self.start_status.complete:
+                    print(f"{self.name} memory setup for {self.current_coin}: {self.start_status.describe()}")
+                if self.hashrate_pattern in line and not self.api_is_fresh(current_time):
+                    try:
+                        parts = line.split()
+                        hashrate_str = parts[self.hashrate_index]
+                        hashrate = float(hashrate_str)
+                        if "deroluna" in self.name.lower():
+                            hashrate *= 1000
+                        if DEBUG:
+                            print(f"Parsed hashrate for {self.current_coin}: {hashrate} H/s")
+                        if self.update_hashrate(current_time, hashrate):
+                            break
+                    except (IndexError, ValueError) as e:
+                        self.hashrate = 0
+                        print(f"Error parsing hashrate from line '{line}': {e}")
+            except UnicodeDecodeError as e:
+                print(f"Encoding error in miner output: {e}. Skipping line.")
+                continue
+            except Exception as e:
+                print(f"Error reading miner output: {e}")
+                time.sleep(0.1)
 
-    def calculate_moving_average(self, current_time):
+    def update_hashrate(self, current_time, hashrate):
+        """Record a hashrate sample and run the low-hashrate check. Returns True if the miner was stopped."""
+        self.hashrate = hashrate
+        self.record_hashrate(current_time, hashrate)
+        if self.hashrate_listener:
+            self.hashrate_listener(current_time, hashrate)
+        if self.target_hashrate is None:
+            self.fetch_target_hashrate()  # In-memory lookup, cheap per line
+        moving_avg = self.calculate_moving_average(current_time)
+        if moving_avg is None:
+            if DEBUG:
+                print("Not enough hashrate data for moving average yet.")
+            return False
+        if self.target_hashrate and self.target_hashrate > 0 and not self.calibrating:
+            threshold = self.target_hashrate * HASHRATE_THRESHOLD
+            if moving_avg < threshold:
+                if self.low_hashrate_start is None:
+                    self.low_hashrate_start = current_time
+                    if DEBUG:
+                        print(f"Moving average hashrate dropped below threshold ({moving_avg} < {threshold}). Monitoring...")
+                elif current_time - self.low_hashrate_start >= HASHRATE_DROP_DURATION:
+                    print(f"Moving average hashrate below threshold for {HASHRATE_DROP_DURATION}s ({moving_avg} < {threshold}).")
+                    self.handle_failure("low_hashrate", f"{moving_avg:.0f} < {threshold:.0f} H/s")
+                    return True
+            else:
+                if self.low_hashrate_start is not None:
+                    if DEBUG:
+                        print(f"Moving average hashrate recovered ({moving_avg} >= {threshold}). Resetting monitor.")
+                    self.low_hashrate_start = None
+        return False
+
+    def memory_metrics(self):
+        """
+        Switch metrics from the start status: MSR result and whether the run is below target
+        hashrate while huge pages or the MSR mod are incomplete (the API's huge pages figure
+        fills in when stdout did not report one).
+        """
+        status = self.start_status
+        if status is None:
+            return {}
+        hugepages_pct = status.hugepages_pct
+        if hugepages_pct is None and self.telemetry is not None:
+            hugepages_pct = self.telemetry.hugepages_pct
+        degraded = (hugepages_pct is not None and hugepages_pct < 100) or status.msr == "failed"
+        moving_avg = self.calculate_moving_average(time.time())
+        slow = bool(degraded and self.target_hashrate and moving_avg is not None
+                    and moving_avg < self.target_hashrate * HUGEPAGES_SLOW_RATIO)
+        if slow and not self.hugepages_warned:
+            self.hugepages_warned = True
+            self.log_event("hugepages_missing", f"{self.current_coin} on {self.name} at {moving_avg:.0f} H/s "
+                                                f"(target {self.target_hashrate:.0f}) with {status.describe()}")
+        return {
+            "msr_ok": None if status.msr is None else status.msr == "ok",
+            "slow_without_hugepages": slow,
+        }
+
+    def save_start_status(self):
+        """Write the start status once it is complete (or timed out). Called from the main loop, which owns the DB session."""
+        status = self.start_status
+        if status is None or status.saved:
+            return
+        reported = any(value is not None for value in status.as_dict().values())
+        if status.complete or (reported and time.time() - status.started_at > START_STATUS_TIMEOUT):
+            status.saved = record_miner_start(self.session_miningDB, HOSTNAME, status)
+
+    def api_is_fresh(self, current_time):
+        """True while the miner's HTTP API is delivering hashrates, so stdout parsing can be skipped."""
+        return self.telemetry is not None and current_time - self.telemetry.timestamp <= API_STALE_AFTER
+
+    def poll_api(self):
+        """Poll the miner API (xmrig only). Returns True if the sample stopped the miner."""
+        telemetry = self.api_client.poll()
+        if telemetry is None or telemetry.hashrate is None or not self.running:
+            return False
+        self.telemetry = telemetry
+        if telemetry.threads and self.cpu_threads:
+            self.get_thread_stats(self.current_coin).add(
+                telemetry.timestamp, [t[0] if t else None for t in telemetry.threads], telemetry.thread_affinity)
+        return self.update_hashrate(telemetry.timestamp, telemetry.hashrate)
+
+    def get_thread_stats(self, coin):
+        if coin not in self.thread_stats:
+            self.thread_stats[coin] = ThreadHashrateCollector.load(HOSTNAME, coin)
+        return self.thread_stats[coin]
+
+    def update_thread_recommendation(self, coin):
+        """Save the coin's per-thread history and refresh the affinity recommendation for its next start."""
+        collector = self.thread_stats.get(coin)
+        if collector is None:
+            return
+        try:
+            collector.save()
+        except Exception as e:
+            print(f"Error saving thread stats for {coin}: {e}")
+        recommendation = collector.recommend(os.cpu_count())
+        previous = self.thread_recommendations.get(coin)
+        self.thread_recommendations[coin] = recommendation
+        if recommendation and (previous is None or previous["affinity_mask"] != recommendation["affinity_mask"]):
+            self.log_event("thread_recommendation",
+                           f"{coin}: slow threads {recommendation['slow_threads']}, recommend {recommendation['threads']} threads "
+                           f"affinity 0x{recommendation['affinity_mask']:x} (slow threads gave {recommendation['slow_hashrate']:.0f} H/s)")
+
+    def watch_output(self, process):
+        """
+        Hang detection and API polling. readline() blocks while a miner is silent,
+        so read_output cannot notice a hang by itself.
+        """
+        last_poll = 0.0
+        while self.running and self.process is process:
+            time.sleep(1)
+            if not (self.running and self.process is process):
+                break
+            if self.last_output_time and time.time() - self.last_output_time > self.OUTPUT_TIMEOUT:
+                print(f"No output received for {self.OUTPUT_TIMEOUT} seconds.")
+                self.handle_failure("hang", f"no output for {self.OUTPUT_TIMEOUT}s")
+                break
+            if self.api_client and time.monotonic() - last_poll >= API_POLL_INTERVAL:
+                last_poll = time.monotonic()
+                if self.poll_api():
+                    break
+
+    def record_hashrate(self, current_time, hashrate):
+        self.hashrate_history.append((current_time, hashrate))
+        self.hashrate_sum += hashrate
         cutoff_time = current_time - HASHRATE_WINDOW
-        recent_hashrates = [hr for timestamp, hr in self.hashrate_history if timestamp >= cutoff_time]
-        if not recent_hashrates:
+        while self.hashrate_history and self.hashrate_history[0][0] < cutoff_time:
+            self.hashrate_sum -= self.hashrate_history.popleft()[1]
+
+    def reset_hashrate_history(self):
+        self.hashrate_history = deque()
+        self.hashrate_sum = 0.0
+
+    def calculate_moving_average(self, current_time):
+        # record_hashrate keeps the history pruned to the window, so this is O(1) per line
+        if not self.hashrate_history:
             return None
-        return sum(recent_hashrates) / len(recent_hashrates)
+        return self.hashrate_sum / len(self.hashrate_history)
 
-    def start_mining(self, coin_symbol):
+    def start_mining(self, coin_symbol, keep_threads=False):
+        """Start coin_symbol. keep_threads skips the autotuner's start count (restarts for a thread change)."""
         if not ENABLE_MINING:
             print("Mining disabled by ENABLE_MINING flag.")
             return False
@@ -366,30 +680,37 @@ class MinerController:
             print(f"Error: No CLI arguments defined for coin {coin_symbol}")
             self.log_event("mining_failed", f"No CLI arguments for coin {coin_symbol}")
             return False
-        current_time = time.time()
-        if self.last_restart_time and (current_time - self.last_restart_time) < self.RESTART_WINDOW:
-            self.restart_count += 1
-            if self.restart_count > self.MAX_RESTARTS:
-                print(f"Exceeded maximum restarts ({self.MAX_RESTARTS}) in {self.RESTART_WINDOW}s. Aborting mining for {coin_symbol}.")
-                self.log_event("mining_failed", f"Exceeded maximum restarts for {coin_symbol}")
-                self.last_failed_coin = coin_symbol
-                return False
-        else:
-            self.restart_count = 0
-            self.last_restart_time = current_time
+        allowed, remaining = self.supervisor.can_start(self.name, coin_symbol)
+        if not allowed:
+            print(f"{coin_symbol} on {self.name} is backing off for another {remaining:.0f}s. Not starting.")
+            self.last_failed_coin = coin_symbol
+            return False
+        if USE_AUTOTUNER and self.cpu_threads and not keep_threads and not self.calibrating:
+            self.current_threads = self.get_autotuner(coin_symbol).start_threads(self.current_threads)
         # Verify thread count
         if self.current_threads < MIN_THREADS or self.current_threads > MAX_THREADS:
-            print(f"Invalid thread count {self.current_threads} for {coin_symbol}. Resetting to XMRIG_THREADS ({XMRIG_THREADS}).")
-            self.current_threads = XMRIG_THREADS
-            self.log_event("threads_reset", f"Reset threads to {XMRIG_THREADS} for {coin_symbol} due to invalid count")
+            print(f"Invalid thread count {self.current_threads} for {coin_symbol}. Resetting to default ({self.default_threads}).")
+            self.current_threads = self.default_threads
+            self.log_event("threads_reset", f"Reset threads to {self.default_threads} for {coin_symbol} due to invalid count")
         # Verify miner executable
         if not os.path.exists(self.miner_path):
             print(f"Error: Miner executable not found at {self.miner_path}")
             self.log_event("mining_failed", f"Miner executable not found: {self.miner_path}")
             return False
+        threads = self.effective_threads()
+        extra_args = []
+        recommendation = self.thread_recommendations.get(coin_symbol)
+        if APPLY_THREAD_RECOMMENDATION and recommendation and self.api_client:
+            threads = min(threads, recommendation["threads"])
+            extra_args = [f"--cpu-affinity=0x{recommendation['affinity_mask']:x}"]
+        args = self.cli_args[coin_symbol]
+        pool_url = self.pool_chooser(coin_symbol) if self.pool_chooser else None
+        if pool_url:
+            args = with_pool(args, pool_url)
+        self.pool_url = pool_from_args(args)
         for attempt in range(3):
             try:
-                cmd = [self.miner_path] + [arg.format(threads=self.current_threads) for arg in self.cli_args[coin_symbol]]
+                cmd = self.command_prefix + [arg.format(threads=threads) for arg in args] + extra_args
                 print(f"Attempt {attempt + 1}/3: Starting miner with command: {' '.join(cmd)}")
                 self.process = subprocess.Popen(
                     cmd,
@@ -402,14 +723,28 @@ class MinerController:
                 self.is_mining = True
                 self.current_coin = coin_symbol
                 self.running = True
-                self.hashrate_history = []
+                self.reset_hashrate_history()
                 self.low_hashrate_start = None
                 self.target_hashrate = None
+                self.target_hashrate_checked = False
                 self.last_output_time = time.time()
+                self.start_status = MinerStartStatus(self.name, coin_symbol, threads)
+                self.hugepages_warned = False
+                self.running_threads = threads
+                self.priority = "normal"
+                if self.affinity:
+                    self.set_affinity(self.affinity)
+                if USE_AUTOTUNER and self.cpu_threads:
+                    self.get_autotuner(coin_symbol).begin(threads)
+                self.log_writer = MinerLogWriter(self.output_stream, f"{self.name}_{coin_symbol}")  # CPU and GPU SRBMiner can mine one coin
+                self.log_writer.start()
                 self.output_thread = threading.Thread(target=self.read_output)
                 self.output_thread.start()
-                print(f"Miner started for {coin_symbol} with {self.current_threads} threads.")
-                self.log_event("mining_started", f"Started mining {coin_symbol} with {self.current_threads} threads")
+                self.watch_thread = threading.Thread(target=self.watch_output, args=(self.process,), daemon=True)
+                self.watch_thread.start()
+                self.supervisor.record_start(self.name, coin_symbol)
+                print(f"Miner started for {coin_symbol} with {threads} threads{' ' + extra_args[0] if extra_args else ''}.")
+                self.log_event("mining_started", f"Started mining {coin_symbol} with {threads} threads{' ' + extra_args[0] if extra_args else ''}")
                 return True
             except Exception as e:
                 print(f"Attempt {attempt + 1}/3 failed to start miner for {coin_symbol}: {e}")
@@ -417,17 +752,34 @@ class MinerController:
                 time.sleep(2)  # Wait before retry
         print(f"Failed to start miner for {coin_symbol} after 3 attempts.")
         self.log_event("mining_failed", f"Failed to start {coin_symbol} after 3 attempts")
+        self.supervisor.record_failure(self.name, coin_symbol, "start_failed", "3 spawn attempts failed")
         self.last_failed_coin = coin_symbol
         return False
 
-    def stop_mining(self):
-        if self.is_mining and self.process:
-            try:
-                self.running = False
-                import psutil
+    def stop_mining(self, wait=True):
+        """
+        Stop the running miner; True if this call stopped it. The main loop waits for a stop in
+        progress; the reader and watcher threads pass wait=False and give up instead, so a
+        failure seen by both is handled once and neither blocks the other's join.
+        """
+        if not self.stop_lock.acquire(blocking=wait):
+            return False
+        try:
+            if not (self.is_mining and self.process):
+                return False
+            self._stop_process()
+            return True
+        finally:
+            self.stop_lock.release()
+
+    def _stop_process(self):
+        try:
+            self.running = False
+            import psutil
+            self.log_event("mining_stopped", f"Stopping mining {self.current_coin}...")
+            if self.process.poll() is None:  # Already gone after a crash
                 parent = psutil.Process(self.process.pid)
                 children = parent.children(recursive=True)
-                self.log_event("mining_stopped", f"Stopping mining {self.current_coin}...")
                 self.process.terminate()
                 for child in children:
                     try:
@@ -435,39 +787,48 @@ class MinerController:
                     except psutil.NoSuchProcess:
                         continue
                 self.process.wait(timeout=5)
-                self.log_event("mining_stopped", f"Stopped mining {self.current_coin}")
-            except subprocess.TimeoutExpired:
-                print("Graceful termination timed out. Forcing termination...")
-                try:
-                    parent = psutil.Process(self.process.pid)
-                    children = parent.children(recursive=True)
-                    for child in children:
-                        try:
-                            child.kill()
-                        except psutil.NoSuchProcess:
-                            continue
-                    parent.kill()
-                    miner_exe = os.path.basename(self.miner_path)
-                    os.system(f"taskkill /IM {miner_exe} /F /T")
-                except psutil.NoSuchProcess:
-                    print("Process already terminated.")
-                except Exception as e:
-                    print(f"Error during forceful termination: {e}")
+            self.log_event("mining_stopped", f"Stopped mining {self.current_coin}")
+        except subprocess.TimeoutExpired:
+            print("Graceful termination timed out. Forcing termination...")
+            try:
+                parent = psutil.Process(self.process.pid)
+                children = parent.children(recursive=True)
+                for child in children:
+                    try:
+                        child.kill()
+                    except psutil.NoSuchProcess:
+                        continue
+                parent.kill()
+                if os.name == "nt":  # By pid: the GPU slot may run the same executable
+                    os.system(f"taskkill /PID {self.process.pid} /F /T")
+            except psutil.NoSuchProcess:
+                print("Process already terminated.")
             except Exception as e:
-                if DEBUG: raise
-                print(f"Error stopping miner: {e}")
-                self.process.kill()
-            finally:
-                self.output_thread.join()
-                self.process = None
-                self.is_mining = False
-                self.hashrate = 0.0
-                self.hashrate_history = []
-                self.low_hashrate_start = None
-                self.target_hashrate = None
-                self.last_output_time = None
-                print(f"Miner stopped for {self.current_coin}.")
-                # Preserve current_coin unless switching coins
+                print(f"Error during forceful termination: {e}")
+        except Exception as e:
+            if DEBUG: raise
+            print(f"Error stopping miner: {e}")
+            self.process.kill()
+        finally:
+            for thread in (self.output_thread, self.watch_thread):
+                if thread and thread is not threading.current_thread():
+                    thread.join()
+            self.supervisor.record_stop(self.name, self.current_coin)
+            self.update_thread_recommendation(self.current_coin)
+            if self.log_writer:
+                self.log_writer.stop()
+                self.log_writer = None
+            self.process = None
+            self.is_mining = False
+            self.hashrate = 0.0
+            self.telemetry = None
+            self.reset_hashrate_history()
+            self.low_hashrate_start = None
+            self.target_hashrate = None
+            self.target_hashrate_checked = False
+            self.last_output_time = None
+            print(f"Miner stopped for {self.current_coin}.")
+            # Preserve current_coin unless switching coins
 
     def get_hashrate(self):
         return self.hashrate
@@ -481,30 +842,68 @@ class ScreenRunSwitcher:
             self.hashrate = hashrate
 
     def fetch_start_options_for_symbol(self, symbol):
-        try:
-            coin = self.session_miningDB.query(SupportedCoins).filter(
-                SupportedCoins.symbol == symbol,
-                SupportedCoins.worker == HOSTNAME
-            ).first()
-            if coin and coin.command_start is not None:
-                self.command_start = coin.command_start
+        command_start = self.coin_cache.get_command_start(symbol)
+        if command_start is not None:
+            self.command_start = command_start
+            if DEBUG:
+                print(f"Start command for {symbol}: {self.command_start}")
+            return self.command_start
+        else:
+            print(f"No start command found for {symbol} in SupportedCoins")
+            self.log_event("start_command_failed", f"No start command found {symbol}")
+            return None
+
+    def on_mqtt_connect(self, client, userdata, flags, rc):
+        """Subscribe on every (re)connect: paho does not restore subscriptions on a clean session."""
+        on_connect(client, userdata, flags, rc)
+        if rc == 0:
+            client.subscribe(MQTT_COINS_UPDATE_TOPIC)
+            if USE_COORDINATOR:
+                client.subscribe(f"{MQTT_ASSIGNMENT_TOPIC}/{HOSTNAME}")
+
+    def on_mqtt_message(self, client, userdata, msg):
+        if msg.topic == MQTT_COINS_UPDATE_TOPIC:
+            print("Received supported_coins update notification. Invalidating cache.")
+            self.refresh_supported_coins()
+        elif msg.topic == f"{MQTT_ASSIGNMENT_TOPIC}/{HOSTNAME}":
+            try:
+                self.coordinator_assignment = json.loads(msg.payload)
                 if DEBUG:
-                    print(f"Start command for {symbol}: {self.command_start}")
-                return self.command_start
-            else:
-                print(f"No start command found for {symbol} in SupportedCoins")
-                self.log_event("start_command_failed", f"No start command found {symbol}")
-                return None
-        except Exception as e:
-            print(f"Error fetching start command for {symbol}: {e}")
-            self.log_event("start_command_failed", f"Error fetching start command for {symbol}: {str(e)}")
+                    print(f"Received coordinator assignment: {self.coordinator_assignment}")
+            except (ValueError, TypeError) as e:
+                print(f"Invalid coordinator assignment payload: {e}")
+
+    def refresh_supported_coins(self):
+        """Pull supported_coins into the mirror and drop the cached snapshot (after an update or a calibration)."""
+        self.mirror.sync_table("supported_coins")
+        self.coin_cache.invalidate()
+        if self.gpu_slot:
+            self.gpu_slot.controller.coin_cache.invalidate()
+
+    def get_coordinator_coin(self):
+        """Return the coordinator's assignment as a best-coin row if it is fresh and usable, else None."""
+        assignment = self.coordinator_assignment
+        if not USE_COORDINATOR or not assignment or not assignment.get("symbol"):
             return None
+        if time.time() - assignment.get("timestamp", 0) > COORDINATOR_MAX_AGE:
+            print("Coordinator assignment is stale. Ranking coins locally.")
+            return None
+        symbol = assignment["symbol"]
+        if not self.coin_cache.is_enabled(symbol) or self.is_coin_on_cooldown(symbol):
+            return None
+        rev = assignment.get("rev_rig_correct")
+        return BestCoinRow(None, symbol, HOSTNAME, rev, rev)
 
     def __init__(self):
         self.Session_miningDB = sessionmaker(bind=engine_miningDB)
         self.session_miningDB = self.Session_miningDB()
         self.Session_fogplayDB = sessionmaker(bind=engine_fogplayDB)
         self.session_fogplayDB = self.Session_fogplayDB()
+        self.mirror = LocalMirror(LOCAL_MIRROR_PATH, HOSTNAME, extra_workers=[GPU_WORKER] if USE_GPU_SLOT else [])
+        self.mirror.sync()  # Best effort; reads fall back to the last synced copy
+        self.mirror.start()
+        self.coin_cache = SupportedCoinsCache(loader=self.mirror.supported_coins, hostname=HOSTNAME)
+        self.supervisor = MinerSupervisor(on_decision=self.log_event)
         wow_startup_option = 'stan'
         try:
             with engine_miningDB.connect() as conn:
@@ -536,47 +935,103 @@ class ScreenRunSwitcher:
                 "--http-access-token=auth"
             ]
         self.xmrig_controller = MinerController(
-            miner_path=XMRIG_PATH,
+            **miner_launch(XMRIG_PATH, "xmrig"),
+            api_client=get_xmrig_api(),
             cli_args=XMRIG_CLI_ARGS,
             hashrate_pattern="speed",
             hashrate_index=5,
             session_miningDB=self.session_miningDB,
-            session_fogplayDB=self.session_fogplayDB
+            session_fogplayDB=self.session_fogplayDB,
+            coin_cache=self.coin_cache,
+            supervisor=self.supervisor
         )
         self.srbminer_controller = MinerController(
-            miner_path=SRBMINER_PATH,
+            **miner_launch(SRBMINER_PATH, "srbminer"),
             cli_args=SRBMINER_CLI_ARGS,
             hashrate_pattern="Total Hashrate",
             hashrate_index=2,
             session_miningDB=self.session_miningDB,
-            session_fogplayDB=self.session_fogplayDB
+            session_fogplayDB=self.session_fogplayDB,
+            coin_cache=self.coin_cache,
+            supervisor=self.supervisor
         )
         self.deroluna_controller = MinerController(
-            miner_path=DEROLUNA_PATH,
+            **miner_launch(DEROLUNA_PATH, "deroluna"),
             cli_args=DEROLUNA_CLI_ARGS,
             hashrate_pattern="@",
             hashrate_index=7,
+            default_algo="astrobwt",
             session_miningDB=self.session_miningDB,
-            session_fogplayDB=self.session_fogplayDB
+            session_fogplayDB=self.session_fogplayDB,
+            coin_cache=self.coin_cache,
+            supervisor=self.supervisor
         )
+        self.gpu_slot = None
+        if USE_GPU_SLOT:
+            gpu_controller = MinerController(
+                **dict(miner_launch(SRBMINER_PATH, "srbminer"), name="srbminer-gpu"),
+                cli_args=SRBMINER_GPU_CLI_ARGS,
+                hashrate_pattern="Total Hashrate",
+                hashrate_index=2,
+                session_miningDB=self.session_miningDB,
+                session_fogplayDB=self.session_fogplayDB,
+                coin_cache=SupportedCoinsCache(loader=self.mirror.supported_coins, hostname=GPU_WORKER),
+                supervisor=self.supervisor,
+                cpu_threads=False
+            )
+            self.gpu_slot = MiningSlot("gpu", GPU_WORKER, gpu_controller, SRBMINER_GPU_CLI_ARGS, GPU_TEMP_THRESHOLD)
+        self.cpu_revenue = SlotRevenue("cpu")
+        self.pool_prober = PoolProber(build_pools({"login": XMRIG_CLI_ARGS, "subscribe": {**SRBMINER_CLI_ARGS, **SRBMINER_GPU_CLI_ARGS}}))
+        if USE_POOL_PROBER:
+            for miner in self.controllers() + ([self.gpu_slot.controller] if self.gpu_slot else []):
+                miner.pool_chooser = self.pool_prober.best
         self.last_game = None
         self.is_game_running = False
+        self.game_profiles = {}  # slug -> GameProfile, persisted per (host, slug)
+        self.game_profile = None  # Profile of the running game
+        self.game_exes = []  # Its process names, for the CPU meter
+        self.game_meter = ProcessCpuMeter()
+        self.arbiter = ResourceArbiter()
         self.current_miner = None
         self.is_overheating = False
-        self.failed_coins = {}
+        self.thermal = ThermalGovernor(CPU_TEMP_THRESHOLD, GPU_TEMP_THRESHOLD)
+        self.idle = IdleGovernor(IDLE_THRESHOLD)
+        self.tariff = TariffPlanner(TariffCalendar(TARIFF_CALENDAR or {}), PowerModel.load(POWER_MODEL_PATH), self.hashrate_share)
+        self.power = PowerMeter() if USE_POWER_METER else None
+        self.power_state = None  # (coin, threads) at the previous power sample; a change mixes two states into one reading
+        self.journal = DecisionJournal(HOSTNAME) if USE_DECISION_JOURNAL else None
+        self.decision_inputs = {}  # Latest loop inputs (temperatures, GPU usage, idle time, power) for journal records
+        for miner in self.controllers() + ([self.gpu_slot.controller] if self.gpu_slot else []):
+            miner.on_decision = self.record_decision
+        self.tariff_slot = None  # Plan slot being followed
+        self.next_idle_poll = 0.0
+        self.sensors = SensorSampler([
+            SensorChannel("cpu", get_cpu_temperature, CPU_TEMP_THRESHOLD),
+            SensorChannel("gpu", get_gpu_temperature, GPU_TEMP_THRESHOLD),
+        ])
+        self.coordinator_assignment = None
+
+    def get_miner_for_coin(self, coin_symbol):
+        if coin_symbol in CoinsListXmrig:
+            return self.xmrig_controller
+        elif coin_symbol in CoinsListSrbmimer:
+            return self.srbminer_controller
+        elif coin_symbol == "DERO":
+            return self.deroluna_controller
+        return None
 
     def is_coin_on_cooldown(self, coin_symbol):
-        if coin_symbol in self.failed_coins:
-            expiration_time = self.failed_coins[coin_symbol]
-            if time.time() < expiration_time:
-                if DEBUG:
-                    print(f"Coin {coin_symbol} is on cooldown until {datetime.fromtimestamp(expiration_time).isoformat()}")
-                return True
-            else:
-                if DEBUG:
-                    print(f"Coin {coin_symbol} cooldown expired. Removing from failed list.")
-                del self.failed_coins[coin_symbol]
-        return False
+        miner = self.get_miner_for_coin(coin_symbol)
+        if miner is None:
+            return False
+        allowed, remaining = self.supervisor.can_start(miner.name, coin_symbol)
+        if not allowed and DEBUG:
+            print(f"Coin {coin_symbol} is backing off for another {remaining:.0f}s")
+        return not allowed
+
+    def get_coin_health(self, coin_symbol):
+        miner = self.get_miner_for_coin(coin_symbol)
+        return self.supervisor.score(miner.name, coin_symbol) if miner else 1.0
 
     def log_event(self, event_name, event_value):
         try:
@@ -594,12 +1049,354 @@ class ScreenRunSwitcher:
             print(f"Error logging event {event_name}: {e}")
             self.session_fogplayDB.rollback()
 
+    def record_decision(self, kind, miner=None, **fields):
+        """Journal a control decision with the loop's latest inputs and the miner's state after it."""
+        if not self.journal:
+            return
+        snapshot = dict(self.decision_inputs, game=self.is_game_running, overheating=self.is_overheating,
+                        price=self.tariff_slot.price if self.tariff_slot else None)
+        if miner:
+            snapshot.update(slot="gpu" if self.gpu_slot and miner is self.gpu_slot.controller else "cpu",
+                            coin=miner.current_coin if miner.is_mining else None, threads_to=miner.running_threads,
+                            hashrate=miner.get_hashrate() if miner.is_mining else None, priority=miner.priority)
+        snapshot.update(fields)
+        self.journal.record(kind, **snapshot)
+
+    def thermal_step(self, cpu_temp, gpu_temp):
+        """PID governor step for the running miner; runs every loop iteration and on every adaptive sensor read."""
+        miner = self.current_miner
+        if not USE_PID_THERMAL or not (miner and miner.is_mining and miner.current_coin) or miner.calibrating:
+            return
+        if self.gpu_slot:  # The GPU slot has its own thermal domain; the CPU governor only follows the CPU
+            gpu_temp = None
+        threads, priority, intensity = self.thermal.plan(time.time(), cpu_temp, gpu_temp, miner.current_threads, miner.running_threads)
+        if DEBUG and intensity < 1:
+            print(f"Thermal intensity {intensity:.2f}: {threads}/{miner.current_threads} threads ({self.thermal.describe()})")
+        if not miner.set_cap("thermal", threads if threads < miner.current_threads else None, priority):
+            print(f"Failed to restart miner with {threads} threads for {miner.current_coin}.")
+            self.current_miner = None
+
+    def controllers(self):
+        return [self.xmrig_controller, self.srbminer_controller, self.deroluna_controller]
+
+    def start_game(self, slug):
+        """
+        A game from MyGames started: begin profiling it and, if its profile says it is light,
+        cap the running miner instead of stopping it. Returns True if the miner keeps running.
+        """
+        import psutil
+        if self.game_profile:  # Switched from another game without a gap
+            self.game_profile.save()
+        if slug not in self.game_profiles:
+            self.game_profiles[slug] = GameProfile.load(HOSTNAME, slug)
+        profile = self.game_profile = self.game_profiles[slug]
+        profile.sessions += 1
+        self.game_exes = exe_names(dict(self.mirror.my_games()).get(slug))
+        self.game_meter = ProcessCpuMeter()
+        miner = self.current_miner
+        cpu_count = psutil.cpu_count() or 1
+        if DEBUG:
+            print(f"Game profile {profile.describe(cpu_count)}")
+        threads = profile.miner_threads(cpu_count, miner.current_threads) if miner else 0
+        if not USE_GAME_PROFILES or not (miner and miner.is_mining and miner.current_coin) or not profile.is_light(cpu_count) \
+                or threads < MIN_THREADS:
+            self.clear_game_caps()  # The caller stops the miner; it restarts uncapped after the game
+            return False
+        cpus = miner_affinity(threads, cpu_count)
+        print(f"Light game {slug}: keeping {miner.current_coin} on {threads} threads, CPUs {cpus[0]}-{cpus[-1]}, idle priority")
+        self.log_event("game_partial_mining", f"{slug}: {miner.current_coin} on {threads} threads, CPUs {cpus[0]}-{cpus[-1]}")
+        miner.set_affinity(cpus)  # Before the cap, so a restart starts restricted
+        if not miner.set_cap("game", threads, "idle"):
+            print(f"Failed to restart miner with {threads} threads for {miner.current_coin}.")
+            self.current_miner = None
+        return True
+
+    def end_game(self):
+        """The game exited: save its profile and lift the game cap and affinity."""
+        if self.game_profile:
+            self.game_profile.save()
+            self.game_profile = None
+        miner = self.current_miner
+        if miner and miner.is_mining and "game" in miner.caps:
+            miner.set_affinity(None)
+            if not miner.set_cap("game", None):
+                print(f"Failed to restart miner for {miner.current_coin}.")
+                self.current_miner = None
+        self.clear_game_caps(keep=self.current_miner)
+
+    def clear_game_caps(self, keep=None):
+        """Forget game caps and affinity on stopped miners (no restart), all but keep."""
+        for miner in self.controllers():
+            if miner is not keep:
+                miner.caps.pop("game", None)
+                miner.affinity = None
+
+    def game_step(self, gpu_usage):
+        """
+        Profile sample for the running game: its CPU use, GPU usage and the recorder's FPS,
+        filed under whether the miner runs. Stops the miner if it measurably costs frame rate.
+        """
+        profile = self.game_profile
+        if not profile:
+            return
+        miner = self.current_miner
+        mining = bool(miner and miner.is_mining)
+        profile.add_sample("partial" if mining else "stopped", self.game_meter.sample(game_pids(self.game_exes)),
+                           gpu_usage, read_recorder_fps())
+        if mining and profile.check_impact():
+            self.log_event("game_partial_mining_stopped", f"{profile.slug}: FPS impact {profile.fps_impact() * 100:.1f}%")
+            miner.stop_mining()
+            self.current_miner = None
+            self.clear_game_caps()
+
+    def arbiter_step(self):
+        """
+        Apply the resource arbiter's policy for the current state (game, recording, steamcmd
+        update) to the recorder, steamcmd and the running miner. The miner's CPU priority goes
+        through its caps and its affinity through set_affinity, so a restart keeps both.
+        """
+        if not USE_RESOURCE_ARBITER:
+            return
+        found = find_processes()
+        self.arbiter.update(game=self.is_game_running, recording=read_recorder_fps() is not None, updating=bool(found["updater"]))
+        for role, pids in found.items():
+            self.arbiter.apply(role, pids)
+        miner = self.current_miner
+        if miner and miner.is_mining and miner.process:
+            priority, _, cpus = self.arbiter.policy("miner")
+            self.arbiter.apply("miner", [miner.process.pid], priority=False, affinity=False)
+            if "game" not in miner.caps:  # A light game's profile already placed the miner
+                wanted = None if len(cpus) == self.arbiter.cpu_count else cpus
+                if wanted != miner.affinity:
+                    miner.set_affinity(wanted)
+            if not miner.set_cap("arbiter", None, priority):
+                print(f"Failed to restart miner for {miner.current_coin}.")
+                self.current_miner = None
+        self.arbiter.forget_exited()
+
+    def pool_step(self):
+        """Move running miners off pools that reject shares, stopped answering or are much slower than the best one."""
+        if not USE_POOL_PROBER:
+            return
+        for miner in [self.current_miner] + ([self.gpu_slot.controller] if self.gpu_slot else []):
+            if not (miner and miner.is_mining and miner.current_coin and miner.pool_url):
+                continue
+            telemetry = miner.telemetry if miner.api_is_fresh(time.time()) else None
+            failover = self.pool_prober.should_failover(miner.current_coin, miner.pool_url,
+                                                        telemetry.shares_accepted if telemetry else None,
+                                                        telemetry.shares_rejected if telemetry else None)
+            if not failover:
+                continue
+            url, reason = failover
+            coin = miner.current_coin
+            print(f"Pool failover for {coin}: {miner.pool_url} -> {url} ({reason})")
+            self.log_event("pool_failover", f"{coin}: {miner.pool_url} -> {url} ({reason})")
+            miner.stop_mining()
+            restarted = miner.start_mining(coin, keep_threads=True)
+            self.record_decision("pool_failover" if restarted else "start_failed", miner, source="pool", coin=coin, previous=coin)
+            if not restarted and miner is self.current_miner:
+                print(f"Failed to restart {coin} on {url}. Supervisor will back it off.")
+                self.current_miner = None
+
+    def gpu_slot_step(self, gpu_temp):
+        """
+        Run the GPU slot next to the CPU miner: its own coin from BestCoinsForRigView rows for
+        GPU_WORKER, stopped while a game runs (games always get the GPU) or while the GPU is
+        over its limit. Books the slot's revenue.
+        """
+        slot = self.gpu_slot
+        if not slot:
+            return
+        miner = slot.controller
+        if not wa_functions.GPU_TYPE and not USE_FAKE_MINER:
+            slot.preempted_by = "no GPU"
+        elif self.is_game_running:
+            slot.preempted_by = "game"
+        elif not slot.thermal_ok(gpu_temp):
+            slot.preempted_by = "temperature"
+        else:
+            slot.preempted_by = None
+        if slot.preempted_by:
+            if miner.is_mining:
+                miner.stop_mining()
+                self.log_event("gpu_slot_preempted", f"{miner.current_coin}: {slot.preempted_by}")
+                self.record_decision("preempt", miner, source=slot.preempted_by, previous=miner.current_coin)
+        else:
+            rows = self.mirror.best_coins(miner.current_coin or "", HYSTERESIS, worker=slot.worker)
+            row = slot.choose(rows, lambda symbol: miner.coin_cache.is_enabled(symbol) and self.supervisor.can_start(miner.name, symbol)[0])
+            if row and (not miner.is_mining or row.symbol != miner.current_coin):
+                previous_coin = miner.current_coin if miner.is_mining else None
+                if miner.is_mining:
+                    miner.stop_mining()
+                print(f"GPU slot: mining {row.symbol} with revenue {row.rev_rig_correct}")
+                success = miner.start_mining(row.symbol)
+                self.record_decision("coin_pick" if success else "start_failed", miner, coin=row.symbol, previous=previous_coin,
+                                     revenue=row.rev_rig_correct, health=self.supervisor.score(miner.name, row.symbol))
+            elif not row and DEBUG:
+                print(f"GPU slot: no coin for worker {slot.worker}")
+        coin = miner.current_coin if miner.is_mining else None
+        slot.revenue.account(coin, self.mirror.revenue(coin, slot.worker) if coin else None, efficiency(miner))
+
+    def revenue_step(self):
+        """Book the CPU slot's revenue and report both slots once an hour."""
+        miner = self.current_miner
+        coin = miner.current_coin if miner and miner.is_mining else None
+        self.cpu_revenue.account(coin, self.mirror.revenue(coin) if coin else None, efficiency(miner) if coin else None)
+        if self.cpu_revenue.report_due():
+            report = [self.cpu_revenue.metrics()] + ([self.gpu_slot.revenue.metrics()] if self.gpu_slot else [])
+            print(f"Slot revenue: {report}")
+            self.log_event("slot_revenue", json.dumps(report))
+
+    def hashrate_share(self, coin, threads, ceiling):
+        """Hashrate at threads as a share of the ceiling's, from the coin's autotuner measurements when it has both."""
+        miner = self.get_miner_for_coin(coin)
+        stats = miner.get_autotuner(coin).stats if miner else {}
+        if threads in stats and ceiling in stats and stats[ceiling]["hashrate"]:
+            return min(stats[threads]["hashrate"] / stats[ceiling]["hashrate"], 1.0)
+        return linear_share(coin, threads, ceiling)
+
+    def stopped_ceiling(self, revenue):
+        """Full-intensity threads with no miner running: the best-paying coin's autotuned count, else its miner's default."""
+        if not revenue:
+            return XMRIG_THREADS
+        coin = max(revenue, key=revenue.get)
+        miner = self.get_miner_for_coin(coin)
+        best = miner.get_autotuner(coin).best() if USE_AUTOTUNER else None
+        return best or miner.default_threads
+
+    @property
+    def tariff_off(self):
+        """True while the tariff plan says mining would lose money."""
+        return bool(USE_TARIFF_PLAN and self.tariff_slot and not self.tariff_slot.coin)
+
+    def tariff_step(self):
+        """
+        Re-plan the day ahead when due (rev_rig_correct of every minable coin, the tariff and the
+        power model), then follow the current slot: stop the CPU miner in "off" slots and cap
+        its threads to the slot's intensity. The slot's coin is preferred by the coin choice.
+        """
+        if not USE_TARIFF_PLAN:
+            return
+        now = datetime.now()
+        if self.tariff.due(now):
+            revenue = {row.symbol: row.rev_rig_correct for row in self.mirror.all_best_coins()
+                       if row.rev_rig_correct and self.get_miner_for_coin(row.symbol) and self.coin_cache.is_enabled(row.symbol)}
+            ceiling = self.current_miner.current_threads if self.current_miner else self.stopped_ceiling(revenue)
+            self.tariff.make_plan(now, revenue, ceiling)
+            self.tariff.save(TARIFF_PLAN_PATH)
+            self.tariff.power.save(POWER_MODEL_PATH)
+            print(f"Tariff plan: {self.tariff.summary()}")
+            self.log_event("tariff_plan", self.tariff.summary())
+        slot = self.tariff.current(now)
+        if slot and (not self.tariff_slot or slot.start != self.tariff_slot.start):
+            print(f"Tariff slot: {slot}")
+        self.tariff_slot = slot
+        for miner in self.controllers():
+            if miner is not self.current_miner:
+                miner.caps.pop("tariff", None)
+        miner = self.current_miner
+        if not (miner and miner.is_mining and miner.current_coin):
+            return
+        if self.tariff_off:
+            print(f"Tariff plan: mining loses money at {slot.price}/kWh, stopping {miner.current_coin}")
+            miner.stop_mining()
+            miner.log_event("tariff_off", f"{miner.current_coin} stopped at {slot.price}/kWh until {slot.end:%H:%M}")
+            self.record_decision("preempt", miner, source="tariff", previous=miner.current_coin)
+            self.current_miner = None
+            return
+        cap = slot.threads if slot and slot.threads < miner.current_threads else None
+        if not miner.set_cap("tariff", cap):
+            print(f"Failed to restart miner with {cap} threads for {miner.current_coin}.")
+            self.current_miner = None
+
+    def power_step(self):
+        """
+        Sample CPU/GPU power once per loop. Mining watts (package power over the not-mining
+        baseline) of a miner that ran the whole interval at one thread count, outside games,
+        become measured points of the tariff plan's power model.
+        """
+        if not self.power:
+            return
+        miner = self.current_miner
+        mining = bool(miner and miner.is_mining and miner.current_coin)
+        self.power.sample(mining or self.is_game_running)  # A game's load is not the idle baseline
+        self.decision_inputs["cpu_power"] = self.power.latest["cpu"]
+        state = (miner.current_coin, miner.running_threads) if mining else None
+        watts = self.power.mining_watts()
+        if state and state == self.power_state and not self.is_game_running and watts is not None:
+            self.tariff.power.observe(miner.current_coin, miner.running_threads, watts)
+            if DEBUG:
+                print(f"Power: {self.power.latest}, mining {watts:.1f} W for {miner.current_coin} x{miner.running_threads}")
+        self.power_state = state
+
+    def idle_step(self, idle_seconds=None):
+        """
+        Idle governor step: threads and priority follow the time since the last input and the
+        CPU other processes use, instead of pausing outright. Thread changes only go live
+        through the xmrig API; without it a restart per mouse move would cost more than it
+        saves, so only the priority follows.
+        """
+        self.next_idle_poll = time.monotonic() + IDLE_POLL_INTERVAL
+        miner = self.current_miner
+        if not USE_IDLE_INTENSITY or PAUSE_XMRIG or not (miner and miner.is_mining and miner.current_coin and miner.process):
+            return
+        if miner.calibrating:
+            return
+        if idle_seconds is None:
+            idle_seconds = get_idle_time()
+        intensity = self.idle.update(time.monotonic(), idle_seconds, self.idle.meter.sample([miner.process.pid]))
+        threads, priority = intensity_plan(intensity, miner.current_threads, miner.running_threads, MIN_THREADS)
+        cap = threads if miner.api_client and threads < miner.current_threads else None
+        if DEBUG and intensity < 1:
+            print(f"Idle intensity {intensity:.2f}: {threads}/{miner.current_threads} threads ({self.idle.describe()})")
+        if not miner.set_cap("idle", cap, priority):
+            print(f"Failed to restart miner with {threads} threads for {miner.current_coin}.")
+            self.current_miner = None
+
+    async def sleep_with_sensors(self, duration):
+        """
+        Sleep until the next loop iteration, reading sensors whenever they are due and running
+        the thermal step on each read, and stepping the idle governor every IDLE_POLL_INTERVAL.
+        Returns early if a reading calls for an emergency stop.
+        """
+        if not USE_ADAPTIVE_SENSORS and not USE_IDLE_INTENSITY:
+            await asyncio.sleep(duration)
+            return
+        deadline = time.monotonic() + duration
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait = remaining
+            if USE_ADAPTIVE_SENSORS:
+                wait = min(wait, self.sensors.seconds_until_due())
+            if USE_IDLE_INTENSITY:
+                wait = min(wait, max(0.0, self.next_idle_poll - time.monotonic()))
+            await asyncio.sleep(wait)
+            if time.monotonic() >= deadline:
+                break
+            if USE_IDLE_INTENSITY and time.monotonic() >= self.next_idle_poll:
+                self.idle_step()
+            if USE_ADAPTIVE_SENSORS and self.sensors.poll_due():
+                readings = self.sensors.latest()
+                self.thermal_step(readings["cpu"], readings["gpu"])
+                if USE_PID_THERMAL and self.thermal.emergency(readings["cpu"], None if self.gpu_slot else readings["gpu"]):
+                    break
+        if USE_ADAPTIVE_SENSORS and self.sensors.report_due():
+            report = self.sensors.describe(SLEEP_INTERVAL)
+            print(f"Sensor cost: {report}")
+            self.log_event("sensor_cost", report)
+
     async def amain(self):
         if not is_admin():
             print("Warning: Not running as admin. Should work for API calls, but monitor for issues.")
         if USE_MQTT:
+            mqtt_client.on_message = self.on_mqtt_message
+            mqtt_client.on_connect = self.on_mqtt_connect
             mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
             mqtt_client.loop_start()
+        if USE_POOL_PROBER:
+            self.pool_prober.start(POOL_PROBE_INTERVAL)  # Own thread and event loop; until its first round, miners start on the configured pool
         is_paused = False
         DEFAULT_COINS = ["WOW", "NICEHASH"]
         best_coin = None
@@ -610,16 +1407,14 @@ class ScreenRunSwitcher:
                     result = self.session_miningDB.execute(text("SELECT 1")).fetchall()
                     print(f"miningDB session test successful: {result}")
                 except Exception as e:
-                    print(f"miningDB session test failed: {e}")
+                    print(f"miningDB session test failed: {e}. Using local mirror.")
                     self.session_miningDB = self.Session_miningDB()
-                    continue
                 try:
                     result = self.session_fogplayDB.execute(text("SELECT 1")).fetchall()
                     print(f"fogplayDB session test successful: {result}")
                 except Exception as e:
-                    print(f"fogplayDB session test failed: {e}")
+                    print(f"fogplayDB session test failed: {e}. Using local mirror.")
                     self.session_fogplayDB = self.Session_fogplayDB()
-                    continue
                 try:
                     self.session_miningDB.commit()
                     print("miningDB commit successful")
@@ -634,7 +1429,7 @@ class ScreenRunSwitcher:
                     print(f"fogplayDB commit failed: {e}")
                     self.session_fogplayDB.rollback()
                     self.session_fogplayDB = self.Session_fogplayDB()
-                current_game = get_current_game(self.session_fogplayDB)
+                current_game = get_current_game(game_rows=self.mirror.my_games())
                 if current_game != self.last_game:
                     if current_game is not None:
                         game_payload = json.dumps({
@@ -643,119 +1438,145 @@ class ScreenRunSwitcher:
                             "timestamp": datetime.now().isoformat()
                         })
                         if USE_MQTT: mqtt_client.publish(MQTT_GAME_TOPIC, game_payload)
-                        EventsData = Events(
-                            timestamp=datetime.now(),
-                            event="new_game_started",
-                            value=current_game,
-                            server=MTS_SERVER_NAME
-                        )
-                        self.session_fogplayDB.add(EventsData)
-                        self.session_fogplayDB.commit()
+                        self.log_event("new_game_started", current_game)
                         if DEBUG:
                             print(f"New game detected: {current_game}")
                             if USE_MQTT: print(f"Published to {MQTT_GAME_TOPIC}: {game_payload}")
-                        if self.current_miner:
+                        keeps_mining = self.start_game(current_game)  # Every game change, so each game gets its own profile
+                        if self.current_miner and not keeps_mining:
                             self.current_miner.stop_mining()
+                            self.record_decision("preempt", self.current_miner, source="game", game=True, previous=self.current_miner.current_coin)
                             self.current_miner = None
                         self.is_game_running = True
                     else:
                         if self.is_game_running:
+                            self.end_game()
+                        if self.is_game_running and self.current_miner and self.current_miner.is_mining:
+                            print("Game stopped. Miner back to full intensity.")
+                            self.is_game_running = False
+                        elif self.is_game_running:
                             print("Game stopped. Restarting miner with best coin...")
-                            if best_coin and selected_miner and not self.is_overheating:
+                            if best_coin and selected_miner and not self.is_overheating and not self.tariff_off:
                                 success = selected_miner.start_mining(best_coin)
+                                self.record_decision("coin_pick" if success else "start_failed", selected_miner, source="game", coin=best_coin,
+                                                     health=self.get_coin_health(best_coin))
                                 if success:
                                     self.current_miner = selected_miner
                                 else:
-                                    print(f"Failed to start mining {best_coin}. Adding to cooldown.")
-                                    self.failed_coins[best_coin] = time.time() + FAILED_COIN_COOLDOWN
-                                    selected_miner.last_failed_coin = best_coin
+                                    print(f"Failed to start mining {best_coin}. Supervisor will back it off.")
                             self.is_game_running = False
                     self.last_game = current_game
+                sensors_read = True
                 try:
-                    cpu_temp = get_cpu_temperature()
-                    gpu_temp = get_gpu_temperature()
+                    if USE_ADAPTIVE_SENSORS:
+                        sensors_read = bool(self.sensors.poll_due())  # Otherwise the cached values from the last due read
+                        readings = self.sensors.latest()
+                        cpu_temp, gpu_temp = readings["cpu"], readings["gpu"]
+                    else:
+                        cpu_temp = get_cpu_temperature()
+                        gpu_temp = get_gpu_temperature()
                     if DEBUG:
                         print(f"CPU Temp: {cpu_temp}°C, GPU Temp: {gpu_temp}°C")
                 except Exception as e:
                     print(f"Error getting temperatures: {e}")
                     cpu_temp = None
                     gpu_temp = None
-                if self.current_miner and self.current_miner.is_mining and self.current_miner.current_coin:
+                self.decision_inputs.update(cpu_temp=cpu_temp, gpu_temp=gpu_temp)
+                if sensors_read:  # A repeated cached value would flatten the governor's trend
+                    self.thermal_step(cpu_temp, gpu_temp)
+                if self.current_miner and self.current_miner.is_mining and self.current_miner.current_coin and USE_AUTOTUNER:
+                    miner = self.current_miner
+                    if not miner.calibrating and not miner.throttled:  # Measurements under throttling would mislead it
+                        tuner = miner.get_autotuner(miner.current_coin)
+                        new_threads = tuner.observe(time.time(), miner.running_threads, miner.get_hashrate(), cpu_temp)
+                        if new_threads is not None:
+                            print(f"Autotune {miner.current_coin}: {miner.running_threads} -> {new_threads} threads ({tuner.describe()})")
+                            previous_threads = miner.running_threads
+                            if not miner.change_threads(new_threads):
+                                print(f"Failed to restart miner with {new_threads} threads for {miner.current_coin}.")
+                                self.current_miner = None
+                            self.record_decision("threads", miner, source="autotune", threads_from=previous_threads)
+                elif self.current_miner and self.current_miner.is_mining and self.current_miner.current_coin and not USE_PID_THERMAL:
                     if cpu_temp and cpu_temp > CPU_TEMP_THRESHOLD:
                         print(f"CPU temperature ({cpu_temp}°C) exceeds threshold ({CPU_TEMP_THRESHOLD}°C). Reducing threads...")
                         new_threads = self.current_miner.current_threads - THREAD_INCREMENT
                         if self.current_miner.update_threads(new_threads):
+                            previous_threads = self.current_miner.running_threads
                             self.current_miner.stop_mining()
                             success = self.current_miner.start_mining(self.current_miner.current_coin)
+                            self.record_decision("threads", self.current_miner, source="thermal", threads_from=previous_threads)
                             if not success:
-                                print(f"Failed to restart miner with {new_threads} threads for {self.current_miner.current_coin}. Adding to cooldown.")
-                                self.failed_coins[self.current_miner.current_coin] = time.time() + FAILED_COIN_COOLDOWN
-                                self.current_miner.last_failed_coin = self.current_miner.current_coin
+                                print(f"Failed to restart miner with {new_threads} threads for {self.current_miner.current_coin}.")
                                 self.current_miner = None
                     elif cpu_temp and cpu_temp <= CPU_TEMP_LOWER_THRESHOLD:
                         print(f"CPU temperature ({cpu_temp}°C) below lower threshold ({CPU_TEMP_LOWER_THRESHOLD}°C). Increasing threads...")
                         new_threads = self.current_miner.current_threads + THREAD_INCREMENT
                         if self.current_miner.update_threads(new_threads):
+                            previous_threads = self.current_miner.running_threads
                             self.current_miner.stop_mining()
                             success = self.current_miner.start_mining(self.current_miner.current_coin)
+                            self.record_decision("threads", self.current_miner, source="thermal", threads_from=previous_threads)
                             if not success:
-                                print(f"Failed to restart miner with {new_threads} threads for {self.current_miner.current_coin}. Adding to cooldown.")
-                                self.failed_coins[self.current_miner.current_coin] = time.time() + FAILED_COIN_COOLDOWN
-                                self.current_miner.last_failed_coin = self.current_miner.current_coin
+                                print(f"Failed to restart miner with {new_threads} threads for {self.current_miner.current_coin}.")
                                 self.current_miner = None
                 if not self.is_overheating:
-                    if gpu_temp and gpu_temp > GPU_TEMP_THRESHOLD:
+                    if USE_PID_THERMAL and self.thermal.emergency(cpu_temp, None if self.gpu_slot else gpu_temp):
+                        print(f"Temperatures far over the limits even at reduced intensity (CPU {cpu_temp}°C, GPU {gpu_temp}°C). Stopping mining...")
+                        if self.current_miner:
+                            self.current_miner.stop_mining()
+                            self.current_miner.log_event("overheating", f"CPU {cpu_temp}°C, GPU {gpu_temp}°C: {self.thermal.describe()}")
+                            self.record_decision("overheat_stop", self.current_miner, source="thermal", previous=self.current_miner.current_coin)
+                            self.current_miner = None
+                        self.is_overheating = True
+                    elif not USE_PID_THERMAL and gpu_temp and gpu_temp > GPU_TEMP_THRESHOLD:
                         print(f"GPU temperature ({gpu_temp}°C) exceeds threshold ({GPU_TEMP_THRESHOLD}°C). Stopping mining...")
                         if self.current_miner:
                             self.current_miner.stop_mining()
                             self.current_miner.log_event("overheating", f"GPU temperature too high: {gpu_temp}°C")
+                            self.record_decision("overheat_stop", self.current_miner, source="temperature", previous=self.current_miner.current_coin)
                             self.current_miner = None
                         self.is_overheating = True
                 if self.is_overheating:
                     if (cpu_temp is None or cpu_temp <= CPU_TEMP_THRESHOLD) and (gpu_temp is None or gpu_temp <= GPU_TEMP_THRESHOLD):
                         print("Temperatures have dropped below thresholds. Resuming mining...")
                         self.is_overheating = False
+                        self.record_decision("overheat_resume", source="temperature")
+                self.tariff_step()
                 failed_coin = None
                 if self.current_miner and not self.current_miner.is_mining and self.current_miner.last_failed_coin:
                     failed_coin = self.current_miner.last_failed_coin
-                    print(f"Current miner failed for {failed_coin}. Adding to cooldown for {FAILED_COIN_COOLDOWN}s.")
-                    self.failed_coins[failed_coin] = time.time() + FAILED_COIN_COOLDOWN
-                    self.current_miner.log_event("coin_switch", f"Switched from {failed_coin} due to repeated low hashrate")
+                    print(f"Current miner failed for {failed_coin}. Health {self.get_coin_health(failed_coin):.2f}, "
+                          f"backing off for {self.supervisor.backoff_remaining(self.current_miner.name, failed_coin):.0f}s.")
+                    self.current_miner.log_event("coin_switch", f"Switched from {failed_coin} after miner failure")
+                    self.record_decision("failure", self.current_miner, source="supervisor", previous=failed_coin,
+                                         health=self.get_coin_health(failed_coin))
                     self.current_miner = None
-                print(f"Querying BestCoinsForRigView for worker '{HOSTNAME}' with non-NULL rev_rig_correct...")
-                best_coin_query = None
+                best_coin_query = self.get_coordinator_coin()
+                if best_coin_query:
+                    print(f"Using coordinator assignment: {best_coin_query.symbol}")
+                else:
+                    print(f"Reading best coins for worker '{HOSTNAME}' with non-NULL rev_rig_correct from local mirror...")
                 try:
-                    current_symbol = best_coin_query.symbol if best_coin_query is not None else 'WOW'
-                    valid_coins = self.session_miningDB.query(
-                        BestCoinsForRigView.position,
-                        BestCoinsForRigView.symbol,
-                        BestCoinsForRigView.worker,
-                        BestCoinsForRigView.rev_rig_correct,
-                        case(
-                            (BestCoinsForRigView.symbol == current_symbol, BestCoinsForRigView.rev_rig_correct * HYSTERESIS),
-                            else_=BestCoinsForRigView.rev_rig_correct
-                        ).label('modified_rev_rig_correct')
-                    ).filter(
-                        BestCoinsForRigView.worker == HOSTNAME,
-                        BestCoinsForRigView.rev_rig_correct.isnot(None)
-                    ).order_by(
-                        case(
-                            (BestCoinsForRigView.symbol == current_symbol, BestCoinsForRigView.rev_rig_correct * HYSTERESIS),
-                            else_=BestCoinsForRigView.rev_rig_correct
-                        ).desc()
-                    ).all()
+                    current_symbol = best_coin if best_coin else 'WOW'
+                    valid_coins = [] if best_coin_query else self.mirror.best_coins(current_symbol, HYSTERESIS)
+                    # Rank by revenue weighted with supervisor health so flaky coins lose to stable ones
+                    valid_coins = sorted(valid_coins, key=lambda r: r.modified_rev_rig_correct * self.get_coin_health(r.symbol), reverse=True)
+                    if USE_TARIFF_PLAN and self.tariff_slot and self.tariff_slot.coin:  # The plan already weighed power against revenue
+                        valid_coins.sort(key=lambda r: r.symbol != self.tariff_slot.coin)
                     if DEBUG:
                         for r in valid_coins:
                             print(f"Raw view data: {r.position}, {r.symbol}, {r.worker}, {r.rev_rig_correct}, {r.modified_rev_rig_correct}")
                     for coin in valid_coins:
-                        print(f"coin found: symbol={coin.symbol}, worker={coin.worker}, rev_rig_correct={coin.rev_rig_correct}")
+                        print(f"coin found: symbol={coin.symbol}, worker={coin.worker}, rev_rig_correct={coin.rev_rig_correct}, health={self.get_coin_health(coin.symbol):.2f}")
+                        if not self.coin_cache.is_enabled(coin.symbol):
+                            if DEBUG:
+                                print(f"Skipping {coin.symbol}: disabled in SupportedCoins")
+                            continue
                         if not self.is_coin_on_cooldown(coin.symbol):
                             best_coin_query = coin
                             break
                 except Exception as e:
-                    print(f"Error querying BestCoinsForRigView: {e}")
-                    self.session_miningDB.rollback()
-                    self.session_miningDB = self.Session_miningDB()
+                    print(f"Error reading best coins from local mirror: {e}")
                 if best_coin_query:
                     print(f"Best coin found: symbol={best_coin_query.symbol}, worker={best_coin_query.worker}, rev_rig_correct={best_coin_query.rev_rig_correct}")
                     best_coin = best_coin_query.symbol
@@ -765,9 +1586,7 @@ class ScreenRunSwitcher:
                 else:
                     print(f"No valid coin found to mine: No results for worker '{HOSTNAME}' with non-NULL rev_rig_correct or all coins are on cooldown.")
                     try:
-                        all_coins = self.session_miningDB.query(BestCoinsForRigView).filter(
-                            BestCoinsForRigView.worker == HOSTNAME
-                        ).all()
+                        all_coins = self.mirror.all_best_coins()
                         if all_coins:
                             print("All entries in BestCoinsForRigView for this worker:")
                             for coin in all_coins:
@@ -787,24 +1606,22 @@ class ScreenRunSwitcher:
                         print("No default coin available to mine (all on cooldown). Skipping this iteration.")
                         await asyncio.sleep(SLEEP_INTERVAL)
                         continue
-                selected_miner = None
-                if best_coin in CoinsListXmrig:
-                    selected_miner = self.xmrig_controller
-                elif best_coin in CoinsListSrbmimer:
-                    selected_miner = self.srbminer_controller
-                elif best_coin == "DERO":
-                    selected_miner = self.deroluna_controller
-                if not self.is_game_running and not self.is_overheating and selected_miner:
+                selected_miner = self.get_miner_for_coin(best_coin)
+                if not self.is_game_running and not self.is_overheating and not self.tariff_off and selected_miner:
                     if self.current_miner != selected_miner or (self.current_miner and self.current_miner.current_coin != best_coin):
+                        previous_coin = self.current_miner.current_coin if self.current_miner else None
                         if self.current_miner:
                             self.current_miner.stop_mining()
                         success = selected_miner.start_mining(best_coin)
+                        self.record_decision("coin_pick" if success else "start_failed", selected_miner, coin=best_coin, previous=previous_coin,
+                                             source="tariff" if self.tariff_slot and self.tariff_slot.coin == best_coin else None,
+                                             revenue=best_coin_query.rev_rig_correct if best_coin_query else None,
+                                             health=self.get_coin_health(best_coin))
                         if success:
                             self.current_miner = selected_miner
                         else:
-                            print(f"Failed to start mining {best_coin}. Adding to cooldown.")
-                            self.failed_coins[best_coin] = time.time() + FAILED_COIN_COOLDOWN
-                            selected_miner.last_failed_coin = best_coin
+                            print(f"Failed to start mining {best_coin}. Supervisor will back it off.")
+                            await asyncio.sleep(SLEEP_INTERVAL)
                             continue
                 hashrate = 0.0
                 if self.current_miner:
@@ -824,6 +1641,8 @@ class ScreenRunSwitcher:
                 elif idle_time >= IDLE_THRESHOLD and is_paused and PAUSE_XMRIG:
                     if resume_xmrig():
                         is_paused = False
+                self.decision_inputs["idle_seconds"] = idle_time
+                self.idle_step(idle_time)
                 detect_gpu()
                 if GPU_TYPE:
                     gpu_metrics = get_gpu_metrics()
@@ -831,10 +1650,34 @@ class ScreenRunSwitcher:
                 else:
                     print("Cannot retrieve GPU metrics: No GPU detected.")
                     gpu_metrics = {"temperature": None, "usage": None, "fan_speed_rpm": None, "fan_speed_percent": None}
+                self.decision_inputs["gpu_usage"] = gpu_metrics["usage"]
+                self.game_step(gpu_metrics["usage"])
+                self.arbiter_step()
+                self.gpu_slot_step(gpu_temp)
+                self.pool_step()
+                self.revenue_step()
+                self.power_step()
+                switch_metrics = self.mirror.get_sync_metrics()
+                if self.power:
+                    switch_metrics.update(self.power.metrics(hashrate))
+                if self.current_miner and self.current_miner.current_coin:
+                    switch_metrics.update(self.supervisor.metrics(self.current_miner.name, self.current_miner.current_coin))
+                if self.current_miner and self.current_miner.api_is_fresh(time.time()):
+                    switch_metrics.update(self.current_miner.telemetry.metrics())
+                if self.current_miner and self.current_miner.is_mining:
+                    self.current_miner.save_start_status()
+                    switch_metrics.update(self.current_miner.memory_metrics())
+                if DEBUG:
+                    print(f"Mirror sync lag: {switch_metrics['mirror_sync_lag']}s, staleness: {switch_metrics['mirror_staleness']}s")
                 if self.current_miner and self.current_miner.is_mining and self.current_miner.current_coin:
-                    update_miner_stats(self.session_miningDB, HOSTNAME, self.current_miner.current_coin, hashrate, cpu_temp, gpu_metrics)
+                    update_miner_stats(self.session_miningDB, HOSTNAME, self.current_miner.current_coin, hashrate, cpu_temp, gpu_metrics, switch_metrics)
+                if self.gpu_slot and self.gpu_slot.controller.is_mining:
+                    gpu_miner = self.gpu_slot.controller
+                    gpu_hashrate = gpu_miner.get_hashrate()
+                    update_miner_stats(self.session_miningDB, GPU_WORKER, gpu_miner.current_coin, gpu_hashrate, cpu_temp, gpu_metrics,
+                                       self.power.metrics(gpu_hashrate, "gpu") if self.power else None)
                 print("Loop iteration completed successfully.")
-                await asyncio.sleep(SLEEP_INTERVAL)
+                await self.sleep_with_sensors(SLEEP_INTERVAL)
             except Exception as e:
                 print(f"Main loop error: {e}")
                 self.session_miningDB.close()
@@ -0,0 +1,91 @@
+# wa_idle.py
+# Idle-proportional mining intensity: full rate when nobody is at the desk, a trickle while the desktop is in use.
+import time
+
+DEBUG = False
+IDLE_ACTIVE_SECONDS = 10  # Input within this many seconds: someone is using the desktop
+IDLE_ACTIVE_INTENSITY = 0.25  # Intensity floor while in use (lowest thread count at idle priority)
+IDLE_RAMP_PER_SECOND = 0.01  # Intensity climbs at most this much per second (0.25 -> 1 in 75 s); it drops at once
+FOREIGN_LOAD_NOISE = 0.05  # Other processes below this share of the CPU are background noise and ignored
+FOREIGN_LOAD_HEADROOM = 0.1  # Leave this much CPU free on top of what other processes use
+IDLE_POLL_INTERVAL = 2.0  # Seconds between idle checks in the main loop's sleep
+
+
+def idle_curve(idle_seconds, full_seconds, active_seconds=IDLE_ACTIVE_SECONDS, floor=IDLE_ACTIVE_INTENSITY):
+    """Intensity for the time since the last input: floor while active, rising linearly to 1 at full_seconds."""
+    if idle_seconds is None or idle_seconds >= full_seconds:
+        return 1.0
+    if idle_seconds <= active_seconds:
+        return floor
+    return floor + (1.0 - floor) * (idle_seconds - active_seconds) / (full_seconds - active_seconds)
+
+
+def load_limit(foreign_load, floor=IDLE_ACTIVE_INTENSITY):
+    """Highest intensity that leaves the CPU other processes use (0-1 share) plus some headroom."""
+    if foreign_load is None or foreign_load < FOREIGN_LOAD_NOISE:
+        return 1.0
+    return min(max(1.0 - foreign_load - FOREIGN_LOAD_HEADROOM, floor), 1.0)
+
+
+def _busy_seconds(times):
+    return sum(times) - times.idle - getattr(times, "iowait", 0.0)
+
+
+class ForeignLoadMeter:
+    """
+    Share of all CPUs used by everything except the miner since the previous sample:
+    system-wide busy time minus the miner processes' own CPU time, from psutil time
+    counters (no sampling sleep). The first sample after the miner's processes change
+    only sets the baseline.
+    """
+    def __init__(self):
+        self.last = None  # (monotonic time, busy seconds, miner seconds, miner pids)
+
+    def sample(self, miner_pids):
+        import psutil
+        now = time.monotonic()
+        busy = _busy_seconds(psutil.cpu_times())
+        miner = 0.0
+        pids = set()
+        for pid in miner_pids:
+            try:
+                process = psutil.Process(pid)
+                for p in [process] + process.children(recursive=True):
+                    times = p.cpu_times()
+                    miner += times.user + times.system
+                    pids.add(p.pid)
+            except psutil.NoSuchProcess:
+                continue
+        last, self.last = self.last, (now, busy, miner, pids)
+        if last is None or last[3] != pids or now <= last[0]:
+            return None
+        capacity = (now - last[0]) * (psutil.cpu_count() or 1)
+        return min(max((busy - last[1]) - (miner - last[2]), 0.0) / capacity, 1.0)
+
+
+class IdleGovernor:
+    """Intensity from input idle time and foreign CPU load; drops immediately, recovers at IDLE_RAMP_PER_SECOND."""
+    def __init__(self, full_seconds):
+        self.full_seconds = full_seconds
+        self.meter = ForeignLoadMeter()
+        self.intensity = 1.0
+        self.target = 1.0
+        self.foreign_load = None
+        self.last_time = None
+
+    def update(self, now, idle_seconds, foreign_load):
+        if foreign_load is not None:
+            self.foreign_load = foreign_load
+        self.target = min(idle_curve(idle_seconds, self.full_seconds), load_limit(self.foreign_load))
+        if self.target < self.intensity or self.last_time is None:
+            self.intensity = self.target
+        else:
+            self.intensity = min(self.target, self.intensity + IDLE_RAMP_PER_SECOND * (now - self.last_time))
+        self.last_time = now
+        if DEBUG:
+            print(f"Idle {idle_seconds}s, foreign load {self.foreign_load}, intensity {self.intensity:.2f}")
+        return self.intensity
+
+    def describe(self):
+        load = f"{self.foreign_load * 100:.0f}%" if self.foreign_load is not None else "?"
+        return f"intensity {self.intensity:.2f} (target {self.target:.2f}), other processes {load} CPU"
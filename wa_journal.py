@@ -0,0 +1,176 @@
+# wa_journal.py
+# Append-only binary journal of switcher decisions with their input snapshot, rotated per day and size; loads a day into NumPy.
+import argparse
+import glob
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+DEBUG = False
+JOURNAL_DIR = "journal"
+JOURNAL_MAX_BYTES = 8 * 1024 * 1024  # Start a new segment of the day past this size
+JOURNAL_KEEP_DAYS = 30  # Days of segments kept
+JOURNAL_MAGIC = b"WAJOURN1"  # Segment header: magic + record size (uint32) + 4 reserved bytes
+
+JOURNAL_KINDS = ("coin_pick", "threads", "cap", "overheat_stop", "overheat_resume", "preempt", "failure", "pool_failover",
+                 "start_failed")
+JOURNAL_SOURCES = ("", "thermal", "idle", "game", "arbiter", "tariff", "autotune", "temperature", "no GPU", "pool", "supervisor")
+JOURNAL_SLOTS = ("cpu", "gpu")
+JOURNAL_PRIORITIES = ("above_normal", "normal", "below_normal", "idle")  # wa_arbiter.PRIORITY_ORDER
+
+# One fixed-size little-endian record per decision. Unknown floats are NaN, unknown ints -1,
+# unknown codes 255; coin symbols are cut to 10 bytes.
+JOURNAL_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("kind", "u1"),  # JOURNAL_KINDS index
+    ("source", "u1"),  # JOURNAL_SOURCES index: cap source or preemption cause
+    ("slot", "u1"),  # JOURNAL_SLOTS index
+    ("priority", "u1"),  # JOURNAL_PRIORITIES index after the decision
+    ("game", "u1"),
+    ("overheating", "u1"),
+    ("coin", "S10"),  # After the decision
+    ("previous", "S10"),  # Before it (coin picks)
+    ("threads_from", "<i2"),
+    ("threads_to", "<i2"),
+    ("cpu_temp", "<f4"),
+    ("gpu_temp", "<f4"),
+    ("gpu_usage", "<f4"),
+    ("hashrate", "<f4"),
+    ("revenue", "<f4"),  # rev_rig_correct of the coin picked
+    ("health", "<f4"),  # Supervisor health of the coin picked
+    ("idle_seconds", "<f4"),
+    ("cpu_power", "<f4"),
+    ("price", "<f4"),  # Tariff price per kWh
+])
+_CODES = {"kind": JOURNAL_KINDS, "source": JOURNAL_SOURCES, "slot": JOURNAL_SLOTS, "priority": JOURNAL_PRIORITIES}
+
+
+def _header():
+    return JOURNAL_MAGIC + np.array([JOURNAL_DTYPE.itemsize, 0], dtype="<u4").tobytes()
+
+
+HEADER_SIZE = len(_header())
+
+
+class DecisionJournal:
+    """
+    Appends JOURNAL_DTYPE records to {folder}/{hostname}_{YYYY-MM-DD}_{segment}.bin. Each record
+    is one write and flush on an open segment, so a crash loses at most the record being
+    written (the reader drops a torn tail). A new segment starts with the local day or past
+    max_bytes; days older than keep_days are deleted on rotation.
+    """
+    def __init__(self, hostname, folder=JOURNAL_DIR, max_bytes=JOURNAL_MAX_BYTES, keep_days=JOURNAL_KEEP_DAYS):
+        self.hostname = hostname
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.keep_days = keep_days
+        self.file = None
+        self.day = None
+        self.size = 0
+        self.record_buffer = np.zeros(1, dtype=JOURNAL_DTYPE)
+
+    def encode(self, kind, timestamp=None, **fields):
+        """One record as bytes; fields are JOURNAL_DTYPE names, code fields given by name."""
+        record = self.record_buffer
+        record[0] = (timestamp if timestamp is not None else time.time(), 0, 0, 0, 255, 0, 0, b"", b"", -1, -1,
+                     *([np.nan] * 9))
+        record["kind"] = JOURNAL_KINDS.index(kind)
+        for name, value in fields.items():
+            if value is None:
+                continue
+            if name in _CODES:
+                value = _CODES[name].index(value) if value in _CODES[name] else 255
+            elif name in ("coin", "previous"):
+                value = str(value).encode()[:10]
+            record[name] = value
+        return record.tobytes()
+
+    def segment_path(self, day, segment):
+        return os.path.join(self.folder, f"{self.hostname}_{day}_{segment:03}.bin")
+
+    def rotate(self, day):
+        if self.file:
+            self.file.close()
+        os.makedirs(self.folder, exist_ok=True)
+        segment = len(glob.glob(os.path.join(self.folder, f"{self.hostname}_{day}_*.bin")))  # A restart starts a new segment
+        path = self.segment_path(day, segment)
+        self.file = open(path, "ab")
+        self.file.write(_header())
+        self.day, self.size = day, HEADER_SIZE
+        if DEBUG:
+            print(f"Decision journal: writing {path}")
+        cutoff = (datetime.strptime(day, "%Y-%m-%d") - timedelta(days=self.keep_days)).strftime("%Y-%m-%d")
+        for old in glob.glob(os.path.join(self.folder, f"{self.hostname}_*.bin")):
+            if os.path.basename(old)[len(self.hostname) + 1:][:10] < cutoff:
+                os.remove(old)
+
+    def record(self, kind, timestamp=None, **fields):
+        timestamp = timestamp if timestamp is not None else time.time()
+        try:
+            day = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+            if day != self.day or self.size >= self.max_bytes:
+                self.rotate(day)
+            data = self.encode(kind, timestamp, **fields)
+            self.file.write(data)
+            self.file.flush()
+            self.size += len(data)
+        except (OSError, ValueError) as e:
+            print(f"Error writing decision journal: {e}")
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def read_day(day, hostname, folder=JOURNAL_DIR):
+    """Every record of hostname's journal for day (YYYY-MM-DD) as one structured array, in write order."""
+    parts = []
+    for path in sorted(glob.glob(os.path.join(folder, f"{hostname}_{day}_*.bin"))):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC or int(np.frombuffer(data, "<u4", 1, len(JOURNAL_MAGIC))[0]) != JOURNAL_DTYPE.itemsize:
+            print(f"Skipping {path}: not a journal segment of this record layout")
+            continue
+        count = (len(data) - HEADER_SIZE) // JOURNAL_DTYPE.itemsize  # A torn last record is dropped
+        parts.append(np.frombuffer(data, JOURNAL_DTYPE, count, HEADER_SIZE))
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=JOURNAL_DTYPE)
+
+
+def decode(records, field):
+    """Names for a code field's values ("?" for unknown codes)."""
+    names = _CODES[field]
+    return [names[code] if code < len(names) else "?" for code in records[field]]
+
+
+def describe(records, last=20):
+    lines = [f"{len(records)} decisions"]
+    if not len(records):
+        return "\n".join(lines)
+    kinds = np.bincount(records["kind"], minlength=len(JOURNAL_KINDS))
+    lines.append(", ".join(f"{kind} {count}" for kind, count in zip(JOURNAL_KINDS, kinds) if count))
+    tail = records[-last:]
+    for record, kind, source, slot in zip(tail, decode(tail, "kind"), decode(tail, "source"), decode(tail, "slot")):
+        lines.append(f"{datetime.fromtimestamp(record['timestamp']):%H:%M:%S} {slot} {kind:15} {source:11} "
+                     f"{record['previous'].decode() or '-':>6} -> {record['coin'].decode() or '-':6} "
+                     f"threads {record['threads_from']}->{record['threads_to']} CPU {record['cpu_temp']:.0f}°C "
+                     f"GPU {record['gpu_temp']:.0f}°C hashrate {record['hashrate']:.0f} rev {record['revenue']:.4f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read the switcher's decision journal")
+    parser.add_argument("--day", default=datetime.now().strftime("%Y-%m-%d"), help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--host", help="Hostname of the journal (default: HOSTNAME from wa_cred)")
+    parser.add_argument("--folder", default=JOURNAL_DIR)
+    parser.add_argument("--last", type=int, default=20, help="Decisions to print")
+    args = parser.parse_args()
+    if not args.host:
+        from wa_cred import HOSTNAME
+        args.host = HOSTNAME
+    began = time.perf_counter()
+    day = read_day(args.day, args.host, args.folder)
+    print(f"Loaded {args.folder}/{args.host}_{args.day} in {(time.perf_counter() - began) * 1000:.0f} ms")
+    print(describe(day, args.last))
@@ -0,0 +1,295 @@
+# wa_local_mirror.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import sessionmaker
+
+from wa_definitions import engine_fogplayDB, engine_miningDB, BestCoinsForRigView, MyGames, SupportedCoins
+
+DEBUG = False
+MIRROR_SYNC_INTERVAL = 60  # Seconds between background syncs from the central Postgres
+
+BestCoinRow = namedtuple("BestCoinRow", ["position", "symbol", "worker", "rev_rig_correct", "modified_rev_rig_correct"])
+GameRow = namedtuple("GameRow", ["slug", "exe_files"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS supported_coins (
+    symbol TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    command_start TEXT,
+    command_stop TEXT,
+    enabled INTEGER,
+    rig_hr_kh REAL,
+    row_hash TEXT NOT NULL,
+    PRIMARY KEY (symbol, worker, command_start)
+);
+CREATE TABLE IF NOT EXISTS best_coins_for_rig (
+    worker TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    position INTEGER,
+    rev_rig_correct REAL,
+    row_hash TEXT NOT NULL,
+    PRIMARY KEY (worker, symbol)
+);
+CREATE TABLE IF NOT EXISTS my_games (
+    slug TEXT PRIMARY KEY,
+    active INTEGER,
+    exe_files TEXT,
+    row_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_name TEXT PRIMARY KEY,
+    last_attempt REAL,
+    last_success REAL,
+    last_duration REAL,
+    row_count INTEGER,
+    changed INTEGER,
+    last_error TEXT,
+    fingerprint TEXT
+);
+"""
+
+# Mirrored tables: (name, key columns, value columns); the keys match the Postgres primary keys
+MIRROR_TABLES = {
+    "supported_coins": (("symbol", "worker", "command_start"), ("command_stop", "enabled", "rig_hr_kh")),
+    "best_coins_for_rig": (("worker", "symbol"), ("position", "rev_rig_correct")),
+    "my_games": (("slug",), ("active", "exe_files")),
+}
+
+# Change queries: a cheap fingerprint per mirrored table; its rows are only fetched again when it changes.
+# Tables: row count and newest xmin (inserts and updates write a tuple with a new xmin, deletes lower the count).
+# best_coins_for_rig is a view without xmin: Postgres still evaluates it, but only an md5 of its rows is sent.
+REMOTE_FINGERPRINTS = {
+    "supported_coins": "SELECT count(*), max(xmin::text::bigint) FROM supported_coins WHERE worker IN :workers",
+    "best_coins_for_rig": "SELECT count(*), md5(string_agg(concat_ws('|', worker, symbol, position, rev_rig_correct), ',' "
+                          "ORDER BY worker, symbol)) FROM best_coins_for_rig WHERE worker IN :workers",
+    "my_games": "SELECT count(*), max(xmin::text::bigint) FROM my_games",
+}
+
+
+def _row_hash(values):
+    return hashlib.sha1(json.dumps(values, default=str).encode("utf-8")).hexdigest()
+
+
+def _drop_rekeyed_tables(conn):
+    """Drop mirrored tables created with another primary key than MIRROR_TABLES'; the next sync refills them."""
+    for table_name, (key_cols, _) in MIRROR_TABLES.items():
+        columns = conn.execute(f"PRAGMA table_info({table_name})").fetchall()  # (cid, name, type, notnull, default, pk)
+        key = [name for _, name, _, _, _, pk in sorted(columns, key=lambda c: c[5]) if pk]
+        if columns and key != list(key_cols):
+            print(f"Mirror table {table_name} keyed by {key}, now {list(key_cols)}: recreating it")
+            conn.execute(f"DROP TABLE {table_name}")
+            conn.execute("DELETE FROM sync_state WHERE table_name = ?", (table_name,))
+
+
+def _add_fingerprint_column(conn):
+    """sync_state from before the change queries has no fingerprint column: add it (empty, so the next sync fetches)."""
+    columns = [name for _, name, *_ in conn.execute("PRAGMA table_info(sync_state)")]
+    if "fingerprint" not in columns:
+        conn.execute("ALTER TABLE sync_state ADD COLUMN fingerprint TEXT")
+
+
+class LocalMirror:
+    """
+    Local SQLite copy of supported_coins, best_coins_for_rig (this worker and extra_workers,
+    e.g. the rig's GPU slot worker) and my_games.
+
+    A background thread syncs from Postgres; reads never touch the network, so the
+    switcher keeps working on the last known data while the central DB is down.
+    Sync is incremental on both sides: a change query (REMOTE_FINGERPRINTS) decides whether
+    a table's rows are fetched at all, and fetched rows are compared by hash so only
+    inserted/updated/deleted rows are written locally.
+    """
+    def __init__(self, path, hostname, sync_interval=MIRROR_SYNC_INTERVAL, extra_workers=()):
+        self.path = path
+        self.hostname = hostname
+        self.workers = [hostname] + list(extra_workers)
+        self.sync_interval = sync_interval
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.Session_miningDB = sessionmaker(bind=engine_miningDB)
+        self.Session_fogplayDB = sessionmaker(bind=engine_fogplayDB)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+            _drop_rekeyed_tables(conn)
+            _add_fingerprint_column(conn)
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    # Sync side
+
+    def _fetch_fingerprint(self, table_name):
+        """Result of the table's change query as a string, e.g. '[12, 48213]'."""
+        query = text(REMOTE_FINGERPRINTS[table_name])
+        params = {}
+        if ":workers" in REMOTE_FINGERPRINTS[table_name]:
+            query = query.bindparams(bindparam("workers", expanding=True))
+            params["workers"] = self.workers
+        Session = self.Session_fogplayDB if table_name == "my_games" else self.Session_miningDB
+        with Session() as session:
+            return json.dumps(list(session.execute(query, params).one()), default=str)
+
+    def _fetch_remote(self, table_name):
+        if table_name == "supported_coins":
+            with self.Session_miningDB() as session:
+                rows = session.query(SupportedCoins).filter(SupportedCoins.worker.in_(self.workers)).all()
+                return [(r.symbol, r.worker, r.command_start, r.command_stop, r.enabled, r.rig_hr_kh) for r in rows]
+        if table_name == "best_coins_for_rig":
+            with self.Session_miningDB() as session:
+                rows = session.query(BestCoinsForRigView).filter(BestCoinsForRigView.worker.in_(self.workers)).all()
+                return [(r.worker, r.symbol, r.position, r.rev_rig_correct) for r in rows]
+        if table_name == "my_games":
+            with self.Session_fogplayDB() as session:
+                rows = session.query(MyGames.slug, MyGames.active, MyGames.exe_files).all()
+                return [(r.slug, r.active, r.exe_files) for r in rows]
+        raise ValueError(f"Unknown mirror table {table_name}")
+
+    def _apply(self, conn, table_name, remote_rows):
+        """Write only the rows whose hash changed. Returns the number of changed rows."""
+        key_cols, value_cols = MIRROR_TABLES[table_name]
+        all_cols = key_cols + value_cols
+        n_keys = len(key_cols)
+        local = {row[:n_keys]: row[n_keys] for row in conn.execute(
+            f"SELECT {', '.join(key_cols)}, row_hash FROM {table_name}")}
+        changed = 0
+        seen = set()
+        placeholders = ", ".join("?" for _ in range(len(all_cols) + 1))
+        for row in remote_rows:
+            key = tuple(row[:n_keys])
+            seen.add(key)
+            row_hash = _row_hash(list(row))
+            if local.get(key) == row_hash:
+                continue
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table_name} ({', '.join(all_cols)}, row_hash) VALUES ({placeholders})",
+                tuple(row) + (row_hash,)
+            )
+            changed += 1
+        where = " AND ".join(f"{col} IS ?" for col in key_cols)
+        for key in set(local) - seen:
+            conn.execute(f"DELETE FROM {table_name} WHERE {where}", key)
+            changed += 1
+        return changed
+
+    def sync_table(self, table_name):
+        started = time.time()
+        try:
+            fingerprint = self._fetch_fingerprint(table_name)
+            with self.lock, closing(self._connect()) as conn, conn:
+                known = conn.execute("SELECT fingerprint FROM sync_state WHERE table_name = ? AND last_success IS NOT NULL",
+                                     (table_name,)).fetchone()
+                if known and known[0] == fingerprint:
+                    finished = time.time()
+                    conn.execute("UPDATE sync_state SET last_attempt = ?, last_success = ?, last_duration = ?, changed = 0, "
+                                 "last_error = NULL WHERE table_name = ?", (started, finished, finished - started, table_name))
+                    return True
+            remote_rows = self._fetch_remote(table_name)
+        except Exception as e:
+            print(f"Mirror sync of {table_name} failed: {e}")
+            with self.lock, closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT INTO sync_state (table_name, last_attempt, last_error) VALUES (?, ?, ?) "
+                    "ON CONFLICT(table_name) DO UPDATE SET last_attempt = excluded.last_attempt, last_error = excluded.last_error",
+                    (table_name, started, str(e))
+                )
+            return False
+        with self.lock, closing(self._connect()) as conn, conn:
+            changed = self._apply(conn, table_name, remote_rows)
+            finished = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (table_name, last_attempt, last_success, last_duration, row_count, changed, "
+                "last_error, fingerprint) VALUES (?, ?, ?, ?, ?, ?, NULL, ?)",
+                (table_name, started, finished, finished - started, len(remote_rows), changed, fingerprint)
+            )
+        if DEBUG:
+            print(f"Mirror synced {table_name}: {len(remote_rows)} rows, {changed} changed in {finished - started:.3f}s")
+        return True
+
+    def sync(self):
+        """Sync all mirrored tables. Returns True if every table synced."""
+        results = [self.sync_table(table_name) for table_name in MIRROR_TABLES]
+        return all(results)
+
+    def _sync_loop(self):
+        while self.running:
+            self.sync()
+            time.sleep(self.sync_interval)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._sync_loop, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    # Read side
+
+    def supported_coins(self, hostname):
+        """Rows shaped like wa_coin_cache.CachedCoin arguments, for use as a SupportedCoinsCache loader."""
+        from wa_coin_cache import CachedCoin
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT symbol, worker, command_start, command_stop, enabled, rig_hr_kh FROM supported_coins WHERE worker = ?",
+                (hostname,)
+            ).fetchall()
+        return [CachedCoin(symbol, worker, command_start, command_stop,
+                           None if enabled is None else bool(enabled), rig_hr_kh)
+                for symbol, worker, command_start, command_stop, enabled, rig_hr_kh in rows]
+
+    def best_coins(self, current_symbol, hysteresis, worker=None):
+        """Best coins for worker (default: this host) with non-NULL revenue, current coin boosted by hysteresis, best first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT position, symbol, worker, rev_rig_correct, "
+                "CASE WHEN symbol = ? THEN rev_rig_correct * ? ELSE rev_rig_correct END AS modified "
+                "FROM best_coins_for_rig WHERE worker = ? AND rev_rig_correct IS NOT NULL "
+                "ORDER BY modified DESC",
+                (current_symbol, hysteresis, worker or self.hostname)
+            ).fetchall()
+        return [BestCoinRow(*row) for row in rows]
+
+    def revenue(self, symbol, worker=None):
+        """rev_rig_correct of symbol for worker (default: this host), None if unknown."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT rev_rig_correct FROM best_coins_for_rig WHERE worker = ? AND symbol = ?",
+                (worker or self.hostname, symbol)
+            ).fetchone()
+        return row[0] if row else None
+
+    def all_best_coins(self):
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT position, symbol, worker, rev_rig_correct, rev_rig_correct FROM best_coins_for_rig WHERE worker = ?",
+                (self.hostname,)
+            ).fetchall()
+        return [BestCoinRow(*row) for row in rows]
+
+    def my_games(self):
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT slug, exe_files FROM my_games").fetchall()
+        return [GameRow(*row) for row in rows]
+
+    def get_sync_metrics(self):
+        """Worst-case sync lag (duration of the last successful sync) and staleness (age of the oldest table) in seconds."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT table_name, last_success, last_duration FROM sync_state").fetchall()
+        successes = {table_name: (last_success, last_duration) for table_name, last_success, last_duration in rows}
+        if any(successes.get(t, (None, None))[0] is None for t in MIRROR_TABLES):
+            return {"mirror_sync_lag": None, "mirror_staleness": None}
+        return {
+            "mirror_sync_lag": max(duration or 0.0 for _, duration in successes.values()),
+            "mirror_staleness": max(now - last_success for last_success, _ in successes.values()),
+        }
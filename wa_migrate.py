@@ -0,0 +1,43 @@
+# wa_migrate.py
+# Idempotent schema migration of the mining database: miner_stats columns added by the switcher and the tables next to it.
+# Run once per database after updating the scripts; running it again changes nothing.
+import argparse
+
+from sqlalchemy import text
+
+from wa_definitions import engine_miningDB, MinersStats, MinerStarts, NetworkStats
+
+NEW_TABLES = [MinerStarts.__table__, NetworkStats.__table__]
+
+
+def miner_stats_statements(engine):
+    """ADD COLUMN IF NOT EXISTS for every MinersStats column outside the key, nullable: rows from older switchers leave them empty."""
+    statements = []
+    for column in MinersStats.__table__.columns:
+        if column.primary_key:
+            continue
+        column_type = column.type.compile(dialect=engine.dialect)
+        statements.append(f"ALTER TABLE {MinersStats.__tablename__} ADD COLUMN IF NOT EXISTS {column.name} {column_type}")
+    return statements
+
+
+def migrate(engine=engine_miningDB, dry_run=False):
+    statements = miner_stats_statements(engine)
+    for statement in statements:
+        print(statement)
+    print(f"Create if missing: {', '.join(table.name for table in NEW_TABLES)}")
+    if dry_run:
+        return statements
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+        MinersStats.metadata.create_all(conn, tables=NEW_TABLES)
+    print("Migration done")
+    return statements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add the switcher's miner_stats columns and tables to the mining database")
+    parser.add_argument("--dry-run", action="store_true", help="Print the statements without running them")
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run)
@@ -0,0 +1,235 @@
+# wa_miner_log.py
+# Background miner log writer: batched writes, size/time rotation, off-thread compression, rate-limited console echo.
+import gzip
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOG_DIR = "logs"
+LOG_MAX_BYTES = 20 * 1024 * 1024  # Rotate when the active segment exceeds this size
+LOG_MAX_AGE = 24 * 3600  # ... or when it is older than this (seconds)
+LOG_KEEP_SEGMENTS = 14  # Compressed segments kept per coin
+LOG_BATCH_LINES = 256  # Lines written per write() call at most
+LOG_FLUSH_INTERVAL = 1.0  # Seconds a line may wait in memory before it is written
+LOG_COMPRESSION = "zstd" if zstandard else "gzip"
+ECHO_LINES_PER_SECOND = 5  # Console echo budget
+
+
+def _compress_file(path, compression):
+    """Compress path next to itself and remove the original. Runs on the compression thread."""
+    try:
+        if compression == "zstd" and zstandard:
+            target = path + ".zst"
+            with open(path, "rb") as src, open(target, "wb") as dst:
+                zstandard.ZstdCompressor(level=10).copy_stream(src, dst)
+        else:
+            target = path + ".gz"
+            with open(path, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.remove(path)
+        return target
+    except Exception as e:
+        print(f"Error compressing rotated log {path}: {e}")
+        return None
+
+
+class MinerLogWriter:
+    """
+    Writes lines from a MinerOutputStream subscription to {log_dir}/{name}_miner.log.
+
+    Lines are batched and flushed at most every flush_interval, so a busy miner costs
+    one write syscall per batch instead of a write + flush per line. Rotated segments
+    are compressed on a separate thread so the writer never stalls on compression.
+    """
+    def __init__(self, stream, name, log_dir=LOG_DIR, max_bytes=LOG_MAX_BYTES, max_age=LOG_MAX_AGE,
+                 keep_segments=LOG_KEEP_SEGMENTS, batch_lines=LOG_BATCH_LINES, flush_interval=LOG_FLUSH_INTERVAL,
+                 compression=LOG_COMPRESSION, buffer_lines=None):
+        self.stream = stream
+        self.name = name
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, f"{name}_miner.log")
+        self.start_path = self.path + ".start"  # Sidecar with the active segment's start time (ctime is not creation time on Linux)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep_segments = keep_segments
+        self.batch_lines = batch_lines
+        self.flush_interval = flush_interval
+        self.compression = compression
+        self.buffer_lines = buffer_lines or batch_lines * 64  # Lines held in memory before drop-oldest kicks in
+        self.compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-log-compress")
+        self.subscription = None
+        self.thread = None
+        self.running = False
+        self.file = None
+        self.opened_at = None
+        self.written_bytes = 0
+        self.batches = 0
+        self.lines = 0
+
+    def _segment_start(self):
+        """Start time of the active segment: its sidecar, else its first line's timestamp, None if neither reads."""
+        try:
+            with open(self.start_path) as f:
+                return float(f.read())
+        except (OSError, ValueError):
+            pass
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return datetime.fromisoformat(f.readline()[1:].split("]", 1)[0]).timestamp()
+        except (OSError, ValueError):
+            return None
+
+    def _open(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8", buffering=1024 * 1024)
+        self.written_bytes = self.file.tell()
+        # Age counts from the segment's start, so restarts do not postpone time-based rotation
+        self.opened_at = (self._segment_start() if self.written_bytes else None) or time.time()
+        with open(self.start_path, "w") as f:
+            f.write(repr(self.opened_at))
+
+    def _rotate(self):
+        self.file.close()
+        rotated = os.path.join(self.log_dir, f"{self.name}_miner.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.log")
+        os.replace(self.path, rotated)
+        self.compressor.submit(_compress_file, rotated, self.compression)
+        self.compressor.submit(self._prune)
+        self._open()
+
+    def _prune(self):
+        prefix = f"{self.name}_miner."
+        segments = sorted(f for f in os.listdir(self.log_dir)
+                          if f.startswith(prefix) and (f.endswith(".gz") or f.endswith(".zst")))
+        for old in segments[:-self.keep_segments] if self.keep_segments else []:
+            try:
+                os.remove(os.path.join(self.log_dir, old))
+            except OSError as e:
+                print(f"Error removing old log segment {old}: {e}")
+
+    def _write_batch(self, items):
+        data = "".join(f"[{datetime.fromtimestamp(t).isoformat()}] {line}\n" for t, line in items)
+        self.file.write(data)
+        self.file.flush()
+        self.written_bytes += len(data)
+        self.batches += 1
+        self.lines += len(items)
+        if self.written_bytes >= self.max_bytes or time.time() - self.opened_at >= self.max_age:
+            self._rotate()
+
+    def _run(self):
+        pending = []
+        last_flush = time.monotonic()
+        while self.running or pending:
+            item = self.subscription.get(timeout=self.flush_interval) if self.running else None
+            if item is not None:
+                pending.append(item)
+                pending.extend(self.subscription.drain(max(0, self.batch_lines - len(pending))))
+            now = time.monotonic()
+            if pending and (len(pending) >= self.batch_lines or now - last_flush >= self.flush_interval or not self.running):
+                try:
+                    self._write_batch(pending)
+                except Exception as e:
+                    print(f"Error writing miner log {self.path}: {e}")
+                pending = []
+                last_flush = now
+            if not self.running and not pending:
+                # Write whatever arrived between stop() and here
+                pending = self.subscription.drain()
+                if not pending:
+                    break
+
+    def start(self):
+        if self.running:
+            return
+        self._open()
+        self.subscription = self.stream.subscribe(maxsize=self.buffer_lines, name=f"{self.name}-log")
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.subscription.close()
+        self.thread.join()
+        self.file.close()
+        self.compressor.shutdown(wait=False)
+        if self.subscription.dropped:
+            print(f"Miner log {self.path} dropped {self.subscription.dropped} lines (writer fell behind)")
+
+
+class RateLimitedEcho:
+    """Token-bucket console echo; suppressed lines are counted and reported once per second."""
+    def __init__(self, lines_per_second=ECHO_LINES_PER_SECOND, burst=None):
+        self.rate = lines_per_second
+        self.burst = burst or lines_per_second * 2
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self.suppressed = 0
+        self.last_report = self.last
+
+    def echo(self, line):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.suppressed and now - self.last_report >= 1.0:
+            print(f"... {self.suppressed} miner lines not echoed")
+            self.suppressed = 0
+            self.last_report = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            print(line)
+            return True
+        self.suppressed += 1
+        return False
+
+
+def _write_syscalls():
+    """Write syscalls made by this process so far (Linux only)."""
+    with open("/proc/self/io") as f:
+        for row in f:
+            if row.startswith("syscw:"):
+                return int(row.split()[1])
+    return None
+
+
+def benchmark(lines=200_000, log_dir="bench_logs"):
+    """Compare write syscalls per line: old per-line write+flush versus MinerLogWriter (Linux /proc/self/io)."""
+    from wa_miner_stream import MinerOutputStream
+    os.makedirs(log_dir, exist_ok=True)
+    line = "[2025-01-01 00:00:00.000]  miner    speed 10s/60s/15m 12345.6 12340.1 n/a H/s max 12400.0 H/s"
+
+    before = _write_syscalls()
+    started = time.perf_counter()
+    with open(os.path.join(log_dir, "old_miner.log"), "a", encoding="utf-8") as f:
+        for _ in range(lines):
+            f.write(f"[{datetime.now().isoformat()}] {line}\n")
+            f.flush()
+    old_calls, old_time = _write_syscalls() - before, time.perf_counter() - started
+
+    stream = MinerOutputStream()
+    writer = MinerLogWriter(stream, "new", log_dir=log_dir, max_bytes=8 * 1024 * 1024, buffer_lines=lines)
+    writer.start()
+    before = _write_syscalls()
+    started = time.perf_counter()
+    for _ in range(lines):
+        stream.publish(line)
+    writer.stop()
+    new_calls, new_time = _write_syscalls() - before, time.perf_counter() - started
+
+    print(f"per-line write+flush: {old_calls / lines:.3f} write syscalls/line, {old_time:.2f}s")
+    print(f"MinerLogWriter:       {new_calls / lines:.4f} write syscalls/line, {new_time:.2f}s "
+          f"({writer.batches} batches, {writer.lines} lines, {writer.subscription.dropped} dropped)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,96 @@
+# wa_miner_status.py
+# Parse xmrig's startup report (huge pages, 1GB pages, MSR mod) from its stdout.
+import re
+import time
+
+DEBUG = False
+
+HUGE_PAGES_SUMMARY = re.compile(r"\*\s+HUGE PAGES\s+(.+)$")  # " * HUGE PAGES   supported" / "unavailable" / "permission granted"
+ONE_GB_PAGES_SUMMARY = re.compile(r"\*\s+1GB PAGES\s+(.+)$")  # " * 1GB PAGES    disabled" / "supported" / "unavailable"
+DATASET_HUGE_PAGES = re.compile(r"randomx\s+allocated .*huge pages\s+(\d+)%\s+(\d+)/(\d+)")
+THREADS_HUGE_PAGES = re.compile(r"cpu\s+READY threads .*huge pages\s+(\d+)%\s+(\d+)/(\d+)")
+MSR_OK = re.compile(r"msr\s+register values for .* have been set successfully")
+MSR_FAILED = re.compile(r"msr\s+(cannot|FAILED|.*not available|.*failed)", re.IGNORECASE)
+
+
+class MinerStartStatus:
+    """
+    Memory setup xmrig reports in its first seconds. RandomX loses 30-50% of its hashrate
+    without huge pages or the MSR mod, so this is recorded for every start.
+    complete turns True at the "cpu READY" line, which xmrig prints last.
+    """
+    def __init__(self, miner, coin, threads):
+        self.miner = miner
+        self.coin = coin
+        self.threads = threads
+        self.started_at = time.time()
+        self.hugepages_status = None  # Text after "* HUGE PAGES"
+        self.one_gb_pages = None  # Text after "* 1GB PAGES"
+        self.dataset_hugepages_pct = None  # RandomX dataset
+        self.threads_hugepages_pct = None  # Per-thread scratchpads
+        self.msr = None  # "ok" / "failed" / None (not reported)
+        self.complete = False
+        self.saved = False
+
+    def feed(self, line):
+        """Parse one stdout line. Returns True if it carried startup status."""
+        if self.complete:
+            return False
+        match = HUGE_PAGES_SUMMARY.search(line)
+        if match:
+            self.hugepages_status = match.group(1).strip()
+            return True
+        match = ONE_GB_PAGES_SUMMARY.search(line)
+        if match:
+            self.one_gb_pages = match.group(1).strip()
+            return True
+        match = DATASET_HUGE_PAGES.search(line)
+        if match:
+            self.dataset_hugepages_pct = float(match.group(1))
+            return True
+        if MSR_OK.search(line):
+            self.msr = "ok"
+            return True
+        if MSR_FAILED.search(line):
+            self.msr = "failed"
+            return True
+        match = THREADS_HUGE_PAGES.search(line)
+        if match:
+            self.threads_hugepages_pct = float(match.group(1))
+            self.complete = True
+            if DEBUG:
+                print(f"Start status for {self.coin}: {self.as_dict()}")
+            return True
+        return False
+
+    @property
+    def hugepages_pct(self):
+        """Lowest reported allocation (dataset or scratchpads), None if xmrig did not report it."""
+        values = [v for v in (self.dataset_hugepages_pct, self.threads_hugepages_pct) if v is not None]
+        return min(values) if values else None
+
+    @property
+    def degraded(self):
+        """True if huge pages are incomplete or the MSR mod failed."""
+        return (self.hugepages_pct is not None and self.hugepages_pct < 100) or self.msr == "failed"
+
+    def as_dict(self):
+        return {
+            "hugepages_status": self.hugepages_status,
+            "one_gb_pages": self.one_gb_pages,
+            "dataset_hugepages_pct": self.dataset_hugepages_pct,
+            "threads_hugepages_pct": self.threads_hugepages_pct,
+            "msr": self.msr,
+        }
+
+    def describe(self):
+        parts = []
+        if self.hugepages_pct is not None:
+            parts.append(f"huge pages {self.hugepages_pct:.0f}%")
+        elif self.hugepages_status:
+            parts.append(f"huge pages {self.hugepages_status}")
+        if self.one_gb_pages:
+            parts.append(f"1GB pages {self.one_gb_pages}")
+        if self.msr:
+            parts.append(f"MSR {self.msr}")
+        return ", ".join(parts) or "no memory status reported"
@@ -0,0 +1,198 @@
+# wa_miner_stream.py
+# Bounded ring of recent miner output lines with explicit subscribers.
+import asyncio
+import threading
+import time
+from collections import deque
+
+DEFAULT_RING_SIZE = 2000  # Recent lines kept for debug tails
+DEFAULT_SUBSCRIBER_SIZE = 1000  # Lines buffered per queue subscriber before the oldest are dropped
+
+
+class LineSubscription:
+    """Bounded per-subscriber buffer. When full the oldest line is dropped and counted."""
+    def __init__(self, stream, maxsize=DEFAULT_SUBSCRIBER_SIZE, name=None):
+        self.stream = stream
+        self.name = name
+        self.buffer = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+
+    def _push(self, item):
+        with self.condition:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(item)
+            self.delivered += 1
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Next (timestamp, line), or None on timeout/close."""
+        with self.condition:
+            if not self.buffer and not self.closed:
+                self.condition.wait(timeout)
+            if self.buffer:
+                return self.buffer.popleft()
+            return None
+
+    def drain(self, max_items=None):
+        """Buffered (timestamp, line) items, oldest first; at most max_items if given."""
+        with self.condition:
+            if max_items is None or max_items >= len(self.buffer):
+                items = list(self.buffer)
+                self.buffer.clear()
+            else:
+                items = [self.buffer.popleft() for _ in range(max_items)]
+            return items
+
+    def __iter__(self):
+        while not self.closed or self.buffer:
+            item = self.get(timeout=1)
+            if item is not None:
+                yield item
+
+    def close(self):
+        self.stream.unsubscribe(self)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class CallbackSubscription:
+    """Calls callback(timestamp, line) in the reader thread. Callbacks must be quick; exceptions are counted, not raised."""
+    def __init__(self, stream, callback, name=None):
+        self.stream = stream
+        self.callback = callback
+        self.name = name
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def _push(self, item):
+        try:
+            self.callback(*item)
+            self.delivered += 1
+        except Exception as e:
+            self.errors += 1
+            self.dropped += 1
+            if self.errors <= 3:
+                print(f"Miner output subscriber {self.name or self.callback} failed: {e}")
+
+    def close(self):
+        self.stream.unsubscribe(self)
+
+
+class AsyncLineSubscription:
+    """Async iterator over lines, fed thread-safely into the given event loop with drop-oldest semantics."""
+    def __init__(self, stream, loop, maxsize=DEFAULT_SUBSCRIBER_SIZE, name=None):
+        self.stream = stream
+        self.loop = loop
+        self.name = name
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.delivered = 0
+        self.dropped = 0
+
+    def _enqueue(self, item):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+        self.delivered += 1
+
+    def _push(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, item)
+        except RuntimeError:
+            self.dropped += 1  # Loop closed
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.stream.unsubscribe(self)
+
+
+class MinerOutputStream:
+    """
+    Replaces an unbounded output queue: the miner reader publishes every line here,
+    a fixed-size ring keeps the most recent lines, and consumers (parsers, log writers,
+    debug tails) attach explicitly. Memory stays flat however long the miner runs.
+    """
+    def __init__(self, maxlen=DEFAULT_RING_SIZE):
+        self.ring = deque(maxlen=maxlen)
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.published = 0
+        self.ring_dropped = 0
+
+    def publish(self, line, timestamp=None):
+        item = (timestamp if timestamp is not None else time.time(), line)
+        with self.lock:
+            if len(self.ring) == self.ring.maxlen:
+                self.ring_dropped += 1
+            self.ring.append(item)
+            self.published += 1
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber._push(item)
+
+    def subscribe(self, maxsize=DEFAULT_SUBSCRIBER_SIZE, name=None):
+        """Buffered subscription for a consumer thread (get()/iteration)."""
+        return self._add(LineSubscription(self, maxsize, name))
+
+    def subscribe_callback(self, callback, name=None):
+        return self._add(CallbackSubscription(self, callback, name))
+
+    def subscribe_async(self, loop=None, maxsize=DEFAULT_SUBSCRIBER_SIZE, name=None):
+        """Async iterator subscription; must be created from inside a running loop unless loop is given."""
+        return self._add(AsyncLineSubscription(self, loop or asyncio.get_running_loop(), maxsize, name))
+
+    def _add(self, subscription):
+        with self.lock:
+            self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+
+    def tail(self, n=50):
+        with self.lock:
+            return list(self.ring)[-n:]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "published": self.published,
+                "ring_size": len(self.ring),
+                "ring_dropped": self.ring_dropped,
+                "subscribers": {(s.name or type(s).__name__): {"delivered": s.delivered, "dropped": s.dropped}
+                                for s in self.subscribers},
+            }
+
+
+def soak(lines=5_000_000, report_every=1_000_000):
+    """Publish millions of lines with a slow subscriber attached and report traced memory; it should stay flat."""
+    import tracemalloc
+    stream = MinerOutputStream()
+    stalled = stream.subscribe(name="stalled")  # Never drained, so it drops oldest
+    stream.subscribe_callback(lambda t, line: None, name="noop")
+    tracemalloc.start()
+    started = time.perf_counter()
+    for i in range(1, lines + 1):
+        stream.publish(f"[2025-01-01 00:00:00.000]  miner    speed 10s/60s/15m 12345.6 12340.1 n/a H/s max 12400.0 H/s #{i}")
+        if i % report_every == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            print(f"{i:>10} lines  traced {current / 1024:.0f} KiB  peak {peak / 1024:.0f} KiB  "
+                  f"stalled subscriber dropped {stalled.dropped}  {i / (time.perf_counter() - started):,.0f} lines/s")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    soak()
@@ -0,0 +1,226 @@
+# wa_netstats_poller.py
+# Polls difficulty/height/reward for every supported coin concurrently and keeps them in a staleness-aware cache.
+import asyncio
+import threading
+import time
+
+import aiohttp
+from sqlalchemy.orm import sessionmaker
+
+from wa_definitions import engine_miningDB, NetworkStats
+from wa_profitability import ATOMIC_UNITS, InputProvider
+
+DEBUG = False
+POLL_INTERVAL = 60  # Seconds between polling rounds
+POLL_TIMEOUT = 5  # Per-request timeout in seconds
+STALE_AFTER = 3 * POLL_INTERVAL  # Values older than this are reported as stale
+
+# kind "node_rpc": Monero-style JSON-RPC daemon (get_info + get_last_block_header)
+# kind "pool_json": pool HTTP API returning JSON; "fields" maps difficulty/height/reward to keys in the response
+# Built in are only the local DERO node and supportxmr's XMR stats. WOW, SAL, XTM and the SRBMiner coins
+# (ETI, PEPEW, SCASH, TDC, VRSC) need an entry in wa_cred; the Bitcoin-style chains among them have no
+# get_info, so only a pool_json API works for them. check_coverage reports the coins left without one.
+NETSTATS_ENDPOINTS = {
+    "DERO": {"kind": "node_rpc", "url": "http://192.168.1.5:20206/json_rpc"},
+    "XMR": {"kind": "pool_json", "url": "https://supportxmr.com/api/network/stats", "fields": {"reward": "value"}},
+}
+try:
+    from wa_cred import NETSTATS_ENDPOINTS as _CRED_ENDPOINTS  # Nodes/pool APIs for the other coins, same shape
+    NETSTATS_ENDPOINTS.update(_CRED_ENDPOINTS)
+except ImportError:
+    pass
+
+
+class NetworkStatsCache:
+    """Latest network stats per coin with the time they were fetched and the last error."""
+    def __init__(self, stale_after=STALE_AFTER):
+        self.stale_after = stale_after
+        self.entries = {}  # symbol -> {"values": dict, "fetched_at": float, "last_error": str, "failures": int}
+        self.lock = threading.Lock()
+
+    def update(self, symbol, values):
+        with self.lock:
+            self.entries[symbol] = {"values": values, "fetched_at": time.time(), "last_error": None, "failures": 0}
+
+    def record_failure(self, symbol, error):
+        with self.lock:
+            entry = self.entries.setdefault(symbol, {"values": None, "fetched_at": None, "last_error": None, "failures": 0})
+            entry["last_error"] = str(error)
+            entry["failures"] += 1
+
+    def age(self, symbol):
+        entry = self.entries.get(symbol)
+        if not entry or entry["fetched_at"] is None:
+            return None
+        return time.time() - entry["fetched_at"]
+
+    def is_stale(self, symbol):
+        age = self.age(symbol)
+        return age is None or age > self.stale_after
+
+    def get(self, symbol, allow_stale=False):
+        """Values for symbol, or None if missing (or stale and allow_stale is False)."""
+        with self.lock:
+            entry = self.entries.get(symbol)
+            values = dict(entry["values"]) if entry and entry["values"] else None
+        if values is None or (not allow_stale and self.is_stale(symbol)):
+            return None
+        return values
+
+    def snapshot(self):
+        with self.lock:
+            symbols = list(self.entries)
+        return {s: {"values": self.get(s, allow_stale=True), "age": self.age(s), "stale": self.is_stale(s),
+                    "failures": self.entries[s]["failures"], "last_error": self.entries[s]["last_error"]}
+                for s in symbols}
+
+
+class NetworkStatsPoller:
+    """
+    Asyncio poller sharing one aiohttp session (keep-alive connections) across all coins and rounds.
+    Every round polls all endpoints concurrently, so one slow or dead node only delays its own coin.
+    """
+    def __init__(self, endpoints=None, cache=None, interval=POLL_INTERVAL, timeout=POLL_TIMEOUT, persist=True, session_factory=None):
+        self.endpoints = endpoints if endpoints is not None else NETSTATS_ENDPOINTS
+        self.cache = cache if cache is not None else NetworkStatsCache()
+        self.interval = interval
+        self.timeout = timeout
+        self.persist = persist
+        self.Session_miningDB = session_factory or (sessionmaker(bind=engine_miningDB) if persist else None)
+        self.running = False
+        self.missing = []  # Coins asked for by check_coverage() without an endpoint
+
+    def check_coverage(self, symbols):
+        """
+        Warn (once per change) about coins without an endpoint and record them as failures, so the
+        cache snapshot shows them; their revenue cannot come from this poller.
+        """
+        missing = sorted(set(symbols) - set(self.endpoints))
+        for symbol in missing:
+            self.cache.record_failure(symbol, "no endpoint configured in NETSTATS_ENDPOINTS")
+        if missing != self.missing:
+            if missing:
+                print(f"WARNING: no network stats endpoint for {', '.join(missing)} (configured: {', '.join(sorted(self.endpoints)) or 'none'}); "
+                      f"add them to NETSTATS_ENDPOINTS in wa_cred, their revenue comes from the view until then")
+            self.missing = missing
+        return missing
+
+    async def _rpc(self, http, url, method):
+        async with http.post(url, json={"jsonrpc": "2.0", "id": "0", "method": method}) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+            return data["result"]
+
+    async def _poll_node_rpc(self, http, symbol, endpoint):
+        info, last_header = await asyncio.gather(
+            self._rpc(http, endpoint["url"], "get_info"),
+            self._rpc(http, endpoint["url"], "get_last_block_header")
+        )
+        return {
+            "difficulty": float(info["difficulty"]),
+            "height": int(info["height"]),
+            "reward": last_header["block_header"]["reward"] / ATOMIC_UNITS.get(symbol, 1),
+        }
+
+    async def _poll_pool_json(self, http, symbol, endpoint):
+        async with http.get(endpoint["url"]) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        fields = endpoint.get("fields", {})
+        values = {}
+        for name in ("difficulty", "height", "reward"):
+            value = data
+            for key in fields.get(name, name).split("."):
+                value = value.get(key) if isinstance(value, dict) else None
+            values[name] = value
+        if values["reward"] is not None and endpoint.get("atomic_reward", True):
+            values["reward"] = values["reward"] / ATOMIC_UNITS.get(symbol, 1)
+        return values
+
+    async def poll_one(self, http, symbol, endpoint):
+        started = time.perf_counter()
+        try:
+            if endpoint["kind"] == "node_rpc":
+                values = await self._poll_node_rpc(http, symbol, endpoint)
+            elif endpoint["kind"] == "pool_json":
+                values = await self._poll_pool_json(http, symbol, endpoint)
+            else:
+                raise ValueError(f"Unknown endpoint kind {endpoint['kind']}")
+        except Exception as e:
+            self.cache.record_failure(symbol, f"{type(e).__name__}: {e}")
+            print(f"Error polling network stats for {symbol}: {type(e).__name__} {e}")
+            return None
+        values["latency_ms"] = (time.perf_counter() - started) * 1000
+        self.cache.update(symbol, values)
+        if DEBUG:
+            print(f"Network stats for {symbol}: {values}")
+        return values
+
+    async def poll_all(self, http):
+        symbols = list(self.endpoints)
+        results = await asyncio.gather(*(self.poll_one(http, s, self.endpoints[s]) for s in symbols))
+        return {s: v for s, v in zip(symbols, results) if v is not None}
+
+    def _persist(self, results, timestamp=None):
+        """Upsert one NetworkStats row per coin; a second round within the same second replaces the first."""
+        timestamp = timestamp if timestamp is not None else int(time.time())
+        try:
+            with self.Session_miningDB() as session:
+                for symbol, values in results.items():
+                    session.merge(NetworkStats(
+                        timestamp=timestamp,
+                        symbol=symbol,
+                        difficulty=values["difficulty"],
+                        height=values["height"],
+                        reward=values["reward"],
+                        latency_ms=values["latency_ms"]
+                    ))
+                session.commit()
+        except Exception as e:
+            print(f"Error persisting network stats: {e}")
+
+    def client_session(self):
+        """The shared aiohttp session: per-request timeout, keep-alive connections across rounds."""
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit_per_host=2, keepalive_timeout=self.interval * 2)
+        return aiohttp.ClientSession(timeout=timeout, connector=connector)
+
+    async def run(self):
+        self.running = True
+        async with self.client_session() as http:
+            while self.running:
+                started = time.monotonic()
+                results = await self.poll_all(http)
+                if self.persist and results:
+                    await asyncio.get_running_loop().run_in_executor(None, self._persist, results)
+                await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start_in_thread(self):
+        """Run the poller on its own event loop, for callers that are not async."""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.running = False
+
+
+class PollerNetworkProvider(InputProvider):
+    """Feeds NetworkStatsCache values into wa_profitability.ProfitabilityEngine without any network calls."""
+    name = "netstats_poller"
+
+    def __init__(self, cache, allow_stale=False):
+        self.cache = cache
+        self.allow_stale = allow_stale
+
+    def fetch(self, symbols):
+        results = {}
+        for symbol in symbols:
+            values = self.cache.get(symbol, allow_stale=self.allow_stale)
+            if values:
+                results[symbol] = values
+        return results
+
+
+if __name__ == "__main__":
+    asyncio.run(NetworkStatsPoller().run())
@@ -0,0 +1,283 @@
+# wa_pool_prober.py
+# Pool latency prober: TCP connect + stratum login time per candidate endpoint, ranked per coin, with failover on rejects/latency.
+import asyncio
+import json
+import ssl
+import threading
+import time
+
+DEBUG = False
+POOL_PROBE_INTERVAL = 600  # Seconds between probing rounds
+POOL_PROBE_TIMEOUT = 5  # Seconds for connect + login per endpoint
+POOL_LATENCY_SMOOTHING = 0.3  # Weight of a new probe in an endpoint's latency average
+POOL_UNHEALTHY_AFTER = 2  # Consecutive failed probes before an endpoint is skipped
+POOL_MAX_REJECT_RATE = 0.05  # Fail over when more than this share of recent shares is rejected...
+POOL_MIN_SHARES = 20  # ...out of at least this many
+POOL_LATENCY_FACTOR = 2.0  # Fail over when the current pool is this many times slower than the best one...
+POOL_MIN_LATENCY_GAIN = 30.0  # ...and at least this many ms slower
+POOL_FAILOVER_COOLDOWN = 900  # Seconds between failovers of one coin, so a flapping pool does not restart the miner every loop
+POOL_DEGRADED_PENALTY = 3600  # Seconds an endpoint left for rejects stays ranked last
+PROBE_AGENT = "wa-pool-prober/1.0"
+
+# Extra endpoints per coin on top of the pool in the miner's CLI arguments, e.g.
+# POOL_CANDIDATES = {"XMR": ["stratum+tcp://de.pool.example:3333", "stratum+ssl://fi.pool.example:443"]}
+try:
+    from wa_cred import POOL_CANDIDATES
+except ImportError:
+    POOL_CANDIDATES = {}
+
+
+def parse_endpoint(url):
+    """(host, port, tls) from host:port, stratum+tcp://host:port or stratum+ssl://host:port."""
+    tls = False
+    if "://" in url:
+        scheme, url = url.split("://", 1)
+        tls = scheme.endswith(("ssl", "tls"))
+    host, _, port = url.rstrip("/").rpartition(":")
+    return host, int(port), tls
+
+
+def pool_from_args(args):
+    """The pool URL in a miner's CLI arguments: --url=... (xmrig), -o ..., or the value after --pool (SRBMiner)."""
+    for i, arg in enumerate(args):
+        if arg.startswith("--url="):
+            return arg.split("=", 1)[1]
+        if arg in ("--pool", "-o", "--url") and i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+
+def user_from_args(args):
+    """Login for the probe: --user=... (xmrig) or --wallet=... (SRBMiner)."""
+    for i, arg in enumerate(args):
+        for prefix in ("--user=", "--wallet="):
+            if arg.startswith(prefix):
+                return arg[len(prefix):]
+        if arg in ("--user", "-u", "--wallet") and i + 1 < len(args):
+            return args[i + 1]
+    return "x"
+
+
+def with_pool(args, url):
+    """Copy of args with the pool URL replaced by url."""
+    args = list(args)
+    for i, arg in enumerate(args):
+        if arg.startswith("--url="):
+            args[i] = f"--url={url}"
+            return args
+        if arg in ("--pool", "-o", "--url") and i + 1 < len(args):
+            args[i + 1] = url
+            return args
+    return args
+
+
+class ProbeResult:
+    def __init__(self, url, connect_ms=None, login_ms=None, ok=False, error=None):
+        self.url = url
+        self.connect_ms = connect_ms
+        self.login_ms = login_ms
+        self.ok = ok
+        self.error = error
+
+    @property
+    def latency(self):
+        """Connect + login round trip in ms, None if the probe failed."""
+        return self.connect_ms + self.login_ms if self.ok else None
+
+    def __repr__(self):
+        if self.ok:
+            return f"ProbeResult({self.url}, connect {self.connect_ms:.0f} ms, login {self.login_ms:.0f} ms)"
+        return f"ProbeResult({self.url}, failed: {self.error})"
+
+
+def login_message(protocol, user):
+    """First stratum request: xmrig-style login (RandomX pools) or mining.subscribe (ethash/kawpow/scrypt pools)."""
+    if protocol == "login":
+        return {"id": 1, "jsonrpc": "2.0", "method": "login", "params": {"login": user, "pass": "x", "agent": PROBE_AGENT}}
+    return {"id": 1, "method": "mining.subscribe", "params": [PROBE_AGENT]}
+
+
+async def probe_endpoint(url, protocol, user, timeout=POOL_PROBE_TIMEOUT):
+    """Connect, send the login request and time the reply. A reply with an error counts as a failed probe."""
+    host, port, tls = parse_endpoint(url)
+    context = None
+    if tls:
+        context = ssl.create_default_context()
+        context.check_hostname = False  # Like the miners: pools often use self-signed certificates
+        context.verify_mode = ssl.CERT_NONE
+    writer = None
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, ssl=context), timeout)
+        connected = time.perf_counter()
+        writer.write((json.dumps(login_message(protocol, user)) + "\n").encode())
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout - (connected - started))
+        answered = time.perf_counter()
+        if not line:
+            return ProbeResult(url, error="connection closed before the login reply")
+        reply = json.loads(line)
+        if reply.get("error"):
+            return ProbeResult(url, (connected - started) * 1000, (answered - connected) * 1000, error=f"login rejected: {reply['error']}")
+        return ProbeResult(url, (connected - started) * 1000, (answered - connected) * 1000, ok=True)
+    except (OSError, asyncio.TimeoutError, ValueError) as e:
+        return ProbeResult(url, error=f"{type(e).__name__}: {e}")
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+class PoolProber:
+    """
+    Ranked pool endpoints per coin. probe_all() measures every endpoint of every coin
+    concurrently; best() is what a miner start uses; should_failover() compares the running
+    pool's rejects and latency against the ranking. start() probes on a thread with its own
+    event loop, so a busy caller loop does not inflate the measured latency; the stats are
+    shared under a lock.
+    """
+    def __init__(self, pools, timeout=POOL_PROBE_TIMEOUT, clock=time.time):
+        self.pools = pools  # coin -> {"urls": [...], "protocol": "login" / "subscribe", "user": str}
+        self.timeout = timeout
+        self.clock = clock
+        self.stats = {}  # url -> {"latency", "failures", "last", "degraded_until"}
+        self.shares = {}  # coin -> (url, accepted, rejected) at the start of the current window
+        self.last_failover = {}  # coin -> timestamp
+        self.lock = threading.RLock()
+        self.ready = threading.Event()  # Set after the first probing round of start()
+        self.rounds = 0
+        self.running = False
+        self.thread = None
+
+    async def probe_coin(self, coin):
+        pool = self.pools[coin]
+        results = await asyncio.gather(*(probe_endpoint(url, pool["protocol"], pool["user"], self.timeout) for url in pool["urls"]))
+        for result in results:
+            self.record(result)
+        return results
+
+    async def probe_all(self):
+        rounds = await asyncio.gather(*(self.probe_coin(coin) for coin in self.pools))
+        if DEBUG:
+            for coin, results in zip(self.pools, rounds):
+                print(f"Pool probe {coin}: {results}")
+        self.rounds += 1
+        return dict(zip(self.pools, rounds))
+
+    async def _probe_rounds(self, interval):
+        while self.running:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                print(f"Pool probe round failed: {e}")
+            self.ready.set()
+            await asyncio.sleep(interval)
+
+    def _probe_loop(self, interval):
+        asyncio.run(self._probe_rounds(interval))
+
+    def start(self, interval=POOL_PROBE_INTERVAL):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._probe_loop, args=(interval,), daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def record(self, result):
+        with self.lock:
+            entry = self.stats.setdefault(result.url, {"latency": None, "failures": 0, "last": None, "degraded_until": 0.0})
+            entry["last"] = result
+            if result.ok:
+                entry["failures"] = 0
+                entry["latency"] = result.latency if entry["latency"] is None else \
+                    entry["latency"] + POOL_LATENCY_SMOOTHING * (result.latency - entry["latency"])
+            else:
+                entry["failures"] += 1
+
+    def healthy(self, url):
+        with self.lock:
+            entry = self.stats.get(url)
+            return bool(entry and entry["latency"] is not None and entry["failures"] < POOL_UNHEALTHY_AFTER
+                        and entry["degraded_until"] <= self.clock())
+
+    def rank(self, coin):
+        """The coin's endpoints, healthy ones first by latency, then the rest."""
+        urls = self.pools.get(coin, {}).get("urls", [])
+        with self.lock:
+            return sorted(urls, key=lambda url: (not self.healthy(url), self.stats[url]["latency"] if self.healthy(url) else 0.0))
+
+    def best(self, coin):
+        """Lowest-latency healthy endpoint for coin, None before the first successful probe."""
+        with self.lock:
+            ranked = self.rank(coin)
+            return ranked[0] if ranked and self.healthy(ranked[0]) else None
+
+    def should_failover(self, coin, current_url, accepted=None, rejected=None):
+        """
+        (url, reason) to switch the running miner to, or None. Reasons: the current pool rejects
+        more than POOL_MAX_REJECT_RATE of its shares since the last check window, it stopped
+        answering probes, or its probe latency is POOL_LATENCY_FACTOR times the best healthy
+        pool's. accepted/rejected are the miner's running share counters (xmrig API).
+        """
+        with self.lock:
+            return self._should_failover(coin, current_url, accepted, rejected)
+
+    def _should_failover(self, coin, current_url, accepted, rejected):
+        reason = None
+        if accepted is not None and rejected is not None:
+            url, base_accepted, base_rejected = self.shares.get(coin, (None, None, None))
+            if url != current_url or base_accepted is None or accepted < base_accepted or rejected < base_rejected:
+                self.shares[coin] = (current_url, accepted, rejected)  # New window: new pool or a miner restart
+            else:
+                window_accepted, window_rejected = accepted - base_accepted, rejected - base_rejected
+                total = window_accepted + window_rejected
+                if total >= POOL_MIN_SHARES:
+                    if window_rejected / total > POOL_MAX_REJECT_RATE:
+                        reason = f"{window_rejected}/{total} shares rejected"
+                    self.shares[coin] = (current_url, accepted, rejected)
+        entry = self.stats.get(current_url)
+        if reason is None and entry and entry["failures"] >= POOL_UNHEALTHY_AFTER:
+            reason = f"{entry['failures']} failed probes ({entry['last'].error})"
+        alternatives = [url for url in self.rank(coin) if url != current_url and self.healthy(url)]
+        if not alternatives:
+            return None
+        best = alternatives[0]
+        if reason is None:
+            current = entry["latency"] if entry else None
+            if current is not None and current > self.stats[best]["latency"] * POOL_LATENCY_FACTOR \
+                    and current - self.stats[best]["latency"] > POOL_MIN_LATENCY_GAIN:
+                reason = f"{current:.0f} ms against {self.stats[best]['latency']:.0f} ms"
+        if reason is None or self.clock() - self.last_failover.get(coin, float("-inf")) < POOL_FAILOVER_COOLDOWN:
+            return None
+        self.last_failover[coin] = self.clock()
+        if current_url in self.stats:
+            self.stats[current_url]["degraded_until"] = self.clock() + POOL_DEGRADED_PENALTY
+        self.shares.pop(coin, None)
+        return best, reason
+
+    def describe(self, coin):
+        parts = []
+        with self.lock:
+            for url in self.rank(coin):
+                entry = self.stats.get(url)
+                latency = f"{entry['latency']:.0f} ms" if entry and entry["latency"] is not None else "?"
+                parts.append(f"{url} {latency}{'' if self.healthy(url) else ' (unhealthy)'}")
+        return ", ".join(parts)
+
+
+def build_pools(cli_args_by_miner, candidates=None):
+    """
+    PoolProber pools from the miners' CLI argument tables ({protocol: {coin: args}}): the
+    configured pool of each coin plus any POOL_CANDIDATES for it.
+    """
+    candidates = POOL_CANDIDATES if candidates is None else candidates
+    pools = {}
+    for protocol, cli_args in cli_args_by_miner.items():
+        for coin, args in cli_args.items():
+            url = pool_from_args(args)
+            if url is None:
+                continue
+            urls = [url] + [u for u in candidates.get(coin, []) if u != url]
+            pools[coin] = {"urls": urls, "protocol": protocol, "user": user_from_args(args)}
+    return pools
@@ -0,0 +1,148 @@
+# wa_power.py
+# Power sampling behind a provider interface: RAPL energy counters on Linux, OpenHardwareMonitor power sensors on Windows.
+import glob
+import os
+import time
+
+DEBUG = False
+POWERCAP_ROOT = "/sys/class/powercap"
+OHM_NAMESPACES = ("root\\OpenHardwareMonitor", "root\\LibreHardwareMonitor")  # Same WMI schema
+POWER_IDLE_SMOOTHING = 0.1  # Weight of a new sample in the package's not-mining baseline
+
+try:
+    import wmi
+except ImportError:
+    wmi = None
+
+
+class PowerProvider:
+    """Source of power readings. read() returns {"cpu": watts, "gpu": watts}, None where unknown."""
+    name = "none"
+
+    def available(self):
+        return False
+
+    def read(self):
+        return {"cpu": None, "gpu": None}
+
+
+class RaplProvider(PowerProvider):
+    """
+    CPU package power from the powercap energy counters (Intel RAPL; AMD Zen through the same
+    driver): the energy used since the previous read over the time between them, summed over
+    packages. intel-rapl-mmio zones repeat package 0 and are left out. The first read only
+    sets the baseline. energy_uj is root-only on current kernels.
+    """
+    name = "rapl"
+
+    def __init__(self, root=POWERCAP_ROOT, clock=time.monotonic):
+        self.clock = clock
+        self.zones = [zone for zone in sorted(glob.glob(os.path.join(root, "intel-rapl:*")))
+                      if os.path.basename(zone).count(":") == 1 and self._read(zone, "name", str, "").startswith("package")]
+        self.last = None  # (time, {zone: energy_uj})
+
+    @staticmethod
+    def _read(zone, field, convert, default=None):
+        try:
+            with open(os.path.join(zone, field)) as f:
+                return convert(f.read().strip())
+        except (OSError, ValueError):
+            return default
+
+    def available(self):
+        return bool(self.zones) and all(self._read(zone, "energy_uj", int) is not None for zone in self.zones)
+
+    def read(self):
+        now = self.clock()
+        energy = {zone: self._read(zone, "energy_uj", int) for zone in self.zones}
+        last, self.last = self.last, (now, energy)
+        if last is None or now <= last[0] or None in energy.values() or None in last[1].values():
+            return {"cpu": None, "gpu": None}
+        used = 0
+        for zone, value in energy.items():
+            delta = value - last[1][zone]
+            if delta < 0:  # The counter wrapped
+                delta += self._read(zone, "max_energy_range_uj", int, 0)
+            used += delta
+        return {"cpu": round(used / 1e6 / (now - last[0]), 2), "gpu": None}
+
+
+class OhmProvider(PowerProvider):
+    """CPU package and GPU power from OpenHardwareMonitor (or LibreHardwareMonitor) power sensors over WMI."""
+    name = "ohm"
+
+    def __init__(self):
+        self.namespace = None
+        if wmi:
+            for namespace in OHM_NAMESPACES:
+                try:
+                    wmi.WMI(namespace=namespace).Sensor(SensorType="Power")
+                    self.namespace = namespace
+                    break
+                except Exception as e:
+                    if DEBUG:
+                        print(f"No power sensors in {namespace}: {e}")
+
+    def available(self):
+        return self.namespace is not None
+
+    def read(self):
+        readings = {"cpu": None, "gpu": None}
+        try:
+            sensors = wmi.WMI(namespace=self.namespace).Sensor(SensorType="Power")
+        except Exception as e:
+            print(f"Error reading power sensors via WMI: {e}")
+            return readings
+        for sensor in sensors:
+            parent = (sensor.Parent or "").lower()
+            if "cpu" in parent and sensor.Name == "CPU Package":
+                readings["cpu"] = round(sensor.Value, 2)
+            elif "gpu" in parent and sensor.Name in ("GPU Power", "GPU Total", "GPU Package") and readings["gpu"] is None:
+                readings["gpu"] = round(sensor.Value, 2)
+        return readings
+
+
+def detect_provider():
+    """The first provider that can read on this machine, or a PowerProvider that reads nothing."""
+    candidates = [OhmProvider] if os.name == "nt" else [RaplProvider]
+    for candidate in candidates:
+        provider = candidate()
+        if provider.available():
+            print(f"Power provider: {provider.name}")
+            return provider
+    print("Power provider: none available")
+    return PowerProvider()
+
+
+class PowerMeter:
+    """
+    Provider readings plus the package's not-mining baseline, so the power a miner adds can be
+    told apart from what the machine draws anyway.
+    """
+    def __init__(self, provider=None):
+        self.provider = provider or detect_provider()
+        self.latest = {"cpu": None, "gpu": None}
+        self.idle_cpu = None  # Smoothed package watts while nothing mines on the CPU
+
+    def sample(self, cpu_mining):
+        self.latest = self.provider.read()
+        cpu = self.latest["cpu"]
+        if cpu is not None and not cpu_mining:
+            self.idle_cpu = cpu if self.idle_cpu is None else self.idle_cpu + POWER_IDLE_SMOOTHING * (cpu - self.idle_cpu)
+        return self.latest
+
+    def mining_watts(self):
+        """Package watts above the not-mining baseline (all of them until a baseline exists), None without a reading."""
+        cpu = self.latest["cpu"]
+        if cpu is None:
+            return None
+        return max(cpu - (self.idle_cpu or 0.0), 0.0)
+
+    def metrics(self, hashrate, domain="cpu"):
+        """Values for the miner_stats power columns; hashrate_per_watt against the domain's power."""
+        watts = self.latest[domain]
+        return {
+            "cpu_power": self.latest["cpu"],
+            "gpu_power": self.latest["gpu"],
+            "hashrate_per_watt": round(hashrate / watts, 4) if hashrate and watts else None,
+        }
@@ -0,0 +1,258 @@
+# wa_profitability.py
+# Expected revenue per (worker, coin) computed locally from node/price data instead of the best_coins_for_rig view.
+import threading
+import time
+
+import numpy as np
+import requests
+
+from wa_definitions import SupportedCoins
+
+DEBUG = False
+SECONDS_PER_DAY = 86400
+
+# Node JSON-RPC endpoints (Monero-style get_info / get_last_block_header) per coin. Only the local
+# DERO node is built in; XMR, WOW, SAL and XTM nodes go in wa_cred as NODE_RPC_URLS (same shape).
+# Coins without one are left unpriced and fall back to the view in the coordinator.
+NODE_RPC_URLS = {
+    "DERO": "http://192.168.1.5:20206/json_rpc",
+}
+try:
+    from wa_cred import NODE_RPC_URLS as _CRED_NODE_RPC_URLS
+    NODE_RPC_URLS.update(_CRED_NODE_RPC_URLS)
+except ImportError:
+    pass
+# Atomic units per coin, used to convert block rewards to whole coins
+ATOMIC_UNITS = {
+    "XMR": 1e12,
+    "WOW": 1e11,
+    "SAL": 1e8,
+    "DERO": 1e5,
+}
+# CoinGecko ids per coin for the price provider
+COINGECKO_IDS = {
+    "XMR": "monero",
+    "WOW": "wownero",
+    "SAL": "salvium",
+    "DERO": "dero",
+}
+COINGECKO_URL = "https://api.coingecko.com/api/v3/simple/price"
+NETWORK_TTL = 120  # Difficulty/reward change per block, refetch every couple of minutes
+PRICE_TTL = 600
+
+
+class InputProvider:
+    """Source of per-coin inputs. fetch() returns {symbol: {field: value}} for the symbols it knows."""
+    name = "provider"
+
+    def fetch(self, symbols):
+        raise NotImplementedError
+
+
+class StaticProvider(InputProvider):
+    """Fixed values from configuration, e.g. block rewards for chains without a reachable node."""
+    name = "static"
+
+    def __init__(self, values):
+        self.values = values
+
+    def fetch(self, symbols):
+        return {s: dict(self.values[s]) for s in symbols if s in self.values}
+
+
+class NodeRpcProvider(InputProvider):
+    """Difficulty, block time and block reward from Monero-style daemons (also works for DERO)."""
+    name = "node_rpc"
+
+    def __init__(self, node_urls=None, atomic_units=None, timeout=5):
+        self.node_urls = node_urls if node_urls is not None else NODE_RPC_URLS
+        self.atomic_units = atomic_units if atomic_units is not None else ATOMIC_UNITS
+        self.timeout = timeout
+        self.session = requests.Session()  # Keep-alive across polls
+
+    def _call(self, url, method):
+        response = self.session.post(url, json={"jsonrpc": "2.0", "id": "0", "method": method}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["result"]
+
+    def fetch(self, symbols):
+        results = {}
+        for symbol in symbols:
+            url = self.node_urls.get(symbol)
+            if not url:
+                continue
+            try:
+                info = self._call(url, "get_info")
+                header = self._call(url, "get_last_block_header")["block_header"]
+                results[symbol] = {
+                    "difficulty": float(info["difficulty"]),
+                    "block_time": float(info.get("target") or 0) or None,
+                    "height": info.get("height"),
+                    "reward": header["reward"] / self.atomic_units.get(symbol, 1),
+                }
+            except Exception as e:
+                print(f"Error fetching network stats for {symbol} from {url}: {e}")
+        return results
+
+
+class CoinGeckoPriceProvider(InputProvider):
+    name = "coingecko"
+
+    def __init__(self, ids=None, vs_currency="usd", url=COINGECKO_URL, timeout=10):
+        self.ids = ids if ids is not None else COINGECKO_IDS
+        self.vs_currency = vs_currency
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def fetch(self, symbols):
+        ids = {self.ids[s]: s for s in symbols if s in self.ids}
+        if not ids:
+            return {}
+        try:
+            response = self.session.get(self.url, params={"ids": ",".join(ids), "vs_currencies": self.vs_currency},
+                                        timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            print(f"Error fetching prices from {self.url}: {e}")
+            return {}
+        return {ids[cg_id]: {"price": float(v[self.vs_currency])} for cg_id, v in data.items()
+                if cg_id in ids and self.vs_currency in v}
+
+
+class CachedProvider(InputProvider):
+    """
+    Per-symbol TTL cache around another provider. Only expired symbols are refetched;
+    if a refetch fails the last value is kept and its age keeps growing. Failed symbols
+    are not retried before another TTL has passed.
+    """
+    def __init__(self, provider, ttl):
+        self.provider = provider
+        self.name = provider.name
+        self.ttl = ttl
+        self.cache = {}  # symbol -> (fetched_at, values)
+        self.attempts = {}  # symbol -> last fetch attempt
+        self.lock = threading.Lock()
+
+    def fetch(self, symbols):
+        now = time.time()
+        with self.lock:
+            expired = [s for s in symbols if now - self.attempts.get(s, 0) >= self.ttl]
+        if expired:
+            fresh = self.provider.fetch(expired)
+            with self.lock:
+                for symbol in expired:
+                    self.attempts[symbol] = now
+                for symbol, values in fresh.items():
+                    self.cache[symbol] = (now, values)
+        with self.lock:
+            return {s: dict(self.cache[s][1]) for s in symbols if s in self.cache}
+
+    def age(self, symbol):
+        entry = self.cache.get(symbol)
+        return None if entry is None else time.time() - entry[0]
+
+
+def load_hashrate_matrix(session, workers=None):
+    """Pivot SupportedCoins.rig_hr_kh into (workers, coins, H/s matrix) with NaN where unknown or disabled."""
+    query = session.query(SupportedCoins.worker, SupportedCoins.symbol, SupportedCoins.rig_hr_kh, SupportedCoins.enabled)
+    if workers is not None:
+        query = query.filter(SupportedCoins.worker.in_(workers))
+    rows = [r for r in query.all() if r.rig_hr_kh is not None and r.enabled is not False]
+    worker_list = sorted({r.worker for r in rows})
+    coin_list = sorted({r.symbol for r in rows})
+    worker_idx = {w: i for i, w in enumerate(worker_list)}
+    coin_idx = {c: i for i, c in enumerate(coin_list)}
+    hashrates = np.full((len(worker_list), len(coin_list)), np.nan)
+    for r in rows:
+        hashrates[worker_idx[r.worker], coin_idx[r.symbol]] = r.rig_hr_kh * 1000
+    return worker_list, coin_list, hashrates
+
+
+class ProfitabilityEngine:
+    """
+    Expected revenue per day for every worker x coin pair:
+        hashrate * 86400 / difficulty * reward * price
+    Difficulty is the expected number of hashes per block, so the block time cancels out.
+    """
+    def __init__(self, network_providers, price_providers):
+        self.network_providers = network_providers  # Tried in order; earlier providers win per field
+        self.price_providers = price_providers
+
+    def _merge(self, providers, symbols):
+        merged = {}
+        for provider in reversed(providers):
+            for symbol, values in provider.fetch(symbols).items():
+                merged.setdefault(symbol, {}).update({k: v for k, v in values.items() if v is not None})
+        return merged
+
+    def coin_inputs(self, coins):
+        """Arrays of difficulty, reward and price per coin (NaN where missing)."""
+        network = self._merge(self.network_providers, coins)
+        prices = self._merge(self.price_providers, coins)
+        difficulty = np.array([network.get(c, {}).get("difficulty", np.nan) for c in coins], dtype=np.float64)
+        reward = np.array([network.get(c, {}).get("reward", np.nan) for c in coins], dtype=np.float64)
+        price = np.array([prices.get(c, {}).get("price", np.nan) for c in coins], dtype=np.float64)
+        return difficulty, reward, price
+
+    def revenue_matrix(self, coins, hashrates):
+        """hashrates: (W, C) H/s. Returns (W, C) expected revenue per day in price currency, NaN if any input is missing."""
+        difficulty, reward, price = self.coin_inputs(coins)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_hash_per_day = np.where(difficulty > 0, SECONDS_PER_DAY * reward * price / difficulty, np.nan)
+        revenue = hashrates * per_hash_per_day[np.newaxis, :]
+        if DEBUG:
+            for c, d, r, p in zip(coins, difficulty, reward, price):
+                print(f"{c}: difficulty={d}, reward={r}, price={p}")
+        return revenue
+
+
+def fill_missing(local, fallback):
+    """
+    Union of two (workers, coins, revenue) pivots: the local engine's value where it has one, the
+    fallback's (the view's rev_rig_correct) for pairs it could not price, e.g. coins without a
+    network or price provider. The two are on different bases (the engine's idealized USD/day
+    against the view's corrected revenue), so fallback values are scaled by the median
+    engine/view ratio of the coin's pairs priced by both, or of all such pairs for coins the
+    engine priced nowhere. With no pair priced by both there is no ratio and the view is used
+    alone. Returns (workers, coins, revenue, coins that fell back).
+    """
+    workers = sorted(set(local[0]) | set(fallback[0]))
+    coins = sorted(set(local[1]) | set(fallback[1]))
+    worker_idx = {w: i for i, w in enumerate(workers)}
+    coin_idx = {c: i for i, c in enumerate(coins)}
+    spread = []
+    for pivot_workers, pivot_coins, values in (local, fallback):
+        full = np.full((len(workers), len(coins)), np.nan)
+        if len(pivot_workers) and len(pivot_coins):
+            full[np.ix_([worker_idx[w] for w in pivot_workers], [coin_idx[c] for c in pivot_coins])] = values
+        spread.append(full)
+    local_full, fallback_full = spread
+    used_fallback = np.isnan(local_full) & ~np.isnan(fallback_full)
+    if not used_fallback.any():
+        return workers, coins, local_full, []
+    both = ~np.isnan(local_full) & (fallback_full > 0)
+    if not both.any():
+        return workers, coins, fallback_full, [c for c, known in zip(coins, (~np.isnan(fallback_full)).any(axis=0)) if known]
+    ratio = np.where(both, local_full / np.where(both, fallback_full, 1.0), np.nan)
+    scale = np.full(len(coins), np.median(ratio[both]))
+    per_coin = both.any(axis=0)
+    scale[per_coin] = np.nanmedian(ratio[:, per_coin], axis=0)
+    revenue = np.where(used_fallback, fallback_full * scale, local_full)
+    return workers, coins, revenue, [c for c, used in zip(coins, used_fallback.any(axis=0)) if used]
+
+
+def default_engine(static_values=None, network_cache=None):
+    """
+    Network inputs from a running wa_netstats_poller's cache (network_cache), or node RPC with a
+    TTL without one; CoinGecko prices; optionally static values for coins with neither.
+    """
+    if network_cache is not None:
+        from wa_netstats_poller import PollerNetworkProvider
+        network = [PollerNetworkProvider(network_cache)]
+    else:
+        network = [CachedProvider(NodeRpcProvider(), NETWORK_TTL)]
+    if static_values:
+        network.append(StaticProvider(static_values))
+    return ProfitabilityEngine(network, [CachedProvider(CoinGeckoPriceProvider(), PRICE_TTL)])
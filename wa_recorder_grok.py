@@ -16,6 +16,7 @@ import shutil  # For file operations
 
 from wa_cred import HOSTNAME, MTS_SERVER_NAME
 from wa_definitions import GAME_PROCESSES
+from wa_game_profiles import write_recorder_fps
 
 # Configuration
 NETWORK_PATH = "Z:/"  # Network drive path (e.g., Z:\)
@@ -210,6 +211,7 @@ def record_screen():
             frames_in_interval = frame_count - last_frame_count
             actual_fps = frames_in_interval / elapsed
             print(f"Actual frame rate: {actual_fps:.2f} FPS (target: {VIDEO_FPS} FPS)")
+            write_recorder_fps(actual_fps, VIDEO_FPS)  # The miner switcher compares it with and without mining per game
             last_log_time = current_time
             last_frame_count = frame_count
 
@@ -0,0 +1,124 @@
+# wa_sensors.py
+# Adaptive sensor polling: sample often near a limit or while a temperature climbs, rarely while it is cool and steady.
+import time
+
+from wa_thermal import TemperatureTrend
+
+DEBUG = False
+SENSOR_MIN_INTERVAL = 2.0  # Seconds; fastest cadence, while climbing into the limit
+SENSOR_MAX_INTERVAL = 30.0  # Slowest cadence, far from the limit and steady (also used for missing sensors)
+SENSOR_STABLE_INTERVAL = 5.0  # Cadence at the limit while the temperature holds steady
+SENSOR_SECONDS_PER_DEGREE = 2.0  # Added per °C of headroom: 10°C below the limit -> 25 s
+SENSOR_SAMPLES_TO_LIMIT = 10  # While climbing, at least this many samples before the trend reaches the limit
+SENSOR_TREND_HISTORY = 60  # Seconds of readings for the slope; short, so a climb is not averaged away by a steady past
+SENSOR_COST_REPORT_INTERVAL = 3600  # Seconds between sensor cost reports
+
+
+def next_interval(temp, limit, slope):
+    """Seconds until the next read of a sensor at temp (°C) climbing at slope (°C/s)."""
+    if temp is None or limit is None:
+        return SENSOR_MAX_INTERVAL
+    headroom = limit - temp
+    interval = SENSOR_STABLE_INTERVAL + max(headroom, 0.0) * SENSOR_SECONDS_PER_DEGREE
+    if slope and slope > 0:
+        interval = min(interval, headroom / slope / SENSOR_SAMPLES_TO_LIMIT)
+    return min(max(interval, SENSOR_MIN_INTERVAL), SENSOR_MAX_INTERVAL)
+
+
+class SensorChannel:
+    """One sensor: its reader, limit, trend, next due time and the CPU time its reads cost."""
+    def __init__(self, name, read, limit):
+        self.name = name
+        self.read = read
+        self.limit = limit
+        self.trend = TemperatureTrend(SENSOR_TREND_HISTORY)
+        self.value = None
+        self.interval = SENSOR_MIN_INTERVAL
+        self.next_due = float("-inf")
+        self.reads = 0
+        self.cpu_seconds = 0.0  # time.thread_time() spent in read(): OHM via pythonnet runs in-process, the WMI provider does not
+        self.wall_seconds = 0.0
+
+    def poll(self, now):
+        started_cpu = time.thread_time()
+        started = time.perf_counter()
+        try:
+            value = self.read()
+        except Exception as e:
+            print(f"Error reading {self.name} sensor: {e}")
+            value = None
+        self.cpu_seconds += time.thread_time() - started_cpu
+        self.wall_seconds += time.perf_counter() - started
+        self.reads += 1
+        self.value = value
+        if value is not None:
+            self.trend.add(now, value)
+        self.interval = next_interval(value, self.limit, self.trend.slope())
+        self.next_due = now + self.interval
+        if DEBUG:
+            print(f"Sensor {self.name}: {value}°C, next read in {self.interval:.0f}s")
+        return value
+
+
+class SensorSampler:
+    """
+    Polls each channel when it is due and caches the last value in between. The main loop
+    reads through read(); between iterations it sleeps until seconds_until_due() and polls
+    again, so the cadence near a limit no longer depends on SLEEP_INTERVAL.
+    """
+    def __init__(self, channels, clock=time.monotonic):
+        self.channels = {channel.name: channel for channel in channels}
+        self.clock = clock
+        self.started = clock()
+        self.last_report = self.started
+
+    def seconds_until_due(self):
+        return max(0.0, min(channel.next_due for channel in self.channels.values()) - self.clock())
+
+    def poll_due(self):
+        """Poll the channels that are due. Returns the names polled."""
+        now = self.clock()
+        polled = []
+        for channel in self.channels.values():
+            if now >= channel.next_due:
+                channel.poll(now)
+                polled.append(channel.name)
+        return polled
+
+    def latest(self):
+        """{name: last value read}, without polling."""
+        return {name: channel.value for name, channel in self.channels.items()}
+
+    def read(self):
+        """{name: latest value}, polling the channels that are due first."""
+        self.poll_due()
+        return self.latest()
+
+    def cost(self, fixed_interval):
+        """
+        Reads and sensor CPU seconds per hour so far, next to what the same reads would cost
+        at a fixed fixed_interval cadence for every sensor (the previous behaviour).
+        """
+        hours = max(self.clock() - self.started, 1e-9) / 3600
+        reads = sum(c.reads for c in self.channels.values())
+        cpu = sum(c.cpu_seconds for c in self.channels.values())
+        fixed_cpu = sum(c.cpu_seconds / c.reads * 3600 / fixed_interval for c in self.channels.values() if c.reads)
+        return {
+            "reads_per_hour": reads / hours,
+            "cpu_seconds_per_hour": cpu / hours,
+            "fixed_reads_per_hour": len(self.channels) * 3600 / fixed_interval,
+            "fixed_cpu_seconds_per_hour": fixed_cpu,
+        }
+
+    def report_due(self):
+        if self.clock() - self.last_report < SENSOR_COST_REPORT_INTERVAL:
+            return False
+        self.last_report = self.clock()
+        return True
+
+    def describe(self, fixed_interval):
+        cost = self.cost(fixed_interval)
+        intervals = ", ".join(f"{c.name} every {c.interval:.0f}s" for c in self.channels.values())
+        return (f"{cost['reads_per_hour']:.0f} reads/h, {cost['cpu_seconds_per_hour']:.2f} CPU s/h "
+                f"(fixed {fixed_interval:.0f}s cadence: {cost['fixed_reads_per_hour']:.0f} reads/h, "
+                f"{cost['fixed_cpu_seconds_per_hour']:.2f} CPU s/h); {intervals}")
@@ -0,0 +1,109 @@
+# wa_slots.py
+# Independent CPU and GPU mining slots: each has its own worker name, coin choice, thermal domain and revenue account.
+import time
+
+DEBUG = False
+GPU_WORKER_SUFFIX = "_gpu"  # BestCoinsForRigView worker of a rig's GPU slot: HOSTNAME_gpu
+SLOT_RESUME_MARGIN = 5.0  # °C below the slot's limit before a slot stopped for heat starts again
+SLOT_REVENUE_REPORT_INTERVAL = 3600  # Seconds between per-slot revenue reports
+SLOT_MAX_EFFICIENCY = 1.5  # Cap on hashrate/target when prorating revenue (a bad target must not inflate it)
+
+
+class SlotRevenue:
+    """
+    Expected revenue one slot earned: the coin's rev_rig_correct (per day at the rig's
+    expected hashrate) prorated by the time spent mining it and by the hashrate reached
+    against the target, when the target is known.
+    """
+    def __init__(self, name, clock=time.time):
+        self.name = name
+        self.clock = clock
+        self.total = 0.0
+        self.by_coin = {}  # coin -> revenue
+        self.seconds_mining = 0.0
+        self.seconds_idle = 0.0
+        self.last = None  # (timestamp, coin, revenue per day, efficiency) of the previous account() call
+        self.last_report = clock()
+
+    def account(self, coin, revenue_per_day, efficiency=None, now=None):
+        """
+        Book the time since the previous call at the previous call's rate, then remember the
+        current coin and rate. coin None: the slot is not mining.
+        """
+        now = now if now is not None else self.clock()
+        if self.last is not None:
+            timestamp, last_coin, last_rate, last_efficiency = self.last
+            dt = max(now - timestamp, 0.0)
+            if last_coin:
+                self.seconds_mining += dt
+                earned = (last_rate or 0.0) * dt / 86400 * min(last_efficiency if last_efficiency is not None else 1.0, SLOT_MAX_EFFICIENCY)
+                self.total += earned
+                self.by_coin[last_coin] = self.by_coin.get(last_coin, 0.0) + earned
+            else:
+                self.seconds_idle += dt
+        self.last = (now, coin, revenue_per_day, efficiency)
+
+    def report_due(self):
+        if self.clock() - self.last_report < SLOT_REVENUE_REPORT_INTERVAL:
+            return False
+        self.last_report = self.clock()
+        return True
+
+    def metrics(self):
+        hours = (self.seconds_mining + self.seconds_idle) / 3600
+        return {
+            "slot": self.name,
+            "revenue": round(self.total, 8),
+            "revenue_by_coin": {coin: round(value, 8) for coin, value in self.by_coin.items()},
+            "mining_share": self.seconds_mining / (self.seconds_mining + self.seconds_idle) if hours else None,
+            "hours": round(hours, 3),
+        }
+
+
+class MiningSlot:
+    """
+    One mining slot: a worker name for BestCoinsForRigView, the controller that runs its
+    miner, the coins that controller can mine and the temperature limit of its domain.
+    Stops for heat at the limit and resumes SLOT_RESUME_MARGIN below it.
+    """
+    def __init__(self, name, worker, controller, coins, temp_limit):
+        self.name = name
+        self.worker = worker
+        self.controller = controller
+        self.coins = set(coins)
+        self.temp_limit = temp_limit
+        self.overheated = False
+        self.preempted_by = None  # "game" / "temperature" while the slot is held off
+        self.revenue = SlotRevenue(name)
+
+    def thermal_ok(self, temp):
+        if temp is None:
+            return not self.overheated
+        if not self.overheated and temp > self.temp_limit:
+            print(f"{self.name.upper()} slot: {temp}°C over {self.temp_limit}°C, stopping")
+            self.overheated = True
+        elif self.overheated and temp <= self.temp_limit - SLOT_RESUME_MARGIN:
+            print(f"{self.name.upper()} slot: cooled to {temp}°C, resuming")
+            self.overheated = False
+        return not self.overheated
+
+    def choose(self, rows, can_start):
+        """First row (best first) for a coin this slot can mine and may start now, or None."""
+        for row in rows:
+            if row.symbol in self.coins and can_start(row.symbol):
+                return row
+        return None
+
+    def describe(self):
+        coin = self.controller.current_coin if self.controller.is_mining else None
+        state = coin or (f"held off ({self.preempted_by})" if self.preempted_by else "idle")
+        return f"{self.name} slot [{self.worker}]: {state}, revenue {self.revenue.total:.6f}"
+
+
+def efficiency(controller):
+    """Hashrate against the coin's target for revenue proration, None while either is unknown."""
+    target = getattr(controller, "target_hashrate", None)
+    hashrate = controller.get_hashrate() if controller.is_mining else None
+    if not target or not hashrate:
+        return None
+    return hashrate / target
@@ -0,0 +1,134 @@
+# wa_supervisor.py
+# Unified restart policy: per (miner, coin) health scores with exponential backoff and jitter.
+import random
+import threading
+import time
+from collections import deque
+
+DEBUG = False
+BASE_BACKOFF = 15  # Seconds to wait after the first failure
+MAX_BACKOFF = 1800  # Backoff cap in seconds
+BACKOFF_JITTER = 0.2  # +/- fraction of random jitter so rigs do not restart in lockstep
+HEALTHY_UPTIME = 600  # A run this long (seconds) clears the consecutive-failure count
+SCORE_RECOVERY_HALF_LIFE = 1800  # Seconds for half of a health penalty to wear off
+FAILURE_PENALTIES = {
+    "crash": 0.3,
+    "hang": 0.3,
+    "low_hashrate": 0.2,
+    "start_failed": 0.4,
+}
+
+
+class HealthRecord:
+    def __init__(self, now):
+        self.score = 1.0
+        self.scored_at = now
+        self.failures = 0  # Consecutive failures since the last healthy run
+        self.backoff_until = 0.0
+        self.starts = 0
+        self.events = {kind: 0 for kind in FAILURE_PENALTIES}
+        self.started_at = None
+
+
+class MinerSupervisor:
+    """
+    Single place that decides whether a (miner, coin) pair may be (re)started.
+
+    Every failure (crash, hang, low hashrate, failed start) lowers the pair's health score
+    and starts an exponential backoff with jitter. Scores recover towards 1.0 over time,
+    and a long enough healthy run clears the consecutive-failure count. The switcher
+    multiplies revenue by the health score, so a flaky coin loses to a stable one.
+    """
+    def __init__(self, base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF, jitter=BACKOFF_JITTER,
+                 healthy_uptime=HEALTHY_UPTIME, recovery_half_life=SCORE_RECOVERY_HALF_LIFE, on_decision=None, clock=time.time):
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.healthy_uptime = healthy_uptime
+        self.recovery_half_life = recovery_half_life
+        self.on_decision = on_decision  # Callable(event_name, description), e.g. an Events logger
+        self.clock = clock
+        self.records = {}
+        self.decisions = deque(maxlen=200)
+        self.lock = threading.Lock()
+
+    def _record(self, miner, coin):
+        key = (miner, coin)
+        if key not in self.records:
+            self.records[key] = HealthRecord(self.clock())
+        return self.records[key]
+
+    def _decide(self, event_name, description):
+        self.decisions.append((self.clock(), event_name, description))
+        print(f"Supervisor: {description}")
+        if self.on_decision:
+            self.on_decision(event_name, description)
+
+    def _current_score(self, record, now):
+        elapsed = max(0.0, now - record.scored_at)
+        return 1.0 - (1.0 - record.score) * 0.5 ** (elapsed / self.recovery_half_life)
+
+    def score(self, miner, coin):
+        """Health in (0, 1]; 1.0 for pairs that never failed."""
+        with self.lock:
+            record = self.records.get((miner, coin))
+            return 1.0 if record is None else self._current_score(record, self.clock())
+
+    def backoff_remaining(self, miner, coin):
+        with self.lock:
+            record = self.records.get((miner, coin))
+            return 0.0 if record is None else max(0.0, record.backoff_until - self.clock())
+
+    def can_start(self, miner, coin):
+        """(allowed, seconds until allowed)."""
+        remaining = self.backoff_remaining(miner, coin)
+        return remaining <= 0, remaining
+
+    def record_start(self, miner, coin):
+        with self.lock:
+            record = self._record(miner, coin)
+            record.starts += 1
+            record.started_at = self.clock()
+
+    def record_stop(self, miner, coin):
+        """Normal stop (switch, game, thermal). A long enough run clears the failure streak."""
+        now = self.clock()
+        with self.lock:
+            record = self._record(miner, coin)
+            if record.started_at and now - record.started_at >= self.healthy_uptime and record.failures:
+                if DEBUG:
+                    print(f"Supervisor: {miner}/{coin} ran {now - record.started_at:.0f}s, clearing {record.failures} failures")
+                record.failures = 0
+            record.started_at = None
+
+    def record_failure(self, miner, coin, kind, detail=""):
+        """Register a failure and return the backoff (seconds) before the pair may start again."""
+        now = self.clock()
+        with self.lock:
+            record = self._record(miner, coin)
+            if record.started_at and now - record.started_at >= self.healthy_uptime:
+                record.failures = 0  # Failure after a long healthy run starts a new streak
+            record.started_at = None
+            record.failures += 1
+            record.events[kind] = record.events.get(kind, 0) + 1
+            record.score = self._current_score(record, now) * (1.0 - FAILURE_PENALTIES.get(kind, 0.3))
+            record.scored_at = now
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (record.failures - 1))
+            backoff *= 1.0 + random.uniform(-self.jitter, self.jitter)
+            record.backoff_until = now + backoff
+            score, failures = record.score, record.failures
+        self._decide("supervisor_backoff",
+                     f"{kind} for {coin} on {miner}{' (' + detail + ')' if detail else ''}: failure #{failures}, "
+                     f"health {score:.2f}, backoff {backoff:.0f}s")
+        return backoff
+
+    def metrics(self, miner, coin):
+        """Values for the miner_stats supervisor columns."""
+        with self.lock:
+            record = self.records.get((miner, coin))
+            failures = record.failures if record else 0
+        return {
+            "supervisor_health": self.score(miner, coin),
+            "supervisor_failures": failures,
+            "supervisor_backoff": self.backoff_remaining(miner, coin),
+        }
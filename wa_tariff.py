@@ -0,0 +1,224 @@
+# wa_tariff.py
+# Tariff-aware scheduling: electricity calendar + power model -> net profit per hour -> day-ahead plan of coin/intensity/off per slot.
+import json
+import os
+import time
+from datetime import timedelta
+
+DEBUG = False
+PLAN_HOURS = 24  # Plan horizon
+PLAN_SLOT_MINUTES = 60  # Plan granularity; the tariff is averaged over each slot
+PLAN_REFRESH_INTERVAL = 3600  # Seconds between re-plans (revenue and measured power change during the day)
+PLAN_INTENSITY_LEVELS = (0.25, 0.5, 0.75, 1.0)  # Share of the thread ceiling the planner may choose
+PLAN_MIN_NET_PER_HOUR = 0.0  # Mine only when the net profit per hour is above this
+POWER_BASE_WATTS = 15.0  # Extra wall power when the miner runs at all (uncore, memory, boost)
+POWER_PER_THREAD_WATTS = 6.0  # Estimated extra watts per mining thread
+POWER_COIN_FACTOR = {}  # Per-coin multiplier on the estimate, e.g. {"DERO": 0.8}
+POWER_SMOOTHING = 0.3  # Weight of a new measurement at a (coin, threads) point
+
+# Price per kWh in the revenue currency. "rules" are tried in order (first match wins; end before start
+# wraps midnight, days are weekdays 0=Monday), "dates" override whole days, "default" covers the rest:
+# TARIFF_CALENDAR = {"default": 0.30, "dates": {"2026-12-25": 0.18},
+#                    "rules": [{"days": [0, 1, 2, 3, 4], "start": "07:00", "end": "23:00", "price": 0.35},
+#                              {"start": "23:00", "end": "07:00", "price": 0.18}]}
+try:
+    from wa_cred import TARIFF_CALENDAR
+except ImportError:
+    TARIFF_CALENDAR = None
+
+
+def _minutes(text):
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class TariffCalendar:
+    """Electricity price per kWh at a given local time, from a TARIFF_CALENDAR-shaped dict."""
+    def __init__(self, config):
+        self.default = config.get("default", 0.0)
+        self.dates = dict(config.get("dates", {}))
+        self.rules = [(set(rule.get("days", range(7))), _minutes(rule.get("start", "00:00")), _minutes(rule.get("end", "24:00")),
+                       rule["price"]) for rule in config.get("rules", [])]
+
+    def price_at(self, when):
+        day = when.strftime("%Y-%m-%d")
+        if day in self.dates:
+            return self.dates[day]
+        minute = when.hour * 60 + when.minute
+        for days, start, end, price in self.rules:
+            if start <= end:
+                if when.weekday() in days and start <= minute < end:
+                    return price
+            elif (minute >= start and when.weekday() in days) or (minute < end and (when.weekday() - 1) % 7 in days):
+                return price  # Wraps midnight: the morning part belongs to the previous day's rule
+        return self.default
+
+    def average_price(self, start, end, step_minutes=5):
+        """Time-weighted price between start and end, so a slot straddling a tariff change gets the mix."""
+        prices = []
+        when = start
+        while when < end:
+            prices.append(self.price_at(when))
+            when += timedelta(minutes=step_minutes)
+        return round(sum(prices) / len(prices), 6) if prices else self.price_at(start)
+
+
+class PowerModel:
+    """
+    Wall power per (coin, threads). Measured points win: two or more measured thread counts for a
+    coin are interpolated (and extrapolated) linearly; a single one scales the estimate; without
+    any, POWER_BASE_WATTS + POWER_PER_THREAD_WATTS per thread times POWER_COIN_FACTOR.
+    """
+    def __init__(self, base=POWER_BASE_WATTS, per_thread=POWER_PER_THREAD_WATTS, coin_factor=None):
+        self.base = base
+        self.per_thread = per_thread
+        self.coin_factor = POWER_COIN_FACTOR if coin_factor is None else coin_factor
+        self.points = {}  # coin -> {threads: watts}
+
+    def observe(self, coin, threads, watts):
+        if watts is None or threads is None:
+            return
+        points = self.points.setdefault(coin, {})
+        points[threads] = watts if threads not in points else points[threads] + POWER_SMOOTHING * (watts - points[threads])
+
+    def estimate(self, coin, threads):
+        return (self.base + self.per_thread * threads) * self.coin_factor.get(coin, 1.0) if threads else 0.0
+
+    def watts(self, coin, threads):
+        if not threads:
+            return 0.0
+        points = self.points.get(coin, {})
+        if threads in points:
+            return points[threads]
+        if len(points) == 1:
+            (known, watts), = points.items()
+            return watts * self.estimate(coin, threads) / self.estimate(coin, known)
+        if len(points) >= 2:
+            below = [n for n in points if n < threads]
+            above = [n for n in points if n > threads]
+            if below and above:
+                low, high = max(below), min(above)
+            else:
+                ordered = sorted(points, key=lambda n: abs(n - threads))[:2]
+                low, high = min(ordered), max(ordered)
+            slope = (points[high] - points[low]) / (high - low)
+            return max(points[low] + slope * (threads - low), 0.0)
+        return self.estimate(coin, threads)
+
+    def save(self, path):
+        try:
+            temporary = path + ".tmp"
+            with open(temporary, "w") as f:
+                json.dump({coin: {str(n): watts for n, watts in sorted(points.items())} for coin, points in self.points.items()}, f, indent=1)
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"Error saving power model: {e}")
+
+    @classmethod
+    def load(cls, path):
+        """Model with the measured points saved at path, or one that only estimates."""
+        model = cls()
+        try:
+            with open(path) as f:
+                model.points = {coin: {int(n): watts for n, watts in points.items()} for coin, points in json.load(f).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error loading power model: {e}")
+        return model
+
+
+class PlanSlot:
+    def __init__(self, start, end, coin, threads, net_per_hour, price, revenue_per_hour=0.0, watts=0.0):
+        self.start = start
+        self.end = end
+        self.coin = coin  # None: stay off
+        self.threads = threads
+        self.net_per_hour = net_per_hour
+        self.price = price
+        self.revenue_per_hour = revenue_per_hour
+        self.watts = watts
+
+    def as_dict(self):
+        return {"start": self.start.isoformat(), "end": self.end.isoformat(), "coin": self.coin, "threads": self.threads,
+                "net_per_hour": round(self.net_per_hour, 6), "price": self.price,
+                "revenue_per_hour": round(self.revenue_per_hour, 6), "watts": round(self.watts, 1)}
+
+    def __repr__(self):
+        what = f"{self.coin} x{self.threads}" if self.coin else "off"
+        return f"{self.start:%a %H:%M} {what} net {self.net_per_hour:+.4f}/h at {self.price}/kWh"
+
+
+def linear_share(coin, threads, ceiling):
+    """Hashrate share of the ceiling's hashrate at threads, without measurements: proportional."""
+    return threads / ceiling if ceiling else 0.0
+
+
+class TariffPlanner:
+    """
+    Net profit per hour for every coin x intensity level in every slot:
+        revenue_per_day(coin) / 24 * hashrate_share(threads) - watts(coin, threads) / 1000 * price
+    and the best choice per slot, or off when nothing clears PLAN_MIN_NET_PER_HOUR.
+    revenue_per_day is rev_rig_correct: the rig's revenue at the ceiling thread count.
+    """
+    def __init__(self, calendar, power, hashrate_share=linear_share):
+        self.calendar = calendar
+        self.power = power
+        self.hashrate_share = hashrate_share
+        self.plan = []
+        self.planned_at = None
+
+    def options(self, revenue_per_day, ceiling):
+        """(coin, threads) choices: every coin with known revenue at every intensity level."""
+        thread_counts = sorted({max(1, round(level * ceiling)) for level in PLAN_INTENSITY_LEVELS})
+        return [(coin, threads) for coin, revenue in revenue_per_day.items() if revenue for threads in thread_counts]
+
+    def best(self, price, revenue_per_day, ceiling):
+        best = PlanSlot(None, None, None, 0, PLAN_MIN_NET_PER_HOUR, price)
+        for coin, threads in self.options(revenue_per_day, ceiling):
+            revenue = revenue_per_day[coin] / 24 * self.hashrate_share(coin, threads, ceiling)
+            watts = self.power.watts(coin, threads)
+            net = revenue - watts / 1000 * price
+            if net > best.net_per_hour:
+                best = PlanSlot(None, None, coin, threads, net, price, revenue, watts)
+        return best
+
+    def make_plan(self, start, revenue_per_day, ceiling, hours=PLAN_HOURS, slot_minutes=PLAN_SLOT_MINUTES):
+        """Day-ahead plan from start (aligned down to the slot size)."""
+        start = start.replace(minute=start.minute - start.minute % slot_minutes, second=0, microsecond=0)
+        plan = []
+        for i in range(hours * 60 // slot_minutes):
+            slot_start = start + timedelta(minutes=i * slot_minutes)
+            slot_end = slot_start + timedelta(minutes=slot_minutes)
+            slot = self.best(self.calendar.average_price(slot_start, slot_end), revenue_per_day, ceiling)
+            slot.start, slot.end = slot_start, slot_end
+            plan.append(slot)
+        self.plan = plan
+        self.planned_at = time.time()
+        if DEBUG:
+            for slot in plan:
+                print(f"Plan: {slot}")
+        return plan
+
+    def current(self, when):
+        """Slot covering when, None outside the plan."""
+        return next((slot for slot in self.plan if slot.start <= when < slot.end), None)
+
+    def due(self, when):
+        return not self.plan or self.planned_at is None or time.time() - self.planned_at >= PLAN_REFRESH_INTERVAL \
+            or self.current(when) is None
+
+    def summary(self):
+        mining = [slot for slot in self.plan if slot.coin]
+        net = sum(slot.net_per_hour * (slot.end - slot.start).total_seconds() / 3600 for slot in mining)
+        coins = sorted({slot.coin for slot in mining})
+        return f"{len(mining)}/{len(self.plan)} slots mining {', '.join(coins) or 'nothing'}, expected net {net:.4f}"
+
+    def save(self, path):
+        try:
+            temporary = path + ".tmp"
+            with open(temporary, "w") as f:
+                json.dump({"planned_at": self.planned_at, "slots": [slot.as_dict() for slot in self.plan]}, f, indent=1)
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"Error saving tariff plan: {e}")
@@ -0,0 +1,192 @@
+# wa_thermal.py
+# PID thermal controller: fits the recent temperature slope, acts on the predicted temperature and scales miner intensity.
+import time
+from collections import deque
+
+DEBUG = False
+THERMAL_HISTORY = 180  # Seconds of sensor samples used for the slope fit
+THERMAL_HORIZON = 60  # Act on the temperature predicted this many seconds ahead
+THERMAL_KP = 0.08  # Intensity removed per °C of predicted error
+THERMAL_KI = 0.002  # Intensity removed per °C·s of accumulated error
+THERMAL_SETPOINT_MARGIN = 0.0  # Setpoint this far below the limit
+THERMAL_DEADBAND = 3.0  # Predicted temperatures up to this far below the setpoint leave intensity alone
+THERMAL_EMERGENCY_MARGIN = 5.0  # Hard stop only this far over the limit
+INTENSITY_BELOW_NORMAL = 0.75  # Miner priority drops to below normal under this intensity...
+INTENSITY_IDLE = 0.4  # ... and to idle under this one
+RAISE_INTERVAL = 90  # Seconds between adding threads (about one thermal time constant)
+RAISE_BACKOFF = 600  # Seconds before retrying a thread count that ran hot...
+MAX_RAISE_BACKOFF = 3600  # ... doubling up to this when it keeps running hot
+THREAD_HYSTERESIS = 0.5  # Keep the running thread count while intensity * ceiling is at most this far below it
+
+
+class TemperatureTrend:
+    """Recent (timestamp, °C) samples with a least-squares slope."""
+    def __init__(self, history=THERMAL_HISTORY):
+        self.history = history
+        self.samples = deque()
+
+    def add(self, timestamp, temp):
+        self.samples.append((timestamp, temp))
+        while self.samples and self.samples[0][0] < timestamp - self.history:
+            self.samples.popleft()
+
+    def slope(self):
+        """°C per second, None with fewer than three samples."""
+        if len(self.samples) < 3:
+            return None
+        n = len(self.samples)
+        mean_t = sum(t for t, _ in self.samples) / n
+        mean_v = sum(v for _, v in self.samples) / n
+        var = sum((t - mean_t) ** 2 for t, _ in self.samples)
+        if not var:
+            return None
+        return sum((t - mean_t) * (v - mean_v) for t, v in self.samples) / var
+
+    def predict(self, horizon=THERMAL_HORIZON):
+        """Temperature horizon seconds after the latest sample (the latest sample if there is no slope yet)."""
+        if not self.samples:
+            return None
+        timestamp, latest = self.samples[-1]
+        slope = self.slope()
+        return latest if slope is None else latest + slope * horizon
+
+    def seconds_to(self, threshold):
+        """Predicted seconds until threshold is crossed, None if the trend is not heading there."""
+        slope = self.slope()
+        if not self.samples or not slope or slope <= 0:
+            return None
+        return max(0.0, (threshold - self.samples[-1][1]) / slope)
+
+
+class PidThermalController:
+    """
+    Holds one sensor at setpoint by scaling intensity in [min_output, 1]. The error is taken
+    on the predicted temperature, so the controller pulls back before the limit is crossed
+    instead of after. Velocity form: each update nudges the previous output, so it holds
+    the operating point it found and cannot wind up against the clamps. Errors up to
+    deadband below the setpoint count as zero, so small margins do not push intensity up.
+    """
+    def __init__(self, name, limit, setpoint=None, kp=THERMAL_KP, ki=THERMAL_KI, horizon=THERMAL_HORIZON,
+                 history=THERMAL_HISTORY, deadband=THERMAL_DEADBAND, min_output=0.0):
+        self.name = name
+        self.limit = limit
+        self.setpoint = setpoint if setpoint is not None else limit - THERMAL_SETPOINT_MARGIN
+        self.kp = kp
+        self.ki = ki
+        self.horizon = horizon
+        self.deadband = deadband
+        self.min_output = min_output
+        self.trend = TemperatureTrend(history)
+        self.last_error = None
+        self.last_time = None
+        self.output = 1.0
+
+    def update(self, now, temp):
+        """New intensity from a sensor sample. A missing reading keeps the last output."""
+        if temp is None:
+            return self.output
+        self.trend.add(now, temp)
+        predicted = self.trend.predict(self.horizon)
+        error = predicted - self.setpoint  # Positive: too hot
+        if error <= 0:
+            error = min(error + self.deadband, 0.0)  # Shifted, not cut, so leaving the band does not kick the P term
+        hot_error = max(error, 0.0)  # P acts on heat only; warming up from cold must not throttle
+        if self.last_error is not None:
+            dt = now - self.last_time
+            self.output -= self.kp * (hot_error - self.last_error) + self.ki * error * dt
+            self.output = min(max(self.output, self.min_output), 1.0)
+        self.last_error = hot_error
+        self.last_time = now
+        if DEBUG:
+            print(f"Thermal {self.name}: {temp:.1f}°C, predicted {predicted:.1f}°C, intensity {self.output:.2f}")
+        return self.output
+
+    def emergency(self, temp):
+        return temp is not None and temp > self.limit + THERMAL_EMERGENCY_MARGIN
+
+    def reset(self):
+        self.trend = TemperatureTrend(self.trend.history)
+        self.last_error = None
+        self.last_time = None
+        self.output = 1.0
+
+
+class ThermalGovernor:
+    """
+    CPU and GPU controllers; the miner follows whichever sensor needs the lower intensity.
+    Thread counts are coarse (one thread is often 3-5°C), so the setpoint usually falls
+    between two counts. Threads are added one at a time, RAISE_INTERVAL after the last
+    change, and a count that ran hot caps the thread count below it for RAISE_BACKOFF
+    seconds, doubling each time it runs hot again soon after.
+    """
+    def __init__(self, cpu_limit, gpu_limit):
+        self.cpu = PidThermalController("cpu", cpu_limit)
+        self.gpu = PidThermalController("gpu", gpu_limit)
+        self.hot_until = {}  # threads -> time before which raising to it (or above) is held off
+        self.backoff = {}  # threads -> current backoff for it
+        self.last_change = float("-inf")
+
+    def update(self, now, cpu_temp, gpu_temp):
+        return min(self.cpu.update(now, cpu_temp), self.gpu.update(now, gpu_temp))
+
+    def allowed(self, now, ceiling):
+        """Highest thread count not held off by a recent hot count."""
+        held = [n for n, until in self.hot_until.items() if now < until]
+        return min([ceiling] + [n - 1 for n in held])
+
+    def plan(self, now, cpu_temp, gpu_temp, ceiling, current=None):
+        """(threads, priority, intensity) for the next interval, at most ceiling threads."""
+        intensity = self.update(now, cpu_temp, gpu_temp)
+        threads, priority = intensity_plan(intensity, ceiling, current)
+        if current is None:
+            return threads, priority, intensity
+        if threads < current <= ceiling:
+            recent = now < self.hot_until.get(current, float("-inf")) + self.backoff.get(current, RAISE_BACKOFF)
+            self.backoff[current] = min(self.backoff[current] * 2, MAX_RAISE_BACKOFF) if recent and current in self.backoff else RAISE_BACKOFF
+            self.hot_until[current] = now + self.backoff[current]
+            self.last_change = now
+        elif threads > current:
+            if now - self.last_change < RAISE_INTERVAL:
+                threads = current  # The sensor still lags the last change
+            else:
+                threads = max(current, min(current + 1, self.allowed(now, ceiling)))
+            if threads > current:
+                self.last_change = now
+            for controller in (self.cpu, self.gpu):  # Hold the integrators at the count actually allowed
+                if controller.trend.samples:
+                    controller.output = min(controller.output, (threads + 1 - 1e-3) / ceiling)
+        return threads, priority, intensity
+
+    def emergency(self, cpu_temp, gpu_temp):
+        return self.cpu.emergency(cpu_temp) or self.gpu.emergency(gpu_temp)
+
+    def describe(self):
+        parts = []
+        for controller in (self.cpu, self.gpu):
+            eta = controller.trend.seconds_to(controller.limit)
+            if controller.trend.samples:
+                parts.append(f"{controller.name} {controller.trend.samples[-1][1]:.1f}°C -> {controller.trend.predict(controller.horizon):.1f}°C"
+                             f"{f' (limit in {eta:.0f}s)' if eta is not None else ''} x{controller.output:.2f}")
+        held = {n: until - time.time() for n, until in self.hot_until.items() if until > time.time()}
+        if held:
+            parts.append(f"held off: {', '.join(f'{n} threads {left:.0f}s' for n, left in sorted(held.items()))}")
+        return ", ".join(parts)
+
+
+def intensity_plan(intensity, ceiling, current=None, min_threads=1):
+    """
+    (threads, priority) for an intensity in [0, 1] below a ceiling thread count. Rounds down
+    to stay cool, but keeps current while the target is within THREAD_HYSTERESIS of it.
+    """
+    target = intensity * ceiling
+    if current is not None and current - THREAD_HYSTERESIS <= target < current + 1 and current <= ceiling:
+        threads = max(min_threads, current)
+    else:
+        threads = max(min_threads, min(ceiling, int(target + 1e-9)))
+    if intensity >= INTENSITY_BELOW_NORMAL:
+        priority = "normal"
+    elif intensity >= INTENSITY_IDLE:
+        priority = "below_normal"
+    else:
+        priority = "idle"
+    return threads, priority
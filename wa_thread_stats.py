@@ -0,0 +1,180 @@
+# wa_thread_stats.py
+# Per-thread hashrate history (NumPy rings with downsampling), slow-thread detection and affinity recommendations.
+import os
+
+import numpy as np
+
+DEBUG = False
+MAX_THREADS = 64  # Columns per ring; xmrig threads beyond this are ignored
+RAW_SAMPLES = 360  # Raw samples kept (1 hour at a 10 s API poll)
+DOWNSAMPLE_EVERY = 30  # Raw samples averaged into one coarse sample (5 minutes at 10 s)
+COARSE_SAMPLES = 2016  # Coarse samples kept (1 week of 5-minute averages)
+REFERENCE_PERCENTILE = 75  # Per-sample reference rate. Not the median: SMT siblings are often half of all threads
+SLOW_THREAD_RATIO = 0.85  # A thread below this fraction of the reference is "slow" in that sample
+SLOW_THREAD_CONSISTENCY = 0.8  # ... and is flagged when it is slow in at least this share of samples
+MIN_SAMPLES = 30  # No recommendation before this many samples
+THREAD_STATS_DIR = "thread_stats"
+
+
+class Ring:
+    """Fixed-size float32 ring of per-thread rows plus float64 timestamps."""
+    def __init__(self, capacity, width=MAX_THREADS):
+        self.timestamps = np.full(capacity, np.nan, dtype=np.float64)
+        self.values = np.full((capacity, width), np.nan, dtype=np.float32)
+        self.next = 0
+        self.count = 0
+
+    def append(self, timestamp, row):
+        self.timestamps[self.next] = timestamp
+        self.values[self.next] = row
+        self.next = (self.next + 1) % len(self.timestamps)
+        self.count = min(self.count + 1, len(self.timestamps))
+
+    def latest(self, n):
+        """Last n rows, oldest first."""
+        n = min(n, self.count)
+        idx = (self.next - n + np.arange(n)) % len(self.timestamps)
+        return self.timestamps[idx], self.values[idx]
+
+    def rows(self):
+        return self.latest(self.count)
+
+
+class ThreadHashrateCollector:
+    """
+    Per-thread hashrate history for one host and coin. Raw API samples go into a short
+    ring; every DOWNSAMPLE_EVERY samples their mean goes into a long coarse ring, so a week
+    of 64 threads costs about 0.5 MB. Analysis compares every thread to the per-sample
+    upper quartile: threads that are consistently slow usually sit on SMT siblings, throttled
+    cores or E-cores, and are left out of the recommended affinity mask.
+    """
+    def __init__(self, hostname, coin, raw_samples=RAW_SAMPLES, coarse_samples=COARSE_SAMPLES,
+                 downsample_every=DOWNSAMPLE_EVERY, max_threads=MAX_THREADS):
+        self.hostname = hostname
+        self.coin = coin
+        self.max_threads = max_threads
+        self.downsample_every = downsample_every
+        self.raw = Ring(raw_samples, max_threads)
+        self.coarse = Ring(coarse_samples, max_threads)
+        self.affinity = np.full(max_threads, -1, dtype=np.int16)  # CPU per thread slot, -1 = unpinned
+        self.threads = 0
+        self.since_downsample = 0
+
+    def reset(self, threads):
+        self.raw = Ring(len(self.raw.timestamps), self.max_threads)
+        self.coarse = Ring(len(self.coarse.timestamps), self.max_threads)
+        self.affinity[:] = -1
+        self.threads = threads
+        self.since_downsample = 0
+
+    def add(self, timestamp, rates, affinity=None):
+        """Record one sample of per-thread hashrates (H/s). A different thread count starts a new history."""
+        rates = [r if r is not None else np.nan for r in rates[:self.max_threads]]
+        if not rates:
+            return
+        if len(rates) != self.threads:
+            if DEBUG and self.threads:
+                print(f"Thread count for {self.coin} changed {self.threads} -> {len(rates)}, resetting thread stats")
+            self.reset(len(rates))
+        if affinity:
+            self.affinity[:len(affinity[:self.max_threads])] = affinity[:self.max_threads]
+        row = np.full(self.max_threads, np.nan, dtype=np.float32)
+        row[:len(rates)] = rates
+        self.raw.append(timestamp, row)
+        self.since_downsample += 1
+        if self.since_downsample >= self.downsample_every:
+            ts, values = self.raw.latest(self.downsample_every)
+            coarse_row = np.full(self.max_threads, np.nan, dtype=np.float32)
+            coarse_row[:self.threads] = values[:, :self.threads].mean(axis=0)  # NaN if a thread missed a sample
+            self.coarse.append(ts[-1], coarse_row)
+            self.since_downsample = 0
+
+    def samples(self):
+        """Coarse samples older than the raw ring, then all raw samples, trimmed to the current thread count."""
+        coarse_ts, coarse = self.coarse.rows()
+        raw_ts, raw = self.raw.rows()
+        if self.raw.count:
+            older = coarse_ts < raw_ts[0]
+            coarse_ts, coarse = coarse_ts[older], coarse[older]
+        return np.concatenate([coarse_ts, raw_ts]), np.concatenate([coarse, raw])[:, :self.threads]
+
+    def analyze(self, ratio=SLOW_THREAD_RATIO, consistency=SLOW_THREAD_CONSISTENCY):
+        """
+        Per-thread summary: mean ratio to the sample reference, share of samples below ratio,
+        and the indices of slow threads. None until MIN_SAMPLES samples exist.
+        """
+        _, values = self.samples()
+        valid = values[np.isfinite(values).all(axis=1) & (values > 0).any(axis=1)]
+        if len(valid) < MIN_SAMPLES or self.threads < 2:
+            return None
+        reference = np.percentile(valid, REFERENCE_PERCENTILE, axis=1, keepdims=True)
+        ratios = valid / reference
+        slow_share = (ratios < ratio).mean(axis=0)
+        return {
+            "samples": len(valid),
+            "mean_ratio": ratios.mean(axis=0),
+            "slow_share": slow_share,
+            "slow_threads": np.flatnonzero(slow_share >= consistency).tolist(),
+            "mean_hashrate": valid.mean(axis=0),
+        }
+
+    def recommend(self, cpu_count=None):
+        """
+        Recommended {threads, affinity_mask, slow_threads, cpus} for the next start, or None
+        if there is not enough data or nothing to change. Without pinned threads the CPU of a
+        thread is assumed to be its index (xmrig's default placement).
+        """
+        analysis = self.analyze()
+        if analysis is None or not analysis["slow_threads"]:
+            return None
+        slow = set(analysis["slow_threads"])
+        cpus = [int(self.affinity[i]) if self.affinity[i] >= 0 else i for i in range(self.threads)]
+        keep = [cpu for i, cpu in enumerate(cpus) if i not in slow]
+        if not keep:
+            return None
+        if cpu_count:
+            keep = [cpu for cpu in keep if cpu < cpu_count]
+        mask = 0
+        for cpu in keep:
+            mask |= 1 << cpu
+        lost = float(analysis["mean_hashrate"][sorted(slow)].sum())
+        return {
+            "threads": len(keep),
+            "affinity_mask": mask,
+            "cpus": keep,
+            "slow_threads": sorted(slow),
+            "slow_hashrate": lost,  # H/s the dropped threads contributed
+        }
+
+    def path(self, folder=THREAD_STATS_DIR):
+        return os.path.join(folder, f"{self.hostname}_{self.coin}.npz")
+
+    def save(self, folder=THREAD_STATS_DIR):
+        os.makedirs(folder, exist_ok=True)
+        np.savez_compressed(
+            self.path(folder),
+            raw_ts=self.raw.timestamps, raw=self.raw.values, raw_state=[self.raw.next, self.raw.count],
+            coarse_ts=self.coarse.timestamps, coarse=self.coarse.values, coarse_state=[self.coarse.next, self.coarse.count],
+            affinity=self.affinity, state=[self.threads, self.since_downsample],
+        )
+
+    @classmethod
+    def load(cls, hostname, coin, folder=THREAD_STATS_DIR):
+        """Collector with the saved history for (hostname, coin), or an empty one."""
+        collector = cls(hostname, coin)
+        try:
+            with np.load(collector.path(folder)) as data:
+                if data["raw"].shape[1] != collector.max_threads:
+                    return collector
+                for ring, prefix in ((collector.raw, "raw"), (collector.coarse, "coarse")):
+                    if len(data[prefix + "_ts"]) == len(ring.timestamps):
+                        ring.timestamps[:] = data[prefix + "_ts"]
+                        ring.values[:] = data[prefix]
+                        ring.next, ring.count = (int(v) for v in data[prefix + "_state"])
+                collector.affinity[:] = data["affinity"]
+                collector.threads, collector.since_downsample = (int(v) for v in data["state"])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading thread stats for {hostname}/{coin}: {e}")
+        return collector
@@ -0,0 +1,206 @@
+# wa_xmrig_api.py
+# Keep-alive XMRig HTTP API client: hashrate windows, per-thread hashrate, shares, pool ping and hugepages in one poll.
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEBUG = False
+XMRIG_API_TIMEOUT = 2  # Seconds; the API is local, so a slow answer means xmrig is busy or gone
+XMRIG_API_POOL_SIZE = 2  # Keep-alive connections kept open to the miner
+
+
+class XmrigTelemetry:
+    """One /2/summary (+ /2/backends) poll. Hashrates in H/s, None where xmrig has no value yet."""
+    def __init__(self, timestamp, hashrate_10s, hashrate_60s, hashrate_15m, hashrate_highest, threads, thread_affinity,
+                 shares_accepted, shares_rejected, pool, pool_ping, hugepages, algo, uptime, paused):
+        self.timestamp = timestamp
+        self.hashrate_10s = hashrate_10s
+        self.hashrate_60s = hashrate_60s
+        self.hashrate_15m = hashrate_15m
+        self.hashrate_highest = hashrate_highest
+        self.threads = threads  # Per-thread [10s, 60s, 15m] hashrates, in xmrig's thread order
+        self.thread_affinity = thread_affinity  # CPU each thread is pinned to (-1 = not pinned)
+        self.shares_accepted = shares_accepted
+        self.shares_rejected = shares_rejected
+        self.pool = pool
+        self.pool_ping = pool_ping  # ms
+        self.hugepages = hugepages  # (allocated, total) or None
+        self.algo = algo
+        self.uptime = uptime
+        self.paused = paused
+
+    @property
+    def hashrate(self):
+        """Most recent non-empty window, matching the 10s figure xmrig prints in its speed lines."""
+        for value in (self.hashrate_10s, self.hashrate_60s, self.hashrate_15m):
+            if value:
+                return value
+        return None
+
+    @property
+    def hugepages_pct(self):
+        if not self.hugepages or not self.hugepages[1]:
+            return None
+        return 100.0 * self.hugepages[0] / self.hugepages[1]
+
+    def metrics(self):
+        """Values for the miner_stats telemetry columns."""
+        return {
+            "hashrate_10s": self.hashrate_10s,
+            "hashrate_60s": self.hashrate_60s,
+            "hashrate_15m": self.hashrate_15m,
+            "shares_accepted": self.shares_accepted,
+            "shares_rejected": self.shares_rejected,
+            "pool_ping": self.pool_ping,
+            "hugepages_pct": self.hugepages_pct,
+            "thread_hashrates": json.dumps([t[0] for t in self.threads]) if self.threads else None,
+        }
+
+    def __repr__(self):
+        return (f"XmrigTelemetry({self.algo}, {self.hashrate_10s}/{self.hashrate_60s}/{self.hashrate_15m} H/s, "
+                f"{len(self.threads)} threads, shares {self.shares_accepted}/{self.shares_rejected}, ping {self.pool_ping} ms)")
+
+
+def _hugepages(value):
+    """xmrig reports hugepages as [allocated, total] (6.x) or a bool (older builds)."""
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        return int(value[0]), int(value[1])
+    if isinstance(value, bool):
+        return (1, 1) if value else (0, 1)
+    return None
+
+
+def parse_telemetry(summary, backends=None, timestamp=None):
+    total = (summary.get("hashrate") or {}).get("total") or []
+    total = list(total) + [None] * (3 - len(total))
+    results = summary.get("results") or {}
+    connection = summary.get("connection") or {}
+    shares_good = results.get("shares_good")
+    shares_total = results.get("shares_total")
+    cpu = next((b for b in backends or [] if b.get("type") == "cpu"), None)
+    cpu_threads = (cpu or {}).get("threads") or []
+    threads = [list(t.get("hashrate") or []) for t in cpu_threads]
+    thread_affinity = [t.get("affinity", -1) for t in cpu_threads]
+    hugepages = _hugepages(summary.get("hugepages"))
+    if hugepages is None and cpu:
+        hugepages = _hugepages(cpu.get("hugepages"))
+    return XmrigTelemetry(
+        timestamp=timestamp or time.time(),
+        hashrate_10s=total[0],
+        hashrate_60s=total[1],
+        hashrate_15m=total[2],
+        hashrate_highest=(summary.get("hashrate") or {}).get("highest"),
+        threads=threads,
+        thread_affinity=thread_affinity,
+        shares_accepted=shares_good,
+        shares_rejected=shares_total - shares_good if shares_total is not None and shares_good is not None else None,
+        pool=connection.get("pool"),
+        pool_ping=connection.get("ping"),
+        hugepages=hugepages,
+        algo=summary.get("algo"),
+        uptime=summary.get("uptime"),
+        paused=summary.get("paused"),
+    )
+
+
+class XmrigApiClient:
+    """
+    One pooled requests.Session per miner instead of a fresh connection (and up to 3 retries
+    with 1 s sleeps) per call. A failed poll returns None straight away; callers poll again
+    on their own cadence and fall back to stdout parsing while the API is unavailable.
+    """
+    def __init__(self, base_url, access_token=None, timeout=XMRIG_API_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=XMRIG_API_POOL_SIZE))
+        if access_token:
+            self.session.headers["Authorization"] = f"Bearer {access_token}"
+        self.lock = threading.Lock()  # Polled from the controller thread, paused/resumed from the main loop
+        self.last = None
+        self.errors = 0
+        self.consecutive_errors = 0
+
+    def _get(self, path):
+        response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def poll(self, backends=True):
+        """XmrigTelemetry from /2/summary (and /2/backends for per-thread hashrate), or None if the API is down."""
+        try:
+            with self.lock:
+                summary = self._get("/2/summary")
+                backend_list = self._get("/2/backends") if backends else None
+        except (requests.RequestException, ValueError) as e:
+            self.errors += 1
+            self.consecutive_errors += 1
+            if DEBUG or self.consecutive_errors == 1:
+                print(f"XMRig API unavailable at {self.base_url}: {e}")
+            return None
+        self.consecutive_errors = 0
+        self.last = parse_telemetry(summary, backend_list)
+        if DEBUG:
+            print(f"XMRig API: {self.last}")
+        return self.last
+
+    def age(self):
+        return None if self.last is None else time.time() - self.last.timestamp
+
+    def json_rpc(self, method, params=None):
+        payload = {"method": method}
+        if params is not None:
+            payload["params"] = params
+        try:
+            with self.lock:
+                response = self.session.post(f"{self.base_url}/json_rpc", json=payload, timeout=self.timeout)
+                response.raise_for_status()
+            return True
+        except requests.RequestException as e:
+            print(f"Error calling XMRig JSON-RPC {method}: {e}")
+            return False
+
+    def get_config(self):
+        """Running config from GET /1/config (needs --http-no-restricted), or None."""
+        try:
+            with self.lock:
+                return self._get("/1/config")
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error reading XMRig config: {e}")
+            return None
+
+    def put_config(self, config):
+        """Replace the running config. xmrig re-creates its CPU workers in place; the RandomX dataset is kept."""
+        try:
+            with self.lock:
+                response = self.session.put(f"{self.base_url}/1/config", json=config, timeout=self.timeout)
+                response.raise_for_status()
+            return True
+        except requests.RequestException as e:
+            print(f"Error writing XMRig config: {e}")
+            return False
+
+    def set_threads(self, threads, algo=None):
+        """
+        Change the CPU thread count without restarting xmrig: the profile for the algorithm
+        family (cpu.rx for rx/wow, ...) and any profile named after the exact algorithm are
+        replaced with threads unpinned entries. Returns True if xmrig accepted the config.
+        """
+        config = self.get_config()
+        if not config or not isinstance(config.get("cpu"), dict):
+            return False
+        algo = algo or (self.last.algo if self.last else None) or "rx/0"
+        cpu = config["cpu"]
+        profile = [-1] * threads
+        cpu[algo.split("/")[0]] = profile
+        if algo in cpu:
+            cpu[algo] = profile
+        if DEBUG:
+            print(f"XMRig: setting {threads} threads for {algo}")
+        return self.put_config(config)
+
+    def close(self):
+        self.session.close()
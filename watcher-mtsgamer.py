@@ -25,7 +25,7 @@ from wa_cred import HOSTNAME, MTS_SERVER_NAME, \
     IDLE_THRESHOLD, PAUSE_XMRIG, SLEEP_INTERVAL, \
     XMRIG_API_URL, MQTT_BROKER, XMRIG_ACCESS_TOKEN, REPORT_STATS_WATCHER
 from wa_definitions import GAME_PROCESSES, engine_fogplayDB, engine_miningDB, Events, BestCoinsForRigView, MinersStats, SupportedCoins
-from wa_functions import update_miner_stats, get_gpu_metrics, get_cpu_temperature, detect_gpu, GPU_TYPE
+from wa_functions import update_miner_stats, get_gpu_metrics, get_cpu_temperature, detect_gpu, GPU_TYPE, get_xmrig_hashrate
 # from wa_functions import GPU_TYPE, detect_gpu, get_cpu_temperature, get_gpu_metrics, get_gpu_temperature #, get_idle_time, get_current_game, get_xmrig_hashrate, pause_xmrig, resume_xmrig
 
 if USE_MQTT: import paho.mqtt.client as mqtt
@@ -48,36 +48,7 @@ if USE_MQTT:
     mqtt_client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
     mqtt_client.on_connect = on_connect
 
-# XMRig API Functions
-def get_xmrig_hashrate():
-    headers = {"Authorization": f"Bearer {XMRIG_ACCESS_TOKEN}"}
-    url = f"{XMRIG_API_URL}/2/summary"
-    for attempt in range(3):  # Retry up to 3 times
-        try:
-            response = requests.get(url, headers=headers, timeout=5)
-            response.raise_for_status()
-            raw_text = response.text
-            # if DEBUG:
-            #     print(f"Raw response from {url}: {raw_text}")
-            data = json.loads(raw_text)  # Explicitly parse to catch errors
-            hashrate = data.get("hashrate", {}).get("total", [0])[1]
-            if DEBUG:
-                print(f"Hashrate: {hashrate} H/s")
-            return hashrate
-        except requests.RequestException as e:
-            print(f"Attempt {attempt + 1} - Error fetching hashrate from {url}: {e}")
-            if e.response:
-                print(f"Status: {e.response.status_code}, Raw response: {e.response.text}")
-            if attempt < 2:
-                time.sleep(1)
-        except json.JSONDecodeError as e:
-            print(f"Attempt {attempt + 1} - JSON decode error: {e}")
-            print(f"Raw response: {raw_text}")
-            if attempt < 2:
-                time.sleep(1)
-    print("All attempts failed to get hashrate")
-    return 0
-
+# XMRig API Functions (hashrate comes from the shared keep-alive client in wa_functions)
 def pause_xmrig():
     headers = {"Authorization": f"Bearer {XMRIG_ACCESS_TOKEN}"}
     payload = {"method": "pause"}